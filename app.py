@@ -1,5 +1,5 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import os
@@ -7,11 +7,13 @@ import sys
 from pathlib import Path
 import cv2
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import json
 import uuid
+import hashlib
 from datetime import datetime
 import asyncio
+import time
 from pydantic import BaseModel
 
 # Add the pre_analysis directory to the path
@@ -19,8 +21,19 @@ current_dir = Path(__file__).parent
 pre_analysis_path = current_dir / "pre_analysis"
 sys.path.insert(0, str(pre_analysis_path))
 
+from jobs import JobManager, Job, QueueFullError
+from result_cache import ResultCache
+from retention import RetentionManager, RetentionRule
+from results_catalog import ResultsCatalog
+
 try:
     from pre_analysis.standardizer import VideoStandardizer
+    from pre_analysis.standardizer_pool import StandardizerPool
+    from pre_analysis.renderer import render_shot_video
+    from pre_analysis.decoder import available_backends
+    from pre_analysis import profiling
+    from pre_analysis.artifacts import write_json
+    from pre_analysis.profiling import PROCESS_METRICS, metric_lines
 except ImportError as e:
     print(f"Error importing standardizer: {e}")
     print(f"Looking for standardizer.py in: {pre_analysis_path}")
@@ -49,13 +62,53 @@ app.add_middleware(
 UPLOAD_FOLDER = 'uploads'
 RESULTS_FOLDER = 'results'
 TRACKED_DATA_FOLDER = 'tracked_data'
+CACHE_FOLDER = 'cache'
+CATALOG_PATH = os.environ.get("SWISHSCAN_CATALOG", "results_catalog.sqlite3")  # Index of the results folder
+SHOTS_PAGE_SIZE = 50  # Default and maximum page sizes of /api/shots
+SHOTS_MAX_PAGE_SIZE = 500
+SOURCES_FOLDER = 'sources'  # Uploads kept for on-demand rendering, named by content hash
+RENDERS_FOLDER = 'renders'  # Tracked videos rendered on request
+CACHE_MAX_BYTES = int(os.environ.get("SWISHSCAN_CACHE_MAX_MB", "2048")) * 1024 * 1024  # LRU budget for cached results
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Uploads are streamed to disk 1MB at a time
 ALLOWED_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'wmv', 'flv', 'webm'}
+SINGLE_PASS_DECODE = os.environ.get("SWISHSCAN_SINGLE_PASS", "0") == "1"  # A/B switch for the streaming pipeline
+MOTION_DOWNSCALE = float(os.environ.get("SWISHSCAN_MOTION_DOWNSCALE", "1.0"))  # e.g. 0.25 for 1080p uploads
+MOTION_STRIDE = int(os.environ.get("SWISHSCAN_MOTION_STRIDE", "1"))
+MOTION_BATCH_SIZE = int(os.environ.get("SWISHSCAN_MOTION_BATCH_SIZE", "1"))
+TRACKING_WORKERS = int(os.environ.get("SWISHSCAN_TRACKING_WORKERS", "1"))  # Shot tracking processes, shared by all pooled standardizers
+BALL_ROI_SEARCH = os.environ.get("SWISHSCAN_BALL_ROI", "0") == "1"  # Search for the ball around the hands only
+BALL_FULL_SEARCH_INTERVAL = int(os.environ.get("SWISHSCAN_BALL_FULL_SEARCH_INTERVAL", "10"))
+HAND_CROPS = os.environ.get("SWISHSCAN_HAND_CROPS", "0") == "1"  # Run the hand model on wrist crops only
+KEYFRAME_INTERVAL = int(os.environ.get("SWISHSCAN_KEYFRAME_INTERVAL", "1"))  # e.g. 4 to run the models on every 4th frame
+INFERENCE_HEIGHT = int(os.environ.get("SWISHSCAN_INFERENCE_HEIGHT", "0")) or None  # e.g. 720; 0 keeps source resolution
+RENDER_TRACKED_VIDEO = os.environ.get("SWISHSCAN_RENDER_VIDEO", "1") == "1"  # 0 renders tracked videos only when requested
+DECODE_BACKEND = os.environ.get("SWISHSCAN_DECODE_BACKEND", "auto")  # auto (currently OpenCV), pyav or opencv
+DECODE_READ_AHEAD = int(os.environ.get("SWISHSCAN_DECODE_READ_AHEAD", "0"))  # Frames decoded ahead on a background thread
+PROFILING_ENABLED = os.environ.get("SWISHSCAN_PROFILING", "1") == "1"  # Per-stage timers for results and /api/metrics
+STANDARDIZER_POOL_SIZE = int(os.environ.get("SWISHSCAN_STANDARDIZER_POOL_SIZE", "2"))  # Concurrent uploads with their own models
+JOB_CONCURRENCY = int(os.environ.get("SWISHSCAN_JOB_CONCURRENCY", str(STANDARDIZER_POOL_SIZE)))  # Videos analyzed at once
+JOB_QUEUE_SIZE = int(os.environ.get("SWISHSCAN_JOB_QUEUE_SIZE", "8"))  # Uploads allowed to wait before 429
+JOB_RETRY_AFTER_SECONDS = 30  # Retry-After hint sent with 429 responses
+RETENTION_INTERVAL_SECONDS = float(os.environ.get("SWISHSCAN_RETENTION_INTERVAL", "600"))  # 0 disables sweeps
+RETENTION_GRACE_SECONDS = float(os.environ.get("SWISHSCAN_RETENTION_GRACE", "300"))  # Never remove files this fresh
+
+def retention_rule(folder: str, env_name: str, max_age_hours: str, max_mb: str) -> RetentionRule:
+    """Build a folder's retention limits from SWISHSCAN_<NAME>_MAX_AGE_HOURS and _MAX_MB (0 = unlimited)"""
+    return RetentionRule(
+        folder,
+        max_age_seconds=float(os.environ.get(f"SWISHSCAN_{env_name}_MAX_AGE_HOURS", max_age_hours)) * 3600,
+        max_bytes=int(os.environ.get(f"SWISHSCAN_{env_name}_MAX_MB", max_mb)) * 1024 * 1024
+    )
+
+profiling.set_enabled(PROFILING_ENABLED)
 
 # Ensure directories exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(RESULTS_FOLDER, exist_ok=True)
 os.makedirs(TRACKED_DATA_FOLDER, exist_ok=True)
+os.makedirs(SOURCES_FOLDER, exist_ok=True)
+os.makedirs(RENDERS_FOLDER, exist_ok=True)
 
 # Pydantic models for API documentation
 class AnalysisResult(BaseModel):
@@ -64,11 +117,11 @@ class AnalysisResult(BaseModel):
     analysis: Dict[str, Any]
     timestamp: str
 
-class ProcessingResponse(BaseModel):
+class JobSubmissionResponse(BaseModel):
     status: str
     message: str
-    total_shots: int
-    results_file: str
+    job_id: str
+    status_url: str
     timestamp: str
 
 class ErrorResponse(BaseModel):
@@ -81,16 +134,115 @@ def allowed_file(filename: str) -> bool:
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds MAX_FILE_SIZE while streaming"""
+
+async def save_upload(upload: UploadFile, file_path: str) -> Dict[str, Any]:
+    """
+    Stream an upload to disk in fixed-size chunks, hashing it on the way
+    
+    Only one chunk is held in memory at a time, and the size limit is enforced
+    as bytes arrive so oversized bodies are rejected without writing them out.
+    
+    Args:
+        upload: The uploaded file
+        file_path: Destination path
+        
+    Returns:
+        Dictionary with the number of bytes written and the SHA-256 of the content
+        
+    Raises:
+        UploadTooLargeError: If the upload exceeds MAX_FILE_SIZE
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    try:
+        with open(file_path, "wb") as buffer:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    raise UploadTooLargeError(f"Upload exceeds {MAX_FILE_SIZE} bytes")
+                sha256.update(chunk)
+                buffer.write(chunk)
+    except BaseException:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    
+    return {"size_bytes": size, "sha256": sha256.hexdigest()}
+
 class BasketballAnalysisApp:
     def __init__(self):
-        self.standardizer = VideoStandardizer()
+        self.config_fingerprint = None
+        self.result_cache = ResultCache(CACHE_FOLDER, CACHE_MAX_BYTES)
+        self.catalog = ResultsCatalog(CATALOG_PATH)
+        self.render_locks = {}  # Output path -> [lock, requests using it], so each video renders once
         
-    async def process_video(self, video_path: str) -> Dict[str, Any]:
+        # Each upload checks out its own standardizer so MediaPipe graphs are never shared,
+        # but all of them submit shots to the first one's tracking workers
+        self.tracking_pool_owner = None
+        self.standardizer_pool = StandardizerPool(STANDARDIZER_POOL_SIZE, self._create_standardizer)
+    
+    def _create_standardizer(self) -> VideoStandardizer:
+        """Build a standardizer with the configured pipeline settings"""
+        standardizer = VideoStandardizer(
+            single_pass=SINGLE_PASS_DECODE,
+            motion_downscale=MOTION_DOWNSCALE,
+            motion_stride=MOTION_STRIDE,
+            motion_batch_size=MOTION_BATCH_SIZE,
+            tracking_workers=TRACKING_WORKERS,
+            ball_roi_search=BALL_ROI_SEARCH,
+            ball_full_search_interval=BALL_FULL_SEARCH_INTERVAL,
+            hand_crops=HAND_CROPS,
+            keyframe_interval=KEYFRAME_INTERVAL,
+            inference_height=INFERENCE_HEIGHT,
+            render_video=RENDER_TRACKED_VIDEO,
+            decode_backend=DECODE_BACKEND,
+            decode_read_ahead=DECODE_READ_AHEAD
+        )
+        if TRACKING_WORKERS > 1:
+            if self.tracking_pool_owner is None:
+                self.tracking_pool_owner = standardizer
+            else:
+                standardizer.share_tracking_pool(self.tracking_pool_owner)
+        self.config_fingerprint = standardizer.config_fingerprint()
+        return standardizer
+    
+    def cache_key(self, content_hash: str) -> str:
+        """Cache key for an upload under the current pipeline settings"""
+        return ResultCache.make_key(content_hash, self.config_fingerprint)
+    
+    def get_cached_results(self, content_hash: str) -> Dict[str, Any]:
+        """
+        Look up results for previously analyzed content
+        
+        Args:
+            content_hash: SHA-256 of the upload
+            
+        Returns:
+            Cached results dictionary, or None on a miss
+        """
+        return self.result_cache.get(self.cache_key(content_hash))
+    
+    def _standardize(self, video_path: str, progress_callback=None,
+                     output_dir: str = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Run the standardizer on a pooled instance (called from a worker thread), with its stage timings"""
+        with self.standardizer_pool.checkout() as standardizer:
+            shot_data = standardizer.standardize_video(video_path, progress_callback, output_dir)
+            return shot_data, standardizer.job_timings.as_dict()
+        
+    async def process_video(self, video_path: str, progress_callback=None, output_dir: str = None) -> Dict[str, Any]:
         """
         Process a basketball video and return analysis results
         
         Args:
             video_path (str): Path to the uploaded video file
+            progress_callback: Optional callable receiving standardizer progress updates
+            output_dir (str): Optional directory for this video's shot artifacts,
+                so concurrent jobs never write to the same files
             
         Returns:
             Dict containing processed shot data and analysis results
@@ -103,9 +255,10 @@ class BasketballAnalysisApp:
             print(f"Processing video: {video_path}")
             
             # Run standardizer in a thread pool to avoid blocking
+            started = time.monotonic()
             loop = asyncio.get_event_loop()
-            shot_data = await loop.run_in_executor(
-                None, self.standardizer.standardize_video, video_path
+            shot_data, stage_timings = await loop.run_in_executor(
+                None, self._standardize, video_path, progress_callback, output_dir
             )
             
             # Process each shot and return results
@@ -114,6 +267,10 @@ class BasketballAnalysisApp:
                 "total_shots": len(shot_data),
                 "shots": shot_data,
                 "processing_status": "completed",
+                "profile": {
+                    "wall_seconds": round(time.monotonic() - started, 3),
+                    "stages": stage_timings
+                },
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -127,29 +284,239 @@ class BasketballAnalysisApp:
                 "timestamp": datetime.now().isoformat()
             }
     
-    def save_results(self, results: Dict[str, Any], output_path: str = None) -> str:
+    def save_results(self, results: Dict[str, Any], output_path: str = None, job_id: str = None) -> str:
         """
         Save the analysis results to a JSON file
         
+        The file is written under a temporary name and renamed into place, so
+        readers never see a partial results file.
+        
         Args:
             results (Dict): Analysis results from process_video
             output_path (str): Optional path to save results
+            job_id (str): Job the results belong to, used to keep the default
+                file name unique when several jobs finish in the same second
             
         Returns:
             Path to the saved results file
         """
         if output_path is None:
-            output_path = os.path.join(RESULTS_FOLDER, f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+            suffix = job_id or uuid.uuid4().hex[:12]
+            output_path = os.path.join(
+                RESULTS_FOLDER, f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{suffix}.json"
+            )
             
-        with open(output_path, 'w') as f:
-            json.dump(results, f, indent=2, default=str)
+        started = time.perf_counter()
+        write_json(output_path, results, indent=2, default=str)
+        PROCESS_METRICS.add("json_write", time.perf_counter() - started)
+        self.catalog.add(output_path, results, job_id)
         
         print(f"Results saved to: {output_path}")
         return output_path
+    
+    def find_shot(self, shot_id: str, results_file: str = None, job_id: str = None) -> Dict[str, Any]:
+        """
+        Look up a shot record in the results catalog
+        
+        Args:
+            shot_id: ID of the shot, e.g. "shot_000"
+            results_file: Results file the shot belongs to
+            job_id: Job whose results the shot belongs to
+            
+        Returns:
+            The shot dictionary, or None if it was not found
+            
+        Raises:
+            ValueError: If neither results_file nor job_id is given
+        """
+        filename = os.path.basename(results_file) if results_file is not None else None
+        return self.catalog.find_shot(shot_id, filename, job_id)
+    
+    def render_path(self, shot: Dict[str, Any]) -> str:
+        """Output path of a shot's rendered video, unique to its source, segment and tracking data"""
+        tracking_file = shot["tracking_file"]
+        render_key = json.dumps([
+            shot["source_video"], shot["segment_info"], tracking_file, os.path.getmtime(tracking_file)
+        ], sort_keys=True, default=str)
+        digest = hashlib.sha256(render_key.encode()).hexdigest()[:16]
+        return os.path.join(RENDERS_FOLDER, f"{shot['shot_id']}_{digest}.mp4")
+    
+    async def get_shot_video(self, shot: Dict[str, Any]) -> str:
+        """
+        Path to a shot's tracked video, rendering it first if analysis skipped it
+        
+        Args:
+            shot: Shot dictionary from the results
+            
+        Returns:
+            Path to the tracked video
+        """
+        if shot.get("video_path") and os.path.exists(shot["video_path"]):
+            return shot["video_path"]
+        
+        source_video = shot.get("source_video")
+        if not source_video or not os.path.exists(source_video) or not os.path.exists(shot.get("tracking_file", "")):
+            raise FileNotFoundError(f"No source video or tracking data left to render {shot['shot_id']}")
+        
+        # Renders can take a while; keep the source from looking idle to retention sweeps meanwhile
+        RetentionManager.touch(source_video)
+        output_path = self.render_path(shot)
+        # Requests for the same video wait for one render; different videos render concurrently
+        entry = self.render_locks.setdefault(output_path, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                if not os.path.exists(output_path):
+                    shot_index = int(shot["shot_id"].rsplit("_", 1)[1])
+                    loop = asyncio.get_event_loop()
+                    await loop.run_in_executor(
+                        None, render_shot_video, source_video, shot["segment_info"], shot["tracking_file"],
+                        output_path, shot_index, DECODE_BACKEND
+                    )
+                    print(f"Rendered tracked video: {output_path}")
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.render_locks[output_path]
+        return output_path
+    
+    def retain_source(self, video_path: str, content_hash: str) -> str:
+        """
+        Move an upload into the sources folder so its shots can be rendered later
+        
+        Args:
+            video_path: Path of the upload
+            content_hash: SHA-256 of the upload, used as its name
+            
+        Returns:
+            Path of the retained video
+        """
+        source_path = os.path.join(SOURCES_FOLDER, content_hash + os.path.splitext(video_path)[1].lower())
+        if os.path.exists(source_path):
+            # Same content was uploaded before
+            os.remove(video_path)
+        else:
+            os.replace(video_path, source_path)
+        return source_path
+
+def is_results_file(filename: str) -> bool:
+    """Whether a file in the results folder is a finished results file, not one still being written"""
+    return filename.endswith('.json') and '.tmp' not in filename
 
 # Initialize the basketball analysis app
 basketball_app = BasketballAnalysisApp()
 
+async def run_analysis_job(job: Job) -> Dict[str, Any]:
+    """
+    Process a queued upload and save its results
+    
+    Args:
+        job: The job being run
+        
+    Returns:
+        Summary of the saved results for the job status endpoint
+    """
+    video_path = job.video_path
+    started = time.monotonic()
+    outcome = "failed"
+    try:
+        # Without rendered videos the upload is kept, since the overlay is drawn from it on request
+        if not RENDER_TRACKED_VIDEO and job.content_hash:
+            video_path = basketball_app.retain_source(job.video_path, job.content_hash)
+        
+        # Each job gets its own artifact directory, since shot files are named by index
+        output_dir = os.path.join(TRACKED_DATA_FOLDER, job.job_id)
+        results = await basketball_app.process_video(video_path, job.update_progress, output_dir)
+        
+        if results.get("processing_status") == "failed":
+            raise RuntimeError(results.get("error", "Video processing failed"))
+        
+        # Keep a content-addressed copy so re-uploads of the same clip are answered instantly.
+        # The saved results keep pointing at this job's own artifacts; only cache hits use the
+        # copies, which the cache may evict
+        if job.content_hash:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(
+                None, basketball_app.result_cache.put, basketball_app.cache_key(job.content_hash), results
+            )
+        
+        results_file = basketball_app.save_results(results, job_id=job.job_id)
+        outcome = "completed"
+        return {
+            "total_shots": results["total_shots"],
+            "results_file": results_file,
+            "timestamp": results["timestamp"]
+        }
+    finally:
+        PROCESS_METRICS.record_job(time.monotonic() - started, outcome, job.frames_processed)
+        await cleanup_file(job.video_path)
+
+job_manager = JobManager(run_analysis_job, concurrency=JOB_CONCURRENCY, max_queued=JOB_QUEUE_SIZE)
+
+def job_source_path(job: Job) -> str:
+    """Where retain_source keeps a job's upload"""
+    return os.path.join(SOURCES_FOLDER, job.content_hash + os.path.splitext(job.video_path)[1].lower())
+
+def retention_protected_paths() -> List[str]:
+    """
+    Files the retention sweeps must keep: those of unfinished jobs and sources the cache renders from
+    
+    Pinned jobs are protected by the retention manager itself, since finished
+    jobs are eventually pruned from the job table.
+    """
+    paths = list(basketball_app.result_cache.referenced_sources())
+    for job in job_manager.jobs.values():
+        if job.state in ("queued", "running"):
+            paths.append(job.video_path)
+            paths.append(os.path.join(TRACKED_DATA_FOLDER, job.job_id))
+            if job.content_hash:
+                paths.append(job_source_path(job))
+    return paths
+
+def forget_removed_results(folder: str, path: str):
+    """Drop results files removed by retention sweeps from the catalog"""
+    if folder == RESULTS_FOLDER:
+        basketball_app.catalog.remove(os.path.basename(path))
+
+# The cache folder is not listed, since ResultCache evicts its own entries
+retention_manager = RetentionManager(
+    [
+        retention_rule(UPLOAD_FOLDER, "UPLOADS", "24", "0"),
+        retention_rule(TRACKED_DATA_FOLDER, "TRACKED_DATA", "168", "10240"),
+        retention_rule(RESULTS_FOLDER, "RESULTS", "720", "1024"),
+        retention_rule(SOURCES_FOLDER, "SOURCES", "168", "10240"),
+        retention_rule(RENDERS_FOLDER, "RENDERS", "48", "4096")
+    ],
+    interval_seconds=RETENTION_INTERVAL_SECONDS,
+    protected_paths=retention_protected_paths,
+    grace_seconds=RETENTION_GRACE_SECONDS,
+    on_remove=forget_removed_results
+)
+
+@app.on_event("startup")
+async def start_job_workers():
+    """Index results saved while the app was down, then start the background analysis workers and retention sweeps"""
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(None, basketball_app.catalog.sync, RESULTS_FOLDER, is_results_file)
+    job_manager.start()
+    retention_manager.start()
+
+@app.on_event("shutdown")
+async def shutdown_standardizers():
+    """Stop job workers and retention sweeps, and release pooled MediaPipe models and tracking workers"""
+    await job_manager.stop()
+    await retention_manager.stop()
+    basketball_app.standardizer_pool.close()
+    basketball_app.catalog.close()
+
+def queue_full_error() -> HTTPException:
+    """Build the 429 response sent when the analysis queue is full"""
+    return HTTPException(
+        status_code=429,
+        detail="Analysis queue is full, please retry later",
+        headers={"Retry-After": str(JOB_RETRY_AFTER_SECONDS)}
+    )
+
 @app.get("/", response_class=JSONResponse)
 async def root():
     """Root endpoint with API information"""
@@ -159,23 +526,29 @@ async def root():
         "docs": "/docs",
         "endpoints": {
             "upload": "/upload",
+            "jobs": "/api/jobs/{job_id}",
             "status": "/api/status",
-            "results": "/results/{filename}"
+            "metrics": "/api/metrics",
+            "results": "/results/{filename}",
+            "shot_video": "/api/shots/{shot_id}/video?job_id={job_id}"
         }
     }
 
-@app.post("/upload", response_model=ProcessingResponse)
+@app.post("/upload", response_model=JobSubmissionResponse, status_code=202)
 async def upload_video(
-    background_tasks: BackgroundTasks,
     video: UploadFile = File(...)
 ):
     """
-    Upload and process a basketball video
+    Upload a basketball video and queue it for processing
     
     - **video**: Basketball video file (MP4, AVI, MOV, MKV, WMV, FLV, WEBM)
-    - **Returns**: Processing results with shot analysis
+    - **Returns**: Job ID to poll at /api/jobs/{job_id}
     """
     try:
+        # Reject early when there is no room in the queue
+        if not job_manager.has_capacity():
+            raise queue_full_error()
+        
         # Validate file size
         if video.size and video.size > MAX_FILE_SIZE:
             raise HTTPException(
@@ -195,32 +568,51 @@ async def upload_video(
         unique_filename = f"{uuid.uuid4().hex}_{filename}"
         file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
         
-        # Save uploaded file
-        with open(file_path, "wb") as buffer:
-            content = await video.read()
-            buffer.write(content)
-        
-        # Process the video
-        results = await basketball_app.process_video(file_path)
-        
-        if results.get("processing_status") == "failed":
+        # Stream the upload to disk, rejecting oversized bodies as soon as they cross the limit
+        try:
+            upload_info = await save_upload(video, file_path)
+        except UploadTooLargeError:
             raise HTTPException(
-                status_code=500,
-                detail=results.get("error", "Video processing failed")
+                status_code=413,
+                detail=f"File too large. Maximum size is {MAX_FILE_SIZE / (1024*1024):.0f}MB"
             )
         
-        # Save results to file
-        results_file = basketball_app.save_results(results)
+        # Re-uploads of already analyzed content are answered from the cache
+        cached_results = basketball_app.get_cached_results(upload_info["sha256"])
+        if cached_results is not None:
+            await cleanup_file(file_path)
+            cached_results["original_video"] = file_path
+            cached_results["timestamp"] = datetime.now().isoformat()
+            results_file = basketball_app.save_results(cached_results)
+            PROCESS_METRICS.record_job(0.0, "cached")
+            job = job_manager.add_completed(file_path, filename, {
+                "total_shots": cached_results["total_shots"],
+                "results_file": results_file,
+                "timestamp": cached_results["timestamp"],
+                "cached": True
+            }, content_hash=upload_info["sha256"])
+            basketball_app.catalog.assign_job(os.path.basename(results_file), job.job_id)
+            return JobSubmissionResponse(
+                status="completed",
+                message="Video already analyzed, results served from cache",
+                job_id=job.job_id,
+                status_url=f"/api/jobs/{job.job_id}",
+                timestamp=job.created
+            )
         
-        # Clean up uploaded video file in background
-        background_tasks.add_task(cleanup_file, file_path)
+        # Queue the video for processing
+        try:
+            job = job_manager.submit(file_path, filename, content_hash=upload_info["sha256"])
+        except QueueFullError:
+            await cleanup_file(file_path)
+            raise queue_full_error()
         
-        return ProcessingResponse(
-            status="success",
-            message="Video processed successfully",
-            total_shots=results["total_shots"],
-            results_file=results_file,
-            timestamp=results["timestamp"]
+        return JobSubmissionResponse(
+            status="queued",
+            message="Video queued for processing",
+            job_id=job.job_id,
+            status_url=f"/api/jobs/{job.job_id}",
+            timestamp=job.created
         )
         
     except HTTPException:
@@ -228,6 +620,55 @@ async def upload_video(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/jobs/{job_id}", response_class=JSONResponse)
+async def get_job_status(job_id: str):
+    """
+    Get the state and progress of an analysis job
+    
+    - **job_id**: ID returned by /upload
+    - **Returns**: Job state, phase and percent done across detection and tracking, per-shot completion and results once done
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {**job.to_dict(), "pinned": retention_manager.is_pinned(job_id)}
+
+@app.put("/api/jobs/{job_id}/pin", response_class=JSONResponse)
+async def pin_job(job_id: str):
+    """
+    Keep a job's tracked data, results and source video out of retention sweeps
+    
+    Jobs pruned from the job table can still be pinned while their results or
+    tracked data exist.
+    
+    - **job_id**: ID returned by /upload
+    - **Returns**: Pin confirmation
+    """
+    # Pins match entry names, so only well-formed job ids (uuid4 hex) are accepted
+    if len(job_id) != 32 or any(c not in "0123456789abcdef" for c in job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # Tracked data and results are named after the job; the source video is recorded with the pin
+    paths = basketball_app.catalog.job_paths(job_id)
+    job = job_manager.get(job_id)
+    if job is not None and job.content_hash:
+        paths.append(job_source_path(job))
+    if job is None and not paths and not os.path.isdir(os.path.join(TRACKED_DATA_FOLDER, job_id)):
+        raise HTTPException(status_code=404, detail="Job not found")
+    retention_manager.pin(job_id, paths)
+    return {"job_id": job_id, "pinned": True}
+
+@app.delete("/api/jobs/{job_id}/pin", response_class=JSONResponse)
+async def unpin_job(job_id: str):
+    """
+    Let a pinned job's artifacts expire normally again
+    
+    - **job_id**: ID returned by /upload
+    - **Returns**: Unpin confirmation
+    """
+    retention_manager.unpin(job_id)
+    return {"job_id": job_id, "pinned": False}
+
 async def cleanup_file(file_path: str):
     """Clean up uploaded file after processing"""
     try:
@@ -248,6 +689,7 @@ async def download_results(filename: str):
     try:
         file_path = os.path.join(RESULTS_FOLDER, filename)
         if os.path.exists(file_path):
+            retention_manager.touch(file_path)
             return FileResponse(
                 path=file_path,
                 filename=filename,
@@ -270,29 +712,132 @@ async def api_status():
         "results_folder": RESULTS_FOLDER,
         "tracked_data_folder": TRACKED_DATA_FOLDER,
         "max_file_size_mb": MAX_FILE_SIZE / (1024*1024),
-        "allowed_extensions": list(ALLOWED_EXTENSIONS)
+        "allowed_extensions": list(ALLOWED_EXTENSIONS),
+        "single_pass_decode": SINGLE_PASS_DECODE,
+        "tracking_workers": TRACKING_WORKERS,
+        "ball_roi_search": BALL_ROI_SEARCH,
+        "hand_crops": HAND_CROPS,
+        "keyframe_interval": KEYFRAME_INTERVAL,
+        "inference_height": INFERENCE_HEIGHT,
+        "render_tracked_video": RENDER_TRACKED_VIDEO,
+        "decode_backend": DECODE_BACKEND,
+        "decode_read_ahead": DECODE_READ_AHEAD,
+        "decode_backends_available": available_backends(),
+        "profiling": PROCESS_METRICS.summary(),
+        "standardizer_pool": basketball_app.standardizer_pool.metrics(),
+        "jobs": job_manager.stats(),
+        "result_cache": basketball_app.result_cache.stats(),
+        "retention": retention_manager.stats()
     }
 
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def api_metrics():
+    """Stage latency histograms, job counters and queue gauges in the Prometheus text format"""
+    jobs = job_manager.stats()
+    pool = basketball_app.standardizer_pool.metrics()
+    cache = basketball_app.result_cache.stats()
+    retention = retention_manager.stats()
+    lines = PROCESS_METRICS.prometheus()
+    lines.extend(metric_lines("swishscan_jobs_queued", "gauge", "Jobs waiting for a worker", [({}, jobs["queued"])]))
+    lines.extend(metric_lines("swishscan_jobs_running", "gauge", "Jobs being analyzed", [({}, jobs["running"])]))
+    lines.extend(metric_lines("swishscan_standardizers_in_use", "gauge", "Pooled standardizers checked out",
+                              [({}, pool["in_use"])]))
+    lines.extend(metric_lines("swishscan_standardizer_wait_seconds_max", "gauge",
+                              "Longest wait for a pooled standardizer", [({}, pool["max_wait_seconds"])]))
+    lines.extend(metric_lines("swishscan_result_cache_lookups_total", "counter", "Result cache lookups",
+                              [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])]))
+    lines.extend(metric_lines("swishscan_result_cache_bytes", "gauge", "Size of the result cache",
+                              [({}, cache["size_bytes"])]))
+    lines.extend(metric_lines("swishscan_retention_reclaimed_bytes_total", "counter",
+                              "Bytes removed by retention sweeps", [({}, retention["reclaimed_bytes"])]))
+    lines.extend(metric_lines("swishscan_folder_bytes", "gauge", "Size of each managed folder at the last sweep",
+                              [({"folder": folder}, usage["bytes"]) for folder, usage in retention["usage"].items()]))
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
 @app.get("/api/shots", response_class=JSONResponse)
-async def list_processed_shots():
-    """List all processed shot analysis files"""
+async def list_processed_shots(limit: int = SHOTS_PAGE_SIZE, cursor: str = None, sort: str = "created",
+                               order: str = "desc", min_shots: int = None, max_shots: int = None,
+                               since: str = None, until: str = None):
+    """
+    List processed shot analysis files, one page at a time
+    
+    - **limit**: Page size (at most 500)
+    - **cursor**: next_cursor from the previous page
+    - **sort**: created, total_shots, total_duration or max_motion
+    - **order**: desc or asc
+    - **min_shots** / **max_shots**: Filter on the number of shots
+    - **since** / **until**: Filter on creation time (ISO 8601)
+    - **Returns**: The page of files, the total number of files and the cursor of the next page
+    """
     try:
-        files = []
-        for filename in os.listdir(RESULTS_FOLDER):
-            if filename.endswith('.json'):
-                file_path = os.path.join(RESULTS_FOLDER, filename)
-                stat = os.stat(file_path)
-                files.append({
-                    "filename": filename,
-                    "size_bytes": stat.st_size,
-                    "created": datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                    "modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
-                })
+        rows, next_cursor = basketball_app.catalog.query(
+            limit=max(1, min(limit, SHOTS_MAX_PAGE_SIZE)),
+            cursor=cursor,
+            sort=sort,
+            descending=order != "asc",
+            min_shots=min_shots,
+            max_shots=max_shots,
+            since=datetime.fromisoformat(since).timestamp() if since else None,
+            until=datetime.fromisoformat(until).timestamp() if until else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    files = []
+    for row in rows:
+        created = datetime.fromtimestamp(row["created"]).isoformat()
+        files.append({
+            "filename": row["filename"],
+            "job_id": row["job_id"],
+            "size_bytes": row["size_bytes"],
+            "created": created,
+            "modified": created,
+            "total_shots": row["total_shots"],
+            "total_duration": row["total_duration"],
+            "max_motion": row["max_motion"],
+            "avg_motion": row["avg_motion"],
+            "wall_seconds": row["wall_seconds"],
+            "original_video": row["original_video"]
+        })
+    
+    return {
+        "total_files": basketball_app.catalog.count(),
+        "files": files,
+        "next_cursor": next_cursor
+    }
+
+@app.get("/api/shots/{shot_id}/video")
+async def get_shot_video(shot_id: str, results_file: str = None, job_id: str = None):
+    """
+    Download the tracked video of a shot, rendering it on first request
+    
+    Shot IDs repeat across analyses, so the results file or job is required.
+    
+    - **shot_id**: ID of the shot, e.g. shot_000
+    - **results_file**: Results file the shot belongs to
+    - **job_id**: Job the shot belongs to (alternative to results_file)
+    - **Returns**: The tracked MP4
+    """
+    if results_file is None and job_id is None:
+        raise HTTPException(status_code=400, detail="results_file or job_id is required")
+    try:
+        shot = basketball_app.find_shot(shot_id, results_file, job_id)
+        if shot is None:
+            raise HTTPException(status_code=404, detail="Shot not found")
         
-        return {
-            "total_files": len(files),
-            "files": sorted(files, key=lambda x: x["modified"], reverse=True)
-        }
+        try:
+            video_path = await basketball_app.get_shot_video(shot)
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=410, detail=str(e))
+        
+        retention_manager.touch(video_path)
+        return FileResponse(
+            path=video_path,
+            filename=f"{shot_id}_tracked.mp4",
+            media_type='video/mp4'
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -308,6 +853,7 @@ async def delete_results(filename: str):
         file_path = os.path.join(RESULTS_FOLDER, filename)
         if os.path.exists(file_path):
             os.remove(file_path)
+            basketball_app.catalog.remove(filename)
             return {"message": f"File {filename} deleted successfully"}
         else:
             raise HTTPException(status_code=404, detail="Results file not found")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark the merged-mask ball segmentation against the per-range detector
+
+Runs both color detectors on sampled frames of the bundled clips and reports
+per-frame cost, detection rate and how often both agree on the position.
+
+    python benchmarks/ball_detection.py --data-dir data --frame-step 5
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pre_analysis.ball_detector import BALL_COLOR_RANGES, BallSegmenter
+
+
+def legacy_best_contour(hsv):
+    """The original detector: one mask, morphology and contour pass per color range"""
+    best_contour = None
+    best_score = 0
+    for lower, upper in BALL_COLOR_RANGES:
+        mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if 200 < area < 5000:
+                perimeter = cv2.arcLength(contour, True)
+                if perimeter > 0:
+                    score = 4 * np.pi * area / (perimeter * perimeter) * (area / 1000)
+                    if score > best_score:
+                        best_score = score
+                        best_contour = contour
+    return best_contour, best_score
+
+
+def contour_center(contour):
+    if contour is None:
+        return None
+    M = cv2.moments(contour)
+    if M["m00"] == 0:
+        return None
+    return (M["m10"] / M["m00"], M["m01"] / M["m00"])
+
+
+def benchmark_clip(video_path, segmenter, frame_step, max_frames, agree_pixels):
+    stats = {"frames": 0, "legacy_seconds": 0.0, "merged_seconds": 0.0,
+             "legacy_detections": 0, "merged_detections": 0, "agreements": 0}
+
+    cap = cv2.VideoCapture(video_path)
+    frame_idx = 0
+    while stats["frames"] < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame_idx += 1
+        if (frame_idx - 1) % frame_step != 0:
+            continue
+
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+
+        start = time.perf_counter()
+        legacy = contour_center(legacy_best_contour(hsv)[0])
+        stats["legacy_seconds"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        merged = contour_center(segmenter.best_contour(hsv)[0])
+        stats["merged_seconds"] += time.perf_counter() - start
+
+        stats["frames"] += 1
+        stats["legacy_detections"] += legacy is not None
+        stats["merged_detections"] += merged is not None
+        if legacy is None and merged is None:
+            stats["agreements"] += 1
+        elif legacy is not None and merged is not None:
+            stats["agreements"] += np.hypot(legacy[0] - merged[0], legacy[1] - merged[1]) <= agree_pixels
+
+    cap.release()
+    return stats
+
+
+def print_row(name, stats):
+    frames = max(1, stats["frames"])
+    legacy_ms = 1000 * stats["legacy_seconds"] / frames
+    merged_ms = 1000 * stats["merged_seconds"] / frames
+    speedup = legacy_ms / merged_ms if merged_ms else 0.0
+    print(f"{name:40s} {stats['frames']:6d} {legacy_ms:10.2f} {merged_ms:10.2f} {speedup:7.1f}x "
+          f"{stats['legacy_detections'] / frames:10.1%} {stats['merged_detections'] / frames:10.1%} "
+          f"{stats['agreements'] / frames:6.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default="data", help="Directory with the .mp4 clips")
+    parser.add_argument("--frame-step", type=int, default=5, help="Benchmark every Nth frame")
+    parser.add_argument("--max-frames", type=int, default=200, help="Maximum sampled frames per clip")
+    parser.add_argument("--agree-pixels", type=float, default=15.0,
+                        help="Maximum distance for both detectors to count as agreeing")
+    args = parser.parse_args()
+
+    clips = sorted(glob.glob(os.path.join(args.data_dir, "*.mp4")))
+    if not clips:
+        print(f"No .mp4 clips found in {args.data_dir}")
+        return 1
+
+    segmenter = BallSegmenter()
+    totals = {}
+    print(f"{'clip':40s} {'frames':>6s} {'legacy ms':>10s} {'merged ms':>10s} {'speedup':>8s} "
+          f"{'legacy det':>10s} {'merged det':>10s} {'agree':>6s}")
+    for clip in clips:
+        stats = benchmark_clip(clip, segmenter, max(1, args.frame_step), args.max_frames, args.agree_pixels)
+        for key, value in stats.items():
+            totals[key] = totals.get(key, 0) + value
+        print_row(os.path.basename(clip)[:40], stats)
+
+    print("-" * 108)
+    print_row("total", totals)
+
+    if totals["merged_detections"] < totals["legacy_detections"]:
+        print("Merged detector finds the ball in fewer frames than the per-range detector")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
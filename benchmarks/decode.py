@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Benchmark the decode backends against a plain cv2.VideoCapture loop
+
+For every bundled clip this measures sequential decode throughput, the same
+decode with a fixed amount of simulated per-frame work (to show how much the
+threaded read-ahead hides), and random segment seeks. Seek accuracy is
+checked against frames decoded sequentially from the start.
+
+    python benchmarks/decode.py --data-dir data --backend auto --work-ms 5
+"""
+
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pre_analysis.decoder import get_index, open_decoder, resolve_backend
+
+
+def simulate_work(work_ms):
+    """Stand in for per-frame inference, releasing the GIL like OpenCV and MediaPipe calls do"""
+    if work_ms <= 0:
+        return
+    deadline = time.perf_counter() + work_ms / 1000
+    while time.perf_counter() < deadline:
+        time.sleep(0)
+
+
+def plain_capture_loop(video_path, max_frames, work_ms):
+    start = time.perf_counter()
+    cap = cv2.VideoCapture(video_path)
+    frames = 0
+    while frames < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        simulate_work(work_ms)
+        frames += 1
+    cap.release()
+    return frames, time.perf_counter() - start
+
+
+def decoder_loop(video_path, backend, read_ahead, max_frames, work_ms):
+    start = time.perf_counter()
+    frames = 0
+    with open_decoder(video_path, backend, read_ahead=read_ahead) as decoder:
+        for _, frame in decoder.frames(0, max_frames - 1):
+            simulate_work(work_ms)
+            frames += 1
+    return frames, time.perf_counter() - start
+
+
+def reference_frames(video_path, backend, frame_numbers):
+    """Checksums of the requested frames, decoded sequentially from the start"""
+    wanted = set(frame_numbers)
+    checksums = {}
+    with open_decoder(video_path, backend) as decoder:
+        for frame_idx, frame in decoder.frames(0, max(frame_numbers)):
+            if frame_idx in wanted:
+                checksums[frame_idx] = frame_checksum(frame)
+    return checksums
+
+
+def frame_checksum(frame):
+    return int(frame[::8, ::8].astype(np.int64).sum())
+
+
+def seek_benchmark(video_path, backend, seeks, segment_frames, seed):
+    """Time random segment reads and count how many land on the right frame"""
+    frame_count = get_index(video_path).frame_count
+    if frame_count <= segment_frames:
+        return None
+
+    rng = random.Random(seed)
+    starts = [rng.randrange(0, frame_count - segment_frames) for _ in range(seeks)]
+    expected = reference_frames(video_path, backend, starts)
+
+    capture_hits = 0
+    capture_seconds = 0.0
+    decoder_hits = 0
+    decoder_seconds = 0.0
+    for start_frame in starts:
+        # What the standardizer used to do: CAP_PROP_POS_FRAMES on a fresh capture
+        t0 = time.perf_counter()
+        cap = cv2.VideoCapture(video_path)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        ret, frame = cap.read()
+        for _ in range(segment_frames - 1):
+            cap.grab()
+        cap.release()
+        capture_seconds += time.perf_counter() - t0
+        capture_hits += ret and frame_checksum(frame) == expected.get(start_frame)
+
+        t0 = time.perf_counter()
+        with open_decoder(video_path, backend) as decoder:
+            first = None
+            for frame_idx, frame in decoder.frames(start_frame, start_frame + segment_frames - 1):
+                if first is None:
+                    first = frame
+        decoder_seconds += time.perf_counter() - t0
+        decoder_hits += first is not None and frame_checksum(first) == expected.get(start_frame)
+
+    return {"seeks": len(starts), "capture_seconds": capture_seconds, "capture_hits": capture_hits,
+            "decoder_seconds": decoder_seconds, "decoder_hits": decoder_hits}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default="data", help="Directory with the .mp4 clips")
+    parser.add_argument("--backend", default="auto", help="Decode backend to compare (opencv, pyav or auto)")
+    parser.add_argument("--read-ahead", type=int, default=16, help="Read-ahead queue size for the threaded run")
+    parser.add_argument("--max-frames", type=int, default=600, help="Maximum frames decoded per clip")
+    parser.add_argument("--work-ms", type=float, default=5.0, help="Simulated per-frame inference time")
+    parser.add_argument("--seeks", type=int, default=10, help="Random segment seeks per clip")
+    parser.add_argument("--segment-frames", type=int, default=30, help="Frames read after each seek")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    clips = sorted(glob.glob(os.path.join(args.data_dir, "*.mp4")))
+    if not clips:
+        print(f"No .mp4 clips found in {args.data_dir}")
+        return 1
+
+    backend = resolve_backend(args.backend)
+    print(f"Backend: {backend}, read-ahead {args.read_ahead}, simulated work {args.work_ms} ms/frame")
+    print(f"{'clip':32s} {'frames':>6s} {'capture fps':>11s} {'decoder fps':>11s} "
+          f"{'capture+work':>12s} {'read-ahead+work':>15s} {'seek hits':>12s} {'seek ms':>15s}")
+
+    failures = 0
+    for clip in clips:
+        t0 = time.perf_counter()
+        get_index(clip)
+        index_seconds = time.perf_counter() - t0
+
+        frames, capture_seconds = plain_capture_loop(clip, args.max_frames, 0)
+        _, decoder_seconds = decoder_loop(clip, backend, 0, args.max_frames, 0)
+        _, capture_work_seconds = plain_capture_loop(clip, args.max_frames, args.work_ms)
+        _, read_ahead_seconds = decoder_loop(clip, backend, args.read_ahead, args.max_frames, args.work_ms)
+        seeks = seek_benchmark(clip, backend, args.seeks, args.segment_frames, args.seed)
+
+        row = (f"{os.path.basename(clip)[:32]:32s} {frames:6d} {frames / capture_seconds:11.1f} "
+               f"{frames / decoder_seconds:11.1f} {capture_work_seconds:11.2f}s {read_ahead_seconds:14.2f}s")
+        if seeks is None:
+            row += f" {'-':>12s} {'-':>15s}"
+        else:
+            row += (f" {seeks['capture_hits']:>5d}/{seeks['decoder_hits']:<2d}/{seeks['seeks']:<3d}"
+                    f" {1000 * seeks['capture_seconds'] / seeks['seeks']:7.1f}/"
+                    f"{1000 * seeks['decoder_seconds'] / seeks['seeks']:<7.1f}")
+            failures += seeks["decoder_hits"] < seeks["seeks"]
+        print(row + f"  (index {1000 * index_seconds:.0f} ms)")
+
+    print("seek hits and seek ms are capture/decoder")
+    if failures:
+        print(f"Decoder seeks missed the requested frame on {failures} clip(s)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
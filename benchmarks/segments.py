@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Check that the online shot segmenter matches the batch detector it replaced
+
+For every bundled clip the full-resolution motion scores are computed once
+and fed both to OnlineShotSegmenter and to a copy of the original batch
+_find_shot_boundaries, and the segments must have identical start and end
+frames. Random score sequences built around the threshold and the adaptive
+fallback cover the cases the clips don't hit; --synthetic-only runs just
+those, without OpenCV.
+
+    python benchmarks/segments.py --data-dir data
+    python benchmarks/segments.py --synthetic-only --synthetic 5000
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pre_analysis.segmenter import OnlineShotSegmenter
+
+# VideoStandardizer defaults
+MOTION_THRESHOLD = 0.05
+MIN_SHOT_DURATION = 0.5
+MAX_SHOT_DURATION = 15.0
+
+
+def baseline_segments(motion_scores, fps, motion_threshold, min_shot_duration, max_shot_duration):
+    """The batch _find_shot_boundaries from before the online segmenter, without its logging"""
+    min_frames = int(min_shot_duration * fps)
+    max_frames = int(max_shot_duration * fps)
+
+    high_motion_frames = [i for i, score in enumerate(motion_scores) if score > motion_threshold]
+    if not high_motion_frames:
+        return [{"start_frame": 0, "end_frame": len(motion_scores) - 1}]
+
+    if len(high_motion_frames) < 10:
+        adaptive_threshold = max(motion_scores) * 0.5
+        high_motion_frames = [i for i, score in enumerate(motion_scores) if score > adaptive_threshold]
+
+    groups = []
+    start = high_motion_frames[0]
+    for prev, current in zip(high_motion_frames, high_motion_frames[1:]):
+        if current - prev > 2 * fps:
+            groups.append((start, prev))
+            start = current
+    groups.append((start, high_motion_frames[-1]))
+
+    padding_frames = int(0.5 * fps)
+    segments = [
+        {"start_frame": max(0, start - padding_frames), "end_frame": min(len(motion_scores) - 1, end + padding_frames)}
+        for start, end in groups
+        if min_frames <= end - start <= max_frames
+    ]
+    if not segments:
+        max_motion_idx = max(range(len(motion_scores)), key=lambda i: (motion_scores[i], -i))
+        segment_duration = int(3 * fps)
+        segments.append({
+            "start_frame": max(0, max_motion_idx - segment_duration // 2),
+            "end_frame": min(len(motion_scores) - 1, max_motion_idx + segment_duration // 2)
+        })
+    return segments
+
+
+def online_segments(motion_scores, fps, motion_threshold, min_shot_duration, max_shot_duration):
+    segmenter = OnlineShotSegmenter(fps, motion_threshold, min_shot_duration, max_shot_duration)
+    segments = []
+    for score in motion_scores:
+        segments.extend(OnlineShotSegmenter.segments_in(segmenter.push(score)))
+    segments.extend(OnlineShotSegmenter.segments_in(segmenter.finish()))
+    # Confirmed segments are emitted late, so compare in time order
+    return sorted(segments, key=lambda segment: segment["start_frame"])
+
+
+def boundaries(segments):
+    return [(segment["start_frame"], segment["end_frame"]) for segment in segments]
+
+
+def compare(motion_scores, fps, **settings):
+    """Baseline and online boundaries, and whether they agree"""
+    settings = {"motion_threshold": MOTION_THRESHOLD, "min_shot_duration": MIN_SHOT_DURATION,
+                "max_shot_duration": MAX_SHOT_DURATION, **settings}
+    expected = boundaries(baseline_segments(motion_scores, fps, **settings))
+    # The segmenter logs every segment it closes
+    with contextlib.redirect_stdout(io.StringIO()):
+        actual = boundaries(online_segments(motion_scores, fps, **settings))
+    return expected, actual, expected == actual
+
+
+def clip_scores(video_path):
+    """Full-resolution motion scores of every frame, the first one scored 0.0"""
+    import cv2
+    from pre_analysis.motion import MotionScorer
+
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    scorer = MotionScorer()
+    scores = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        scores.extend(scorer.push(frame))
+    cap.release()
+    scores.extend(scorer.flush())
+    return scores, fps
+
+
+def synthetic_scores(rng):
+    """A score sequence with a few bursts of motion, often too few to pass the threshold"""
+    length = rng.randrange(1, 900)
+    base = rng.choice([0.0, 0.005, 0.02])
+    scores = [rng.uniform(0, base) for _ in range(length)]
+    for _ in range(rng.randrange(0, 6)):
+        start = rng.randrange(length)
+        peak = rng.choice([0.03, 0.06, 0.2])
+        for i in range(start, min(length, start + rng.randrange(1, 120))):
+            if rng.random() < rng.choice([0.05, 0.3, 0.9]):
+                scores[i] = rng.uniform(0, peak)
+    if scores:
+        scores[0] = 0.0
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default="data", help="Directory with the .mp4 clips")
+    parser.add_argument("--synthetic", type=int, default=2000, help="Random score sequences to compare")
+    parser.add_argument("--synthetic-only", action="store_true", help="Skip the clips (no OpenCV needed)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    failures = 0
+    if not args.synthetic_only:
+        clips = sorted(glob.glob(os.path.join(args.data_dir, "*.mp4")))
+        if not clips:
+            print(f"No .mp4 clips found in {args.data_dir}")
+            return 1
+        for clip in clips:
+            scores, fps = clip_scores(clip)
+            expected, actual, match = compare(scores, fps)
+            failures += not match
+            print(f"{os.path.basename(clip)[:32]:32s} {len(scores):6d} frames  "
+                  f"{'match' if match else 'MISMATCH'}  baseline {expected}  online {actual}")
+
+    rng = random.Random(args.seed)
+    synthetic_failures = 0
+    for case in range(args.synthetic):
+        scores = synthetic_scores(rng)
+        fps = rng.choice([24.0, 29.97, 30.0, 60.0])
+        expected, actual, match = compare(scores, fps)
+        if not match:
+            synthetic_failures += 1
+            if synthetic_failures <= 5:
+                print(f"Synthetic case {case} ({len(scores)} frames at {fps} fps): "
+                      f"baseline {expected}  online {actual}")
+    print(f"Synthetic: {args.synthetic - synthetic_failures}/{args.synthetic} match")
+    failures += synthetic_failures
+
+    if failures:
+        print(f"Online segments differ from the baseline in {failures} case(s)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
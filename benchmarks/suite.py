@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark suite over the bundled free-throw clips
+
+Runs VideoStandardizer.standardize_video and each pipeline stage in isolation
+over data/*.mp4 and over synthetic long videos made by concatenating the
+clips. Every case runs in its own subprocess so peak RSS is per case. Reports
+frames/sec, peak RSS, time to first shot and segment counts, and compares
+them against a baseline file.
+
+    python benchmarks/suite.py --write-baseline       # record benchmarks/baseline.json
+    python benchmarks/suite.py                        # compare, exit 1 on regression
+    python benchmarks/suite.py --settings '{"single_pass": true}' --cases full
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+BENCHMARK_DIR = os.path.join(REPO_DIR, "benchmarks")
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+SYNTHETIC_DIR = os.path.join(BENCHMARK_DIR, ".synthetic")
+
+CASES = ("full", "decode", "motion", "landmarks", "ball")
+STAGE_FRAME_LIMIT = 300  # Frames per clip for the stage-in-isolation cases
+
+
+def build_long_video(clips, repeats, height=720):
+    """
+    Concatenate the clips into one long video, reusing a previous build
+
+    Every clip is resized to a common height so they share one stream. The
+    file name hashes the inputs, so changing the corpus rebuilds it.
+
+    Args:
+        clips: Paths of the clips, in order
+        repeats: How many times the whole corpus is repeated
+        height: Frame height of the synthetic video
+
+    Returns:
+        Path to the synthetic video
+    """
+    import cv2
+
+    digest = hashlib.sha256()
+    for clip in clips:
+        stat = os.stat(clip)
+        digest.update(f"{os.path.basename(clip)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    digest.update(f"{repeats}:{height}".encode())
+    output_path = os.path.join(SYNTHETIC_DIR, f"long_x{repeats}_{digest.hexdigest()[:12]}.mp4")
+    if os.path.exists(output_path):
+        return output_path
+
+    os.makedirs(SYNTHETIC_DIR, exist_ok=True)
+    width = height * 16 // 9
+    tmp_path = output_path + ".tmp.mp4"
+    out = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*'mp4v'), 30, (width, height))
+    for _ in range(repeats):
+        for clip in clips:
+            cap = cv2.VideoCapture(clip)
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                out.write(cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA))
+            cap.release()
+    out.release()
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_full(video_path, settings):
+    from pre_analysis.standardizer import VideoStandardizer
+    from pre_analysis.decoder import get_index
+
+    standardizer = VideoStandardizer(**settings)
+    first_shot = {}
+    started = time.perf_counter()
+
+    def on_progress(update):
+        if update.get("kind") == "shot_completed" and update.get("ok") and "seconds" not in first_shot:
+            first_shot["seconds"] = time.perf_counter() - started
+
+    try:
+        shots = standardizer.standardize_video(video_path, on_progress)
+    finally:
+        standardizer.cleanup()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "frames": get_index(video_path).frame_count,
+        "seconds": elapsed,
+        "time_to_first_shot": first_shot.get("seconds"),
+        "shots": len(shots),
+        "segments": [[shot["segment_info"]["start_frame"], shot["segment_info"]["end_frame"]] for shot in shots],
+        "stage_timings": standardizer.job_timings.as_dict()
+    }
+
+
+def run_stage(case, video_path, settings):
+    """Time one stage on decoded frames, excluding the decode itself (except for the decode case)"""
+    from pre_analysis.decoder import open_decoder
+
+    backend = settings.get("decode_backend", "auto")
+    if case == "decode":
+        started = time.perf_counter()
+        frames = 0
+        with open_decoder(video_path, backend, read_ahead=settings.get("decode_read_ahead", 0)) as decoder:
+            for _ in decoder.frames(reuse_buffers=True):
+                frames += 1
+        return {"frames": frames, "seconds": time.perf_counter() - started}
+
+    with open_decoder(video_path, backend) as decoder:
+        frames = [frame for _, frame in decoder.frames(0, STAGE_FRAME_LIMIT - 1)]
+
+    if case == "motion":
+        from pre_analysis.motion import MotionScorer
+
+        scorer = MotionScorer(downscale=settings.get("motion_downscale", 1.0),
+                              stride=settings.get("motion_stride", 1),
+                              batch_size=settings.get("motion_batch_size", 1),
+                              target_height=settings.get("inference_height"))
+        started = time.perf_counter()
+        for frame in frames:
+            scorer.push(frame)
+        scorer.flush()
+        return {"frames": len(frames), "seconds": time.perf_counter() - started}
+
+    from pre_analysis.standardizer import VideoStandardizer
+
+    standardizer = VideoStandardizer(**settings)
+    try:
+        standardizer._reset_shot_tracking()
+        inference_frames = [standardizer.resizer.prepare(frame).copy() for frame in frames]
+        started = time.perf_counter()
+        if case == "landmarks":
+            for frame in inference_frames:
+                standardizer.landmark_tracker.process(frame)
+        else:
+            for frame in inference_frames:
+                standardizer._detect_ball(frame)
+        return {"frames": len(frames), "seconds": time.perf_counter() - started}
+    finally:
+        standardizer.cleanup()
+
+
+def run_case(case, video_path, settings):
+    """Run one case in this process and return its measurements"""
+    # The standardizer writes tracked_data/ relative to the working directory
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="swishscan-bench-") as workdir:
+        os.chdir(workdir)
+        try:
+            if case == "full":
+                result = run_full(video_path, settings)
+            else:
+                result = run_stage(case, video_path, settings)
+        finally:
+            os.chdir(cwd)
+
+    result["fps"] = result["frames"] / result["seconds"] if result["seconds"] else 0.0
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_case_subprocess(case, video_path, settings, timeout):
+    command = [sys.executable, os.path.abspath(__file__), "--run-case", case, "--video", video_path,
+               "--settings", json.dumps(settings)]
+    completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout, cwd=REPO_DIR)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{case} on {os.path.basename(video_path)} failed:\n{completed.stderr[-2000:]}")
+    # The last line is the JSON result; everything before it is pipeline logging
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, fps_threshold, rss_threshold, first_shot_threshold):
+    """
+    Compare a run against the baseline
+
+    Returns:
+        List of regression messages, empty when nothing regressed
+    """
+    regressions = []
+    for key, result in results.items():
+        reference = baseline["results"].get(key)
+        if reference is None:
+            continue
+
+        if reference["fps"] and result["fps"] < reference["fps"] * (1 - fps_threshold):
+            regressions.append(f"{key}: {result['fps']:.1f} fps vs {reference['fps']:.1f} baseline")
+        if reference["peak_rss_mb"] and result["peak_rss_mb"] > reference["peak_rss_mb"] * (1 + rss_threshold):
+            regressions.append(f"{key}: peak RSS {result['peak_rss_mb']:.0f} MB vs "
+                               f"{reference['peak_rss_mb']:.0f} MB baseline")
+        if "shots" in reference and result.get("shots") != reference["shots"]:
+            regressions.append(f"{key}: {result.get('shots')} shots vs {reference['shots']} baseline")
+
+        first, reference_first = result.get("time_to_first_shot"), reference.get("time_to_first_shot")
+        if first is not None and reference_first and first > reference_first * (1 + first_shot_threshold):
+            regressions.append(f"{key}: first shot after {first:.2f}s vs {reference_first:.2f}s baseline")
+    return regressions
+
+
+def print_row(key, result, reference):
+    delta = ""
+    if reference and reference.get("fps"):
+        delta = f"{100 * (result['fps'] / reference['fps'] - 1):+6.1f}%"
+    first = result.get("time_to_first_shot")
+    print(f"{key:58s} {result['frames']:7d} {result['fps']:9.1f} {delta:>8s} {result['peak_rss_mb']:8.0f} "
+          f"{'-' if first is None else f'{first:.2f}':>8s} {str(result.get('shots', '-')):>5s}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=os.path.join(REPO_DIR, "data"), help="Directory with the .mp4 clips")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"Comma-separated subset of {', '.join(CASES)}")
+    parser.add_argument("--settings", default="{}", help="VideoStandardizer keyword arguments as JSON")
+    parser.add_argument("--long-repeats", type=int, default=2,
+                        help="Times the corpus is repeated in the synthetic long video (0 skips it)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file to compare against or write")
+    parser.add_argument("--write-baseline", action="store_true", help="Record this run as the baseline")
+    parser.add_argument("--fps-threshold", type=float, default=0.15, help="Allowed fractional fps drop")
+    parser.add_argument("--rss-threshold", type=float, default=0.25, help="Allowed fractional peak RSS growth")
+    parser.add_argument("--first-shot-threshold", type=float, default=0.25,
+                        help="Allowed fractional time-to-first-shot growth")
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds allowed per case")
+    parser.add_argument("--output", help="Also write this run's results to this JSON file")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--video", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    settings = json.loads(args.settings)
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.video, settings)))
+        return 0
+
+    # Absolute paths, since each case runs in its own working directory
+    clips = sorted(os.path.abspath(clip) for clip in glob.glob(os.path.join(args.data_dir, "*.mp4")))
+    if not clips:
+        print(f"No .mp4 clips found in {args.data_dir}")
+        return 1
+    videos = list(clips)
+    if args.long_repeats > 0:
+        videos.append(build_long_video(clips, args.long_repeats))
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.write_baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != settings:
+            print(f"Warning: baseline was recorded with settings {baseline.get('settings')}")
+
+    cases = [case.strip() for case in args.cases.split(",") if case.strip()]
+    print(f"{'case':58s} {'frames':>7s} {'fps':>9s} {'vs base':>8s} {'rss MB':>8s} {'1st shot':>8s} {'shots':>5s}")
+    results = {}
+    for case in cases:
+        for video in videos:
+            key = f"{case}/{os.path.basename(video)}"
+            results[key] = run_case_subprocess(case, video, settings, args.timeout)
+            print_row(key, results[key], baseline["results"].get(key) if baseline else None)
+
+    run = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "processor": platform.processor(), "cpus": os.cpu_count()},
+        "settings": settings,
+        "results": results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(run, f, indent=2)
+
+    if args.write_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --write-baseline to record one")
+        return 0
+
+    regressions = compare(results, baseline, args.fps_threshold, args.rss_threshold, args.first_shot_threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,7 @@ Client script for testing SwishScan FastAPI endpoints
 import requests
 import json
 import os
+import time
 from pathlib import Path
 
 class SwishScanClient:
@@ -25,18 +26,27 @@ class SwishScanClient:
             print(f"Connection error: {e}")
             return None
     
-    def upload_video(self, video_path):
-        """Upload and process a video"""
+    def upload_video(self, video_path, max_retries=3):
+        """Upload a video and queue it for processing, returns the job submission"""
         if not os.path.exists(video_path):
             print(f"Video file not found: {video_path}")
             return None
             
         try:
-            with open(video_path, 'rb') as f:
-                files = {'video': (os.path.basename(video_path), f, 'video/mp4')}
-                response = requests.post(f"{self.base_url}/upload", files=files)
+            for attempt in range(max_retries + 1):
+                with open(video_path, 'rb') as f:
+                    files = {'video': (os.path.basename(video_path), f, 'video/mp4')}
+                    response = requests.post(f"{self.base_url}/upload", files=files)
                 
-            if response.status_code == 200:
+                # Server queue is full, wait as long as it asks before retrying
+                if response.status_code == 429 and attempt < max_retries:
+                    retry_after = int(response.headers.get("Retry-After", "10"))
+                    print(f"Server busy, retrying in {retry_after}s...")
+                    time.sleep(retry_after)
+                    continue
+                break
+                
+            if response.status_code in (200, 202):
                 return response.json()
             else:
                 print(f"Upload failed: {response.status_code}")
@@ -47,6 +57,35 @@ class SwishScanClient:
             print(f"Upload error: {e}")
             return None
     
+    def get_job(self, job_id):
+        """Get the state and progress of an analysis job"""
+        try:
+            response = requests.get(f"{self.base_url}/api/jobs/{job_id}")
+            if response.status_code == 200:
+                return response.json()
+            else:
+                print(f"Job status failed: {response.status_code}")
+                return None
+        except requests.exceptions.RequestException as e:
+            print(f"Job status error: {e}")
+            return None
+    
+    def wait_for_job(self, job_id, poll_interval=2.0, timeout=None, on_progress=None):
+        """Poll a job until it completes or fails, returns the final job state"""
+        start = time.time()
+        while True:
+            job = self.get_job(job_id)
+            if job is None:
+                return None
+            if on_progress:
+                on_progress(job)
+            if job['state'] in ('completed', 'failed'):
+                return job
+            if timeout is not None and time.time() - start > timeout:
+                print(f"Timed out waiting for job {job_id}")
+                return job
+            time.sleep(poll_interval)
+    
     def download_results(self, filename):
         """Download analysis results"""
         try:
@@ -119,9 +158,23 @@ def main():
     video_path = input("\nEnter path to video file (or press Enter to skip): ").strip()
     if video_path:
         print(f"3. Uploading video: {video_path}")
-        result = client.upload_video(video_path)
-        if result:
-            print(f"✓ Upload successful!")
+        submission = client.upload_video(video_path)
+        job = None
+        if submission:
+            print(f"✓ Upload queued as job {submission['job_id']}")
+            
+            def show_progress(job):
+                progress = job['progress']
+                print(f"  {job['state']} ({progress['phase']}): {progress['percent']:.1f}%, "
+                      f"{progress['shots_completed']}/{progress['shots_detected']} shots done")
+            
+            job = client.wait_for_job(submission['job_id'], on_progress=show_progress)
+            if job and job['state'] == 'failed':
+                print(f"✗ Processing failed: {job['error']}")
+        
+        if job and job['state'] == 'completed':
+            result = job['result']
+            print(f"✓ Processing complete!")
             print(f"  Total shots: {result['total_shots']}")
             print(f"  Results file: {result['results_file']}")
             
@@ -141,7 +194,7 @@ def main():
                     print(f"    Resolution: {shot['analysis']['resolution']}")
                     print(f"    Avg Motion: {shot['analysis']['motion_analysis']['avg_motion']:.1f}")
         else:
-            print("✗ Upload failed")
+            print("✗ Upload or processing failed")
     else:
         print("3. Skipping video upload")
     
@@ -10,6 +10,7 @@ import threading
 import requests
 import json
 import os
+import time
 from pathlib import Path
 from datetime import datetime
 
@@ -22,6 +23,7 @@ class SwishScanGUI:
         
         # API configuration
         self.api_url = "http://localhost:8000"
+        self.poll_interval = 2.0  # Seconds between job status checks
         self.is_processing = False
         
         self.setup_ui()
@@ -72,7 +74,7 @@ class SwishScanGUI:
         # Progress Bar
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var, 
-                                           maximum=100, mode='indeterminate')
+                                           maximum=100, mode='determinate')
         self.progress_bar.grid(row=4, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 20))
         
         # Results Area
@@ -154,33 +156,75 @@ class SwishScanGUI:
         
         self.is_processing = True
         self.process_btn.config(state='disabled')
-        self.progress_bar.start()
+        self.progress_var.set(0)
         self.results_text.delete(1.0, tk.END)
-        self.results_text.insert(tk.END, "Processing video...\n")
+        self.results_text.insert(tk.END, "Uploading video...\n")
         
         # Run processing in background thread
         threading.Thread(target=self._process_video_thread, args=(video_path,), daemon=True).start()
     
     def _process_video_thread(self, video_path):
-        """Process video in background thread"""
+        """Upload video and poll its analysis job in background thread"""
         try:
-            # Upload video to API
-            with open(video_path, 'rb') as f:
-                files = {'video': (os.path.basename(video_path), f, 'video/mp4')}
-                response = requests.post(f"{self.api_url}/upload", files=files)
+            # Upload video to API, waiting out a full server queue
+            while True:
+                with open(video_path, 'rb') as f:
+                    files = {'video': (os.path.basename(video_path), f, 'video/mp4')}
+                    response = requests.post(f"{self.api_url}/upload", files=files)
+                if response.status_code != 429:
+                    break
+                retry_after = int(response.headers.get("Retry-After", "10"))
+                self.root.after(0, self._show_status_line, f"Server busy, retrying in {retry_after}s...")
+                time.sleep(retry_after)
             
-            if response.status_code == 200:
-                result = response.json()
-                self.root.after(0, self._show_results, result)
-            else:
+            if response.status_code not in (200, 202):
                 error_msg = f"Upload failed: {response.status_code}\n{response.text}"
                 self.root.after(0, self._show_error, error_msg)
+                return
+            
+            job_id = response.json()['job_id']
+            self.root.after(0, self._show_status_line, f"Queued as job {job_id}")
+            
+            # Poll the job until it finishes
+            while True:
+                response = requests.get(f"{self.api_url}/api/jobs/{job_id}", timeout=10)
+                if response.status_code != 200:
+                    self.root.after(0, self._show_error, f"Job status failed: {response.status_code}\n{response.text}")
+                    return
+                
+                job = response.json()
+                self.root.after(0, self._show_progress, job)
+                
+                if job['state'] == 'completed':
+                    result = dict(job['result'], status='success')
+                    self.root.after(0, self._show_results, result)
+                    return
+                if job['state'] == 'failed':
+                    self.root.after(0, self._show_error, f"Processing failed: {job['error']}")
+                    return
+                
+                time.sleep(self.poll_interval)
                 
         except Exception as e:
             self.root.after(0, self._show_error, f"Error: {str(e)}")
         finally:
             self.root.after(0, self._processing_complete)
     
+    def _show_status_line(self, message):
+        """Replace the results area with a single status line"""
+        self.results_text.delete(1.0, tk.END)
+        self.results_text.insert(tk.END, f"{message}\n")
+    
+    def _show_progress(self, job):
+        """Display job progress while processing"""
+        progress = job['progress']
+        self.progress_var.set(progress['percent'])
+        self._show_status_line(
+            f"Job {job['state']} ({progress['phase']}): {progress['percent']:.1f}% done, "
+            f"{progress['frames_processed']}/{progress['total_frames']} frames analyzed, "
+            f"{progress['shots_completed']}/{progress['shots_detected']} shots tracked"
+        )
+    
     def _show_results(self, result):
         """Display processing results"""
         self.results_text.delete(1.0, tk.END)
@@ -236,7 +280,6 @@ class SwishScanGUI:
         """Called when processing is complete"""
         self.is_processing = False
         self.process_btn.config(state='normal')
-        self.progress_bar.stop()
     
     def save_results(self):
         """Save results to file"""
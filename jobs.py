@@ -0,0 +1,233 @@
+"""
+Background job queue for SwishScan video analysis
+"""
+
+import asyncio
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another upload"""
+
+
+class Job:
+    # Share of the progress bar given to the motion pass; shot tracking, which
+    # runs the pose, hand and ball models, gets the rest
+    DETECTION_WEIGHT = 0.25
+
+    def __init__(self, video_path: str, filename: str, content_hash: Optional[str] = None):
+        self.job_id = uuid.uuid4().hex
+        self.video_path = video_path
+        self.filename = filename
+        self.content_hash = content_hash  # SHA-256 of the upload, computed while streaming
+        self.state = "queued"
+        self.created = datetime.now().isoformat()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+
+        # Progress is updated from standardizer threads, so guard it with a lock
+        self._lock = threading.Lock()
+        self.frames_processed = 0
+        self.total_frames = 0
+        self.detection_done = False
+        self.shots = {}
+        self.percent = 0.0  # Highest percent reported, so the bar never moves backwards
+
+    def update_progress(self, update: Dict[str, Any]):
+        """
+        Apply a progress update from VideoStandardizer.standardize_video
+
+        Args:
+            update: Progress update dictionary
+        """
+        with self._lock:
+            kind = update.get("kind")
+            if kind == "frames":
+                self.frames_processed = update["frames_processed"]
+                self.total_frames = max(update["total_frames"], self.frames_processed)
+                # The final update reports the true frame count as the total
+                self.detection_done = self.total_frames > 0 and update["total_frames"] == self.frames_processed
+            elif kind == "shot_detected":
+                self.shots[update["shot_index"]] = "processing"
+            elif kind == "shot_completed":
+                self.shots[update["shot_index"]] = "completed" if update.get("ok") else "failed"
+            elif kind == "shot_discarded":
+                self.shots.pop(update["shot_index"], None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the job for the status endpoint"""
+        with self._lock:
+            shots = [{"shot_index": index, "state": state} for index, state in sorted(self.shots.items())]
+            tracking = sum(1 for shot in shots if shot["state"] == "processing")
+
+            if self.state in ("completed", "failed"):
+                phase = "done"
+            elif self.state == "queued":
+                phase = "queued"
+            elif not self.detection_done:
+                phase = "detecting"
+            else:
+                phase = "tracking" if tracking else "saving"
+
+            if self.state == "completed":
+                self.percent = 100.0
+            elif self.total_frames:
+                detected = self.frames_processed / self.total_frames
+                # Shots found so far stand for the detected share of the video, so the
+                # finished share of its tracking work is estimated as detected * finished / found
+                finished = len(shots) - tracking
+                tracked = detected * finished / len(shots) if shots else detected
+                percent = 100.0 * (self.DETECTION_WEIGHT * detected + (1 - self.DETECTION_WEIGHT) * tracked)
+                self.percent = max(self.percent, round(min(percent, 99.0), 1))
+
+            return {
+                "job_id": self.job_id,
+                "state": self.state,
+                "filename": self.filename,
+                "content_hash": self.content_hash,
+                "created": self.created,
+                "started": self.started,
+                "finished": self.finished,
+                "progress": {
+                    "percent": self.percent,
+                    "phase": phase,
+                    "frames_processed": self.frames_processed,
+                    "total_frames": self.total_frames,
+                    "shots_detected": len(shots),
+                    "shots_completed": sum(1 for shot in shots if shot["state"] == "completed"),
+                    "shots": shots
+                },
+                "result": self.result,
+                "error": self.error
+            }
+
+
+class JobManager:
+    """
+    Bounded asyncio job queue with a fixed number of concurrent workers
+
+    Uploads are queued and processed by `concurrency` worker tasks. At most
+    `max_queued` jobs may wait at once; beyond that submit() raises
+    QueueFullError so the API can answer with 429 instead of oversubscribing the
+    CPU. Finished jobs are kept for polling up to `max_finished` entries.
+    """
+
+    def __init__(self, run_job: Callable[[Job], Awaitable[Dict[str, Any]]], concurrency: int,
+                 max_queued: int, max_finished: int = 500):
+        self.run_job = run_job
+        self.concurrency = max(1, concurrency)
+        self.max_queued = max(1, max_queued)
+        self.max_finished = max_finished
+
+        self.jobs = OrderedDict()
+        self.queue = None
+        self.workers = []
+        self.running_jobs = 0
+
+    def start(self):
+        """Start the worker tasks on the running event loop"""
+        self.queue = asyncio.Queue(maxsize=self.max_queued)
+        self.workers = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+        print(f"Started {self.concurrency} analysis job worker(s), queue size {self.max_queued}")
+
+    async def stop(self):
+        """Cancel the worker tasks"""
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def has_capacity(self) -> bool:
+        """Check whether another job can be queued right now"""
+        return self.queue is not None and not self.queue.full()
+
+    def submit(self, video_path: str, filename: str, content_hash: Optional[str] = None) -> Job:
+        """
+        Queue a video for analysis
+
+        Args:
+            video_path: Path to the saved upload
+            filename: Original filename of the upload
+            content_hash: Optional SHA-256 of the upload
+
+        Returns:
+            The queued job
+
+        Raises:
+            QueueFullError: If the queue is at capacity
+        """
+        if not self.has_capacity():
+            raise QueueFullError("Analysis queue is full")
+
+        job = Job(video_path, filename, content_hash)
+        self.queue.put_nowait(job)
+        self.jobs[job.job_id] = job
+        self._prune_finished()
+        return job
+
+    def add_completed(self, video_path: str, filename: str, result: Dict[str, Any],
+                      content_hash: Optional[str] = None) -> Job:
+        """
+        Record a job that was answered without queueing, e.g. from the result cache
+
+        Args:
+            video_path: Path to the saved upload
+            filename: Original filename of the upload
+            result: Result summary for the job status endpoint
+            content_hash: Optional SHA-256 of the upload
+
+        Returns:
+            The completed job
+        """
+        job = Job(video_path, filename, content_hash)
+        job.state = "completed"
+        job.started = job.finished = datetime.now().isoformat()
+        job.result = result
+        self.jobs[job.job_id] = job
+        self._prune_finished()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue statistics for the status endpoint"""
+        states = {}
+        for job in self.jobs.values():
+            states[job.state] = states.get(job.state, 0) + 1
+        return {
+            "concurrency": self.concurrency,
+            "max_queued": self.max_queued,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "running": self.running_jobs,
+            "jobs_by_state": states
+        }
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self.queue.get()
+            self.running_jobs += 1
+            job.state = "running"
+            job.started = datetime.now().isoformat()
+            try:
+                job.result = await self.run_job(job)
+                job.state = "completed"
+            except Exception as e:
+                print(f"Job {job.job_id} failed: {e}")
+                job.error = str(e)
+                job.state = "failed"
+            finally:
+                job.finished = datetime.now().isoformat()
+                self.running_jobs -= 1
+                self.queue.task_done()
+
+    def _prune_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.state in ("completed", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
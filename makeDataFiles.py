@@ -20,10 +20,33 @@ WE ARE EXLUDING DESMOND BANE BECAUSE THE LIST WAS 26 PLAYERS AND CHAT TOLD ME HE
 """
 
 
+import argparse
 import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+import requests
 from nba_api.stats.endpoints import ShotChartDetail
 from nba_api.stats.static import players
 
+from shotChartStore import exportShotCharts
+
+
+# Columns kept from each shot chart row; game and event ids identify a shot across incremental refreshes
+SHOT_FIELDS = ["GAME_ID", "GAME_EVENT_ID", "GAME_DATE", "SHOT_MADE_FLAG", "LOC_X", "LOC_Y"]
+
+# stats.nba.com drops requests that don't look like they come from a browser
+STATS_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko)",
+    "Accept": "application/json, text/plain, */*",
+    "Referer": "https://www.nba.com/",
+    "Origin": "https://www.nba.com",
+}
+
 
 def getPlayerNamesFromFile(file_path: str) -> list[str]:
     """
@@ -95,29 +118,372 @@ def getSeasonShots(player_id: int, season: str = '2024-25') -> list[dict]:
     return shotlog.get_data_frames()[0]
 
 
+class NbaApiTransport:
+    """
+    Fetches raw shot chart responses from stats.nba.com through nba_api.
+    """
+
+    def __init__(self, timeout: float = 30):
+        self.timeout = timeout
+
+    def fetchShotChart(self, player_id: int, season: str, season_type: str, date_from: str = '') -> dict:
+        """
+        Request one player's shots for a season.
+
+        Args:
+            player_id (int): The ID of the player.
+            season (str): Season such as '2024-25'.
+            season_type (str): 'Regular Season', 'Playoffs', ...
+            date_from (str): Only games on or after this date (MM/DD/YYYY), or '' for the whole season.
+
+        Returns:
+            dict: The raw stats.nba.com response.
+        """
+        shotlog = ShotChartDetail(
+            team_id = 0,  # 0 = all teams
+            player_id = player_id,
+            season_nullable = season,
+            season_type_all_star = season_type,
+            context_measure_simple = 'FGA',  # important to include missed shots
+            date_from_nullable = date_from,
+            timeout = self.timeout
+        )
+        return shotlog.get_dict()
+
+
+class HttpTransport:
+    """
+    Fetches raw shot chart responses from any stats.nba.com-compatible server.
+
+    Point base_url at a local stand-in serving recorded responses to run the
+    fetcher without touching the real API.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()  # One session per worker thread
+
+    def fetchShotChart(self, player_id: int, season: str, season_type: str, date_from: str = '') -> dict:
+        """
+        Request one player's shots for a season.
+
+        Args:
+            player_id (int): The ID of the player.
+            season (str): Season such as '2024-25'.
+            season_type (str): 'Regular Season', 'Playoffs', ...
+            date_from (str): Only games on or after this date (MM/DD/YYYY), or '' for the whole season.
+
+        Returns:
+            dict: The raw response.
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers.update(STATS_HEADERS)
+
+        response = session.get(f"{self.base_url}/stats/shotchartdetail", timeout=self.timeout, params={
+            "PlayerID": player_id,
+            "TeamID": 0,
+            "LeagueID": "00",
+            "Season": season,
+            "SeasonType": season_type,
+            "ContextMeasure": "FGA",
+            "DateFrom": date_from,
+        })
+        response.raise_for_status()
+        return response.json()
+
+
+class RateLimiter:
+    """
+    Spaces request starts evenly across all worker threads.
+    """
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self) -> None:
+        """
+        Block until the calling thread may start a request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def parseShotRows(response: dict) -> list[dict]:
+    """
+    Turn a raw shot chart response into a list of shot dictionaries.
+
+    Args:
+        response (dict): The raw stats.nba.com response.
+
+    Returns:
+        list[dict]: One dictionary per shot with the SHOT_FIELDS columns.
+    """
+    result_sets = response["resultSets"]
+    result_set = next((rs for rs in result_sets if rs.get("name") == "Shot_Chart_Detail"), result_sets[0])
+    columns = [result_set["headers"].index(field) for field in SHOT_FIELDS]
+    return [{field: row[column] for field, column in zip(SHOT_FIELDS, columns)} for row in result_set["rowSet"]]
+
+
+def fetchWithRetry(transport, limiter: RateLimiter, retries: int, backoff: float,
+                   player_id: int, season: str, season_type: str, date_from: str = '') -> dict:
+    """
+    Fetch a shot chart, retrying failed requests with exponential backoff and jitter.
+
+    Args:
+        transport: NbaApiTransport, HttpTransport or anything with the same fetchShotChart.
+        limiter (RateLimiter): Shared rate limiter.
+        retries (int): Retries after the first failed attempt.
+        backoff (float): Seconds to wait before the first retry; doubled on each further retry.
+        player_id (int): The ID of the player.
+        season (str): Season such as '2024-25'.
+        season_type (str): 'Regular Season', 'Playoffs', ...
+        date_from (str): Only games on or after this date (MM/DD/YYYY), or '' for the whole season.
+
+    Returns:
+        dict: The raw response.
+    """
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            return transport.fetchShotChart(player_id, season, season_type, date_from)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt * (1 + random.random())
+            print(f"Request for {player_id} {season} failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def seasonIsOver(season: str, today: date = None) -> bool:
+    """
+    Check whether a season is finished, so its cached shots can never change.
+
+    Args:
+        season (str): Season such as '2024-25'.
+        today (date): Date to check against (default is today).
+
+    Returns:
+        bool: True once the July after the season has started.
+    """
+    today = today or date.today()
+    return today >= date(int(season[:4]) + 1, 7, 1)
+
+
+def getCachePath(cache_dir: str, player_id: int, season: str, season_type: str) -> str:
+    """
+    Get the cache file for a (player, season, season type) response.
+    """
+    return os.path.join(cache_dir, f"{player_id}_{season}_{season_type.replace(' ', '')}.json")
+
+
+def writeFileAtomically(path: str, text: str) -> None:
+    """
+    Write a file under a temporary name and rename it into place, so an interrupted run never leaves it truncated.
+    """
+    tmp_path = f"{path}.tmp{os.getpid()}_{threading.get_ident()}"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def fetchPlayerSeason(transport, limiter: RateLimiter, cache_dir: str, player_id: int, season: str,
+                      season_type: str, retries: int, backoff: float, refresh: bool = False) -> tuple[list[dict], str]:
+    """
+    Get a player's shots for a season, fetching only what the cache is missing.
+
+    Finished seasons are served from the cache without a request. For the
+    current season only games on or after the last stored game date are
+    requested and merged into the cached shots.
+
+    Args:
+        transport: NbaApiTransport, HttpTransport or anything with the same fetchShotChart.
+        limiter (RateLimiter): Shared rate limiter.
+        cache_dir (str): Directory of cached responses.
+        player_id (int): The ID of the player.
+        season (str): Season such as '2024-25'.
+        season_type (str): 'Regular Season', 'Playoffs', ...
+        retries (int): Retries per request.
+        backoff (float): Initial retry delay in seconds.
+        refresh (bool): Ignore the cache and fetch the whole season.
+
+    Returns:
+        tuple[list[dict], str]: The season's shots and how they were obtained ('cached', 'incremental' or 'full').
+    """
+    cache_path = getCachePath(cache_dir, player_id, season, season_type)
+    cached = None
+    if not refresh and os.path.exists(cache_path):
+        with open(cache_path, 'r') as f:
+            cached = json.load(f)
+        if cached["complete"]:
+            return cached["shots"], 'cached'
+
+    # GAME_DATE is YYYYMMDD; the last stored date is requested again in case that game was stored part-way
+    date_from = ''
+    if cached and cached["shots"]:
+        last_date = datetime.strptime(max(shot["GAME_DATE"] for shot in cached["shots"]), "%Y%m%d")
+        date_from = last_date.strftime("%m/%d/%Y")
+
+    response = fetchWithRetry(transport, limiter, retries, backoff, player_id, season, season_type, date_from)
+    shots_by_event = {(shot["GAME_ID"], shot["GAME_EVENT_ID"]): shot for shot in (cached["shots"] if cached else [])}
+    for shot in parseShotRows(response):
+        shots_by_event[(shot["GAME_ID"], shot["GAME_EVENT_ID"])] = shot
+    shots = sorted(shots_by_event.values(), key=lambda shot: (shot["GAME_DATE"], shot["GAME_ID"], shot["GAME_EVENT_ID"]))
+
+    writeFileAtomically(cache_path, json.dumps({
+        "player_id": player_id,
+        "season": season,
+        "season_type": season_type,
+        "fetched_at": datetime.now().isoformat(),
+        "complete": seasonIsOver(season),
+        "shots": shots
+    }))
+    return shots, 'incremental' if date_from else 'full'
+
+
+def buildPlayerData(name: str, shots: list[dict]) -> dict:
+    """
+    Build a player's data file from their shots.
+
+    Args:
+        name (str): The name of the player.
+        shots (list[dict]): Shot chart rows from fetchPlayerSeason.
+
+    Returns:
+        dict: The player's name and half-court shots, in the format documented at the top of this file.
+    """
+    # Filter to only less than half court, then reorient to the center of half-court
+    return {
+        "name": name,
+        "shots": [
+            {"SHOT_MADE_FLAG": shot["SHOT_MADE_FLAG"], "LOC_X": shot["LOC_X"], "LOC_Y": shot["LOC_Y"] - 282}
+            for shot in shots if 0 <= shot["LOC_Y"] <= 564
+        ]
+    }
+
+
+def fetchAllPlayers(player_names: list[str], seasons: list[str], season_type: str, transport, output_dir: str,
+                    cache_dir: str, workers: int = 4, requests_per_second: float = 2.0, retries: int = 4,
+                    backoff: float = 2.0, refresh: bool = False) -> dict:
+    """
+    Fetch every player's shots for every season concurrently and write their data files.
+
+    Requests run on a bounded thread pool behind a shared rate limiter. A
+    player's file is only rewritten when all of their seasons were fetched
+    and the content changed.
+
+    Args:
+        player_names (list[str]): Names of the players.
+        seasons (list[str]): Seasons such as '2024-25'; a player's shots from all of them go into one file.
+        season_type (str): 'Regular Season', 'Playoffs', ...
+        transport: NbaApiTransport, HttpTransport or anything with the same fetchShotChart.
+        output_dir (str): Directory of the {player_id}.json files.
+        cache_dir (str): Directory of cached responses.
+        workers (int): Concurrent requests.
+        requests_per_second (float): Request rate limit across all workers.
+        retries (int): Retries per request.
+        backoff (float): Initial retry delay in seconds.
+        refresh (bool): Ignore the cache and fetch every season in full.
+
+    Returns:
+        dict: Counts of requests by how they were served, files written and failures.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    started = time.monotonic()
+
+    player_ids = {}
+    for name in player_names:
+        player_id = getPlayerID(name)
+        if player_id:
+            player_ids[name] = player_id
+        else:
+            print(f"{name}: Not found")
+
+    limiter = RateLimiter(requests_per_second)
+    summary = {"cached": 0, "incremental": 0, "full": 0, "written": 0, "unchanged": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            (name, season): pool.submit(fetchPlayerSeason, transport, limiter, cache_dir, player_id, season,
+                                        season_type, retries, backoff, refresh)
+            for name, player_id in player_ids.items() for season in seasons
+        }
+
+        for name, player_id in player_ids.items():
+            shots = []
+            try:
+                for season in seasons:
+                    season_shots, source = futures[(name, season)].result()
+                    summary[source] += 1
+                    shots.extend(season_shots)
+            except Exception as e:
+                print(f"{name}: Failed to fetch shots ({e}), keeping the existing file")
+                summary["failed"] += 1
+                continue
+
+            # Saves as player_id.json to prevent accent file naming issues
+            output_path = os.path.join(output_dir, f"{player_id}.json")
+            text = json.dumps(buildPlayerData(name, shots), indent=4)
+            if os.path.exists(output_path):
+                with open(output_path, 'r') as f:
+                    if f.read() == text:
+                        summary["unchanged"] += 1
+                        continue
+            writeFileAtomically(output_path, text)
+            summary["written"] += 1
+            print(f"{name}: {len(shots)} shots across {len(seasons)} season(s)")
+
+    summary["seconds"] = round(time.monotonic() - started, 1)
+    return summary
+
+
 def main():
     """
     Main function to write player date to their own JSON files.
     """
-    for name in getPlayerNamesFromFile('data/players.txt'):
-        players_id = getPlayerID(name)
-        if players_id:
-            shots = getSeasonShots(players_id, '2024-25')[["SHOT_MADE_FLAG", "LOC_X", "LOC_Y"]]
+    parser = argparse.ArgumentParser(description="Fetch NBA shot charts into per-player JSON files.")
+    parser.add_argument("--players", default="data/players.txt", help="File with one player name per line")
+    parser.add_argument("--output-dir", default="data", help="Directory of the {player_id}.json files")
+    parser.add_argument("--cache-dir", default="data/.shot_cache", help="Directory of cached responses")
+    parser.add_argument("--seasons", nargs="+", default=["2024-25"], help="Seasons to combine, e.g. 2023-24 2024-25")
+    parser.add_argument("--season-type", default="Regular Season", help="Regular Season, Playoffs, ...")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent requests")
+    parser.add_argument("--rate", type=float, default=2.0, help="Maximum requests per second")
+    parser.add_argument("--retries", type=int, default=4, help="Retries per failed request")
+    parser.add_argument("--backoff", type=float, default=2.0, help="Initial retry delay in seconds")
+    parser.add_argument("--timeout", type=float, default=30, help="Request timeout in seconds")
+    parser.add_argument("--refresh", action="store_true", help="Ignore the cache and fetch every season in full")
+    parser.add_argument("--base-url", help="stats.nba.com-compatible server to use instead of nba_api, "
+                                           "e.g. a local stand-in serving recorded responses")
+    parser.add_argument("--store", help="Also export every player file in --output-dir into this columnar store")
+    args = parser.parse_args()
 
-            # Filter to only less than half court, then reorient to the center of half-court
-            shots = shots[shots['LOC_Y'].between(0, 564)].copy()
-            shots['LOC_Y'] = shots['LOC_Y'] - 282
+    if args.base_url:
+        transport = HttpTransport(args.base_url, timeout=args.timeout)
+    else:
+        transport = NbaApiTransport(timeout=args.timeout)
 
-            json_data = {
-                "name": name,
-                "shots": shots.to_dict(orient='records')
-            }
+    player_names = getPlayerNamesFromFile(args.players)
+    printPlayerIDs(player_names)
+    summary = fetchAllPlayers(player_names, args.seasons, args.season_type, transport, args.output_dir,
+                              args.cache_dir, workers=args.workers, requests_per_second=args.rate,
+                              retries=args.retries, backoff=args.backoff, refresh=args.refresh)
+    print(f"Done in {summary['seconds']}s: {summary['full']} full, {summary['incremental']} incremental and "
+          f"{summary['cached']} cached season(s); {summary['written']} file(s) written, "
+          f"{summary['unchanged']} unchanged, {summary['failed']} failed")
 
-            # Saves as player_id.json to prevent accent file naming issues
-            with open(f"data/{players_id}.json", 'w') as f:
-                json.dump(json_data, f, indent=4)
+    if args.store:
+        store_summary = exportShotCharts(args.output_dir, args.store)
+        print(f"Exported {store_summary['players']} players and {store_summary['shots']} shots to {args.store}")
 
 
 if __name__ == "__main__":
-    printPlayerIDs(getPlayerNamesFromFile('data/players.txt'))
     main()
@@ -0,0 +1,75 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+
+def temp_path(path: str) -> str:
+    """
+    Unique temporary name next to an artifact, keeping its extension
+
+    The extension is kept because OpenCV picks the container and image
+    format from it. Process and thread ids keep concurrent writers apart.
+
+    Args:
+        path: Final artifact path
+
+    Returns:
+        Temporary path in the same directory
+    """
+    root, ext = os.path.splitext(path)
+    return f"{root}.tmp{os.getpid()}_{threading.get_ident()}{ext}"
+
+
+def publish(tmp_path: str, path: str) -> str:
+    """Atomically move a finished temporary file to its final path"""
+    os.replace(tmp_path, path)
+    return path
+
+
+def discard(tmp_path: str):
+    """Remove an unfinished temporary file, if it was created"""
+    if tmp_path and os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+
+@contextmanager
+def atomic_output(path: str) -> Iterator[str]:
+    """
+    Write an artifact under a temporary name and rename it into place on success
+
+    Readers either see the previous file or the complete new one, never a
+    partial write; on error the temporary file is removed.
+
+    Args:
+        path: Final artifact path
+
+    Yields:
+        The temporary path to write to
+    """
+    tmp_path = temp_path(path)
+    try:
+        yield tmp_path
+    except BaseException:
+        discard(tmp_path)
+        raise
+    publish(tmp_path, path)
+
+
+def write_json(path: str, data: Any, **dump_kwargs) -> str:
+    """
+    Atomically write a JSON file
+
+    Args:
+        path: Output path
+        data: JSON-serializable data
+        **dump_kwargs: Extra json.dump arguments
+
+    Returns:
+        The output path
+    """
+    with atomic_output(path) as tmp_path:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, **dump_kwargs)
+    return path
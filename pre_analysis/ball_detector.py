@@ -0,0 +1,125 @@
+import cv2
+import numpy as np
+from typing import List, Optional, Tuple
+
+# HSV ranges of the basketball colors the detector accepts, as (lower, upper)
+BALL_COLOR_RANGES = [
+    # Orange/brown basketball
+    ((5, 50, 50), (25, 255, 255)),
+    # Darker orange
+    ((0, 50, 50), (20, 255, 255)),
+    # Reddish basketball
+    ((0, 100, 100), (10, 255, 255)),
+    # Brown basketball
+    ((10, 50, 50), (30, 255, 255)),
+    # Light orange
+    ((10, 30, 100), (25, 255, 255)),
+    # Dark brown
+    ((15, 50, 50), (25, 255, 200))
+]
+
+
+class BallSegmenter:
+    """
+    Color segmentation of basketball candidates in a single mask
+
+    The color ranges overlap heavily, so instead of one inRange, two
+    morphology passes and one findContours per range, every range is folded
+    into a 256-entry lookup table per HSV channel, built once. Bit i of a
+    channel's entry is set when the value lies inside range i, so ANDing the
+    three looked-up channels leaves a non-zero byte exactly where a pixel
+    matches at least one range. The union mask is cleaned with cached kernels
+    and scanned for contours once per frame.
+    """
+
+    def __init__(self, color_ranges: List[Tuple[Tuple[int, int, int], Tuple[int, int, int]]] = BALL_COLOR_RANGES,
+                 min_area: float = 200, max_area: float = 5000, template_size: int = 50):
+        if len(color_ranges) > 8:
+            raise ValueError("At most 8 color ranges fit in the lookup table")
+
+        self.min_area = min_area
+        self.max_area = max_area
+
+        lut = np.zeros((256, 3), dtype=np.uint8)
+        values = np.arange(256)
+        for bit, (lower, upper) in enumerate(color_ranges):
+            for channel in range(3):
+                inside = (values >= lower[channel]) & (values <= upper[channel])
+                lut[inside, channel] |= 1 << bit
+        self.lut = lut.reshape(1, 256, 3)
+
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+
+        # Circular templates for the shape-matching fallback, by size
+        self.template_size = template_size
+        self._templates = {}
+        self.template = self.circle_template(template_size)
+
+    def circle_template(self, size: int) -> np.ndarray:
+        """
+        Filled circle template for shape matching, built once per size
+
+        Args:
+            size: Template width and height in pixels
+
+        Returns:
+            The template image
+        """
+        template = self._templates.get(size)
+        if template is None:
+            template = np.zeros((size, size), dtype=np.uint8)
+            cv2.circle(template, (size//2, size//2), max(1, size//2 - max(1, size//10)), 255, -1)
+            self._templates[size] = template
+        return template
+
+    def mask(self, hsv: np.ndarray) -> np.ndarray:
+        """
+        Build the cleaned union mask of all ball colors
+
+        Args:
+            hsv: HSV image
+
+        Returns:
+            Binary mask (0/255) of ball-colored pixels
+        """
+        bits = cv2.LUT(hsv, self.lut)
+        hue_bits, saturation_bits, value_bits = cv2.split(bits)
+        matched = cv2.bitwise_and(cv2.bitwise_and(hue_bits, saturation_bits), value_bits)
+        _, mask = cv2.threshold(matched, 0, 255, cv2.THRESH_BINARY)
+
+        # Morphological operations to clean up the mask
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self.kernel)
+        return cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
+
+    def best_contour(self, hsv: np.ndarray, scale: float = 1.0) -> Tuple[Optional[np.ndarray], float]:
+        """
+        Find the most ball-like contour in an HSV image
+
+        Args:
+            hsv: HSV image
+            scale: Size of the image relative to the source frame; the area limits
+                are in source pixels and scaled to match
+
+        Returns:
+            The best contour (or None) and its score
+        """
+        area_scale = scale * scale
+        contours, _ = cv2.findContours(self.mask(hsv), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        best_contour = None
+        best_score = 0
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if not self.min_area * area_scale < area < self.max_area * area_scale:
+                continue
+
+            # Score based on circularity and size (in source pixels)
+            perimeter = cv2.arcLength(contour, True)
+            if perimeter > 0:
+                circularity = 4 * np.pi * area / (perimeter * perimeter)
+                score = circularity * (area / area_scale / 1000)
+                if score > best_score:
+                    best_score = score
+                    best_contour = contour
+
+        return best_contour, best_score
@@ -0,0 +1,557 @@
+import bisect
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+try:
+    import av  # PyAV, optional: exact keyframe index and timestamp-accurate seeking
+except ImportError:
+    av = None
+
+from pre_analysis.profiling import StageTimings
+
+
+class VideoIndex:
+    """
+    Frame count, presentation timestamps and keyframe positions of a video
+
+    Built once per file by get_index(). With PyAV the packets are demuxed
+    (not decoded) and every frame's timestamp and keyframe flag is known, so
+    seeks can start exactly at the keyframe before a target frame. Without
+    PyAV only the container's frame count and frame rate are available and
+    keyframes and timestamps are None.
+    """
+
+    def __init__(self, frame_count: int, fps: float, keyframes: Optional[List[int]] = None,
+                 frame_pts: Optional[List[int]] = None, time_base: Optional[float] = None):
+        self.frame_count = frame_count
+        self.fps = fps
+        self.keyframes = keyframes  # Frame numbers of keyframes, ascending
+        self.frame_pts = frame_pts  # Presentation timestamp of every frame, ascending
+        self.time_base = time_base  # Seconds per pts unit
+
+    @property
+    def exact(self) -> bool:
+        """Whether keyframe positions are known"""
+        return self.keyframes is not None
+
+    def keyframe_before(self, frame_idx: int) -> Optional[int]:
+        """
+        Last keyframe at or before a frame
+
+        Args:
+            frame_idx: Frame number
+
+        Returns:
+            Keyframe frame number, or None if keyframes are not indexed
+        """
+        if not self.keyframes:
+            return None
+        position = bisect.bisect_right(self.keyframes, frame_idx)
+        return self.keyframes[max(0, position - 1)]
+
+    def timestamp(self, frame_idx: int) -> float:
+        """Presentation time of a frame in seconds"""
+        if self.frame_pts is not None and 0 <= frame_idx < len(self.frame_pts):
+            return (self.frame_pts[frame_idx] - self.frame_pts[0]) * self.time_base
+        return frame_idx / self.fps if self.fps else 0.0
+
+
+def build_index(path: str) -> VideoIndex:
+    """
+    Index the frames and keyframes of a video
+
+    Args:
+        path: Path to the video file
+
+    Returns:
+        The video's index
+    """
+    if av is None:
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file: {path}")
+        index = VideoIndex(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), cap.get(cv2.CAP_PROP_FPS))
+        cap.release()
+        return index
+
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        packets = [(packet.pts, packet.is_keyframe) for packet in container.demux(stream)
+                   if packet.pts is not None and packet.size > 0]
+
+    # Packets arrive in decode order; frame numbers follow presentation order
+    frame_pts = sorted(pts for pts, _ in packets)
+    keyframes = sorted(bisect.bisect_left(frame_pts, pts) for pts, is_keyframe in packets if is_keyframe)
+    fps = float(stream.average_rate) if stream.average_rate else 0.0
+    return VideoIndex(len(frame_pts), fps, keyframes=keyframes or [0], frame_pts=frame_pts,
+                      time_base=float(stream.time_base))
+
+
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+INDEX_CACHE_SIZE = 32
+
+
+def get_index(path: str) -> VideoIndex:
+    """
+    Index of a video, built on first use and reused until the file changes
+
+    Args:
+        path: Path to the video file
+
+    Returns:
+        The video's index
+    """
+    stat = os.stat(path)
+    key = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+    with _index_lock:
+        if key in _index_cache:
+            _index_cache.move_to_end(key)
+            return _index_cache[key]
+
+    index = build_index(path)
+    with _index_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+class VideoDecoder:
+    """
+    Base class for a decode backend with frame-accurate random access
+
+    Subclasses implement read() and _seek(). seek() positions the decoder so
+    the next read() returns exactly the requested frame; frames() iterates a
+    range, inline or, with read_ahead above 0, through a FramePrefetcher so
+    decoding overlaps with whatever the caller does with each frame.
+    """
+
+    def __init__(self, path: str, index: Optional[VideoIndex] = None, read_ahead: int = 0):
+        self.path = path
+        self.index = index if index is not None else get_index(path)
+        self.read_ahead = read_ahead
+        self.position = 0  # Frame number the next read() returns
+        self.fps = self.index.fps
+        self.frame_count = self.index.frame_count
+        self.width = 0
+        self.height = 0
+
+    def read(self) -> Optional[np.ndarray]:
+        """
+        Decode the next frame
+
+        Returns:
+            BGR frame, or None at the end of the video
+        """
+        raise NotImplementedError
+
+    def seek(self, frame_idx: int):
+        """
+        Position the decoder so the next read() returns frame_idx
+
+        Args:
+            frame_idx: Frame number to read next
+        """
+        if frame_idx != self.position:
+            self._seek(max(0, frame_idx))
+
+    def _seek(self, frame_idx: int):
+        raise NotImplementedError
+
+    def close(self):
+        """Release the underlying decoder"""
+
+    def read_into(self, buffer: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Decode the next frame into a preallocated buffer
+
+        Args:
+            buffer: BGR buffer of the video's frame size
+
+        Returns:
+            The filled buffer (or a new array if the frame size differs), or None
+            at the end of the video
+        """
+        frame = self.read()
+        if frame is None or frame.shape != buffer.shape:
+            return frame
+        np.copyto(buffer, frame)
+        return buffer
+
+    def frames(self, start: int = 0, end: Optional[int] = None, reuse_buffers: bool = False,
+               timings: Optional[StageTimings] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Iterate the frames of a range
+
+        Args:
+            start: First frame number
+            end: Last frame number, inclusive (None reads to the end)
+            reuse_buffers: With read-ahead, decode into a fixed pool of buffers; each
+                yielded frame is then only valid until the next one is requested
+            timings: Optional stage timings receiving "decode" and "decode_wait"
+
+        Yields:
+            (frame number, BGR frame) tuples
+        """
+        self.seek(start)
+        if self.read_ahead > 0:
+            with FramePrefetcher(self, start, end, self.read_ahead, reuse_buffers, timings) as prefetcher:
+                yield from prefetcher
+            return
+
+        frame_idx = start
+        while end is None or frame_idx <= end:
+            t0 = time.perf_counter()
+            frame = self.read()
+            if timings is not None:
+                timings.add("decode", time.perf_counter() - t0)
+            if frame is None:
+                break
+            yield frame_idx, frame
+            frame_idx += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class FramePrefetcher:
+    """
+    Decode thread feeding a bounded queue of frames to one consumer
+
+    The producer decodes up to queue_size frames ahead and blocks when the
+    queue is full, so a slow consumer holds back decoding and a slow decoder
+    holds back the consumer without either spinning. With reuse_buffers the
+    frames are decoded into queue_size + 1 preallocated buffers that cycle
+    between the two threads: a buffer goes back to the producer when the
+    consumer asks for the next frame, so nothing is allocated per frame.
+    Consumers that keep frames across iterations must not reuse buffers.
+
+    Each frame is handed out once, so a prefetcher can only be iterated by a
+    single consumer; iterating it a second time raises RuntimeError. Stages
+    that need the same frames read them from the consumer, as FramePipeline
+    does.
+    """
+
+    _DONE = object()
+
+    def __init__(self, decoder: VideoDecoder, start: int, end: Optional[int], queue_size: int,
+                 reuse_buffers: bool = False, timings: Optional[StageTimings] = None):
+        self.decoder = decoder
+        self.start = start
+        self.end = end
+        self.timings = timings
+        self.ready = queue.Queue(maxsize=max(1, queue_size))
+        self.free = None
+        if reuse_buffers and decoder.width > 0 and decoder.height > 0:
+            self.free = queue.Queue()
+            for _ in range(max(1, queue_size) + 1):
+                self.free.put(np.empty((decoder.height, decoder.width, 3), dtype=np.uint8))
+        self._stop = threading.Event()
+        self._consumer_lock = threading.Lock()
+        self._consumed = False
+        self._thread = threading.Thread(target=self._produce, name="frame-prefetch", daemon=True)
+        self._thread.start()
+
+    def _wait(self, blocking_queue: queue.Queue, item=None, put: bool = False):
+        """Put or get on a queue, giving up once the prefetcher is closed"""
+        while not self._stop.is_set():
+            try:
+                if put:
+                    blocking_queue.put(item, timeout=0.1)
+                    return True
+                return blocking_queue.get(timeout=0.1)
+            except (queue.Full, queue.Empty):
+                continue
+        return None
+
+    def _produce(self):
+        frame_idx = self.start
+        try:
+            while self.end is None or frame_idx <= self.end:
+                buffer = self._wait(self.free) if self.free is not None else None
+                if self.free is not None and buffer is None:
+                    return
+
+                t0 = time.perf_counter()
+                frame = self.decoder.read_into(buffer) if buffer is not None else self.decoder.read()
+                if self.timings is not None:
+                    self.timings.add("decode", time.perf_counter() - t0)
+                if frame is None or not self._wait(self.ready, (frame_idx, frame, buffer), put=True):
+                    break
+                frame_idx += 1
+        except BaseException as e:
+            self._wait(self.ready, e, put=True)
+        self._wait(self.ready, self._DONE, put=True)
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        # Checked here rather than in the generator so a second consumer fails when it attaches
+        with self._consumer_lock:
+            if self._consumed:
+                raise RuntimeError("FramePrefetcher supports a single consumer and is already being iterated")
+            self._consumed = True
+        return self._consume()
+
+    def _consume(self) -> Iterator[Tuple[int, np.ndarray]]:
+        held = None
+        while True:
+            if held is not None:
+                # The consumer is done with the previous frame
+                self.free.put(held)
+                held = None
+
+            t0 = time.perf_counter()
+            item = self.ready.get()
+            if self.timings is not None:
+                self.timings.add("decode_wait", time.perf_counter() - t0)
+            if item is self._DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+
+            frame_idx, frame, held = item
+            yield frame_idx, frame
+
+    def close(self):
+        """Stop the decode thread, also when the consumer stopped early"""
+        self._stop.set()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class OpenCVDecoder(VideoDecoder):
+    """
+    Decode with cv2.VideoCapture
+
+    A seek never hands a frame number straight to CAP_PROP_POS_FRAMES, which
+    on long-GOP phone video can land on the wrong frame. Short forward seeks,
+    and any forward seek with no keyframe in between, grab() their way to the
+    target. Otherwise the capture is moved to the indexed keyframe before the
+    target and grabs forward from there. Without a keyframe index (PyAV not
+    installed) the capture is moved max_forward_grab frames before the target
+    and the frame it actually landed on is read from the grabbed frame's
+    decoded timestamp, since CAP_PROP_POS_FRAMES only echoes back the requested
+    frame; if it landed past the target the seek decodes from the start.
+    """
+
+    def __init__(self, path: str, index: Optional[VideoIndex] = None, read_ahead: int = 0,
+                 max_forward_grab: int = 120):
+        super().__init__(path, index, read_ahead)
+        self.max_forward_grab = max_forward_grab
+        self.cap = self._open()
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if not self.fps:
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+
+    def _open(self) -> cv2.VideoCapture:
+        cap = cv2.VideoCapture(self.path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file: {self.path}")
+        return cap
+
+    def read(self) -> Optional[np.ndarray]:
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        self.position += 1
+        return frame
+
+    def read_into(self, buffer: np.ndarray) -> Optional[np.ndarray]:
+        # VideoCapture decodes straight into a buffer of the right size and type
+        ret, frame = self.cap.read(buffer)
+        if not ret:
+            return None
+        self.position += 1
+        return frame
+
+    def _seek(self, frame_idx: int):
+        keyframe = self.index.keyframe_before(frame_idx)
+        if frame_idx > self.position:
+            if keyframe is not None and keyframe <= self.position:
+                return self._grab_to(frame_idx)
+            if keyframe is None and frame_idx - self.position <= self.max_forward_grab:
+                return self._grab_to(frame_idx)
+
+        if keyframe is not None:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            self.position = keyframe
+            return self._grab_to(frame_idx)
+
+        anchor = max(0, frame_idx - self.max_forward_grab)
+        if anchor > 0 and self.fps:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, anchor)
+            if self.cap.grab():
+                landed = int(round(self.cap.get(cv2.CAP_PROP_POS_MSEC) * self.fps / 1000))
+                if landed < frame_idx:
+                    self.position = landed + 1
+                    return self._grab_to(frame_idx)
+
+        # Too close to the start, or the landing frame is unknown; decode forward from the start instead
+        self.cap.release()
+        self.cap = self._open()
+        self.position = 0
+        self._grab_to(frame_idx)
+
+    def _grab_to(self, frame_idx: int):
+        while self.position < frame_idx:
+            if not self.cap.grab():
+                break
+            self.position += 1
+
+    def close(self):
+        self.cap.release()
+
+
+class PyAVDecoder(VideoDecoder):
+    """
+    Decode with PyAV using codec frame threading
+
+    Seeks go to the indexed keyframe's timestamp and decode forward until the
+    target frame's presentation timestamp, so they stay exact on
+    variable-frame-rate and B-frame video.
+
+    Frames are rotated by the stream's display rotation, as OpenCV's FFmpeg
+    backend does, so portrait phone recordings come out upright and width and
+    height are those of the rotated frames. The angle comes from the stream's
+    "rotate" tag, which older FFmpeg versions export, or else from OpenCV's
+    reading of the display matrix, so both backends agree.
+    """
+
+    # Clockwise display rotation in degrees -> cv2.rotate code
+    ROTATE_CODES = {
+        90: cv2.ROTATE_90_CLOCKWISE,
+        180: cv2.ROTATE_180,
+        270: cv2.ROTATE_90_COUNTERCLOCKWISE
+    }
+
+    def __init__(self, path: str, index: Optional[VideoIndex] = None, read_ahead: int = 0):
+        if av is None:
+            raise ImportError("The pyav decode backend needs the 'av' package")
+        super().__init__(path, index, read_ahead)
+        self.container = av.open(path)
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = "AUTO"
+        self.rotation = self._stream_rotation()
+        self._rotate_code = self.ROTATE_CODES.get(self.rotation)
+        self.width = self.stream.codec_context.width
+        self.height = self.stream.codec_context.height
+        if self.rotation in (90, 270):
+            self.width, self.height = self.height, self.width
+        if self._rotate_code is not None:
+            print(f"Rotating frames of {os.path.basename(path)} by {self.rotation} degrees")
+        self._decoded = self.container.decode(self.stream)
+        self._pending = None  # Frame decoded past a seek target, returned by the next read()
+
+    def read(self) -> Optional[np.ndarray]:
+        if self._pending is not None:
+            frame, self._pending = self._pending, None
+        else:
+            frame = next(self._decoded, None)
+            if frame is None:
+                return None
+        self.position += 1
+        image = frame.to_ndarray(format="bgr24")
+        if self._rotate_code is not None:
+            image = cv2.rotate(image, self._rotate_code)
+        return image
+
+    def _stream_rotation(self) -> int:
+        """Clockwise rotation in degrees needed to display the stream upright"""
+        angle = self.stream.metadata.get("rotate")
+        if angle is None:
+            cap = cv2.VideoCapture(self.path)
+            angle = cap.get(cv2.CAP_PROP_ORIENTATION_META) if cap.isOpened() else 0
+            cap.release()
+        try:
+            return int(round(float(angle))) % 360
+        except ValueError:
+            return 0
+
+    def _seek(self, frame_idx: int):
+        frame_pts = self.index.frame_pts
+        if not frame_pts or frame_idx >= len(frame_pts):
+            self.position = frame_idx
+            self._pending = None
+            self._decoded = iter(())
+            return
+
+        keyframe = self.index.keyframe_before(frame_idx)
+        if not (self.position < frame_idx and keyframe <= self.position):
+            self.container.seek(frame_pts[keyframe], stream=self.stream, backward=True, any_frame=False)
+            self._decoded = self.container.decode(self.stream)
+            self._pending = None
+
+        # Decode up to the target's timestamp without converting the skipped frames
+        target_pts = frame_pts[frame_idx]
+        self._pending = None
+        for frame in self._decoded:
+            if frame.pts is not None and frame.pts >= target_pts:
+                self._pending = frame
+                break
+        self.position = frame_idx
+
+    def close(self):
+        self.container.close()
+
+
+DECODER_BACKENDS = {
+    "opencv": OpenCVDecoder,
+    "pyav": PyAVDecoder
+}
+
+
+def open_decoder(path: str, backend: str = "auto", read_ahead: int = 0) -> VideoDecoder:
+    """
+    Open a video with a decode backend
+
+    Args:
+        path: Path to the video file
+        backend: Name in DECODER_BACKENDS, or "auto" (see resolve_backend)
+        read_ahead: Frames frames() decodes ahead on a background thread (0 decodes inline)
+
+    Returns:
+        The opened decoder
+    """
+    return DECODER_BACKENDS[resolve_backend(backend)](path, read_ahead=read_ahead)
+
+
+def resolve_backend(backend: str) -> str:
+    """
+    Concrete backend name for a configured one
+
+    "auto" resolves to OpenCV. PyAV applies the stream rotation itself, and
+    becomes the automatic choice once that is verified against rotated
+    phone recordings; until then it is used only when asked for by name.
+
+    Args:
+        backend: Name in DECODER_BACKENDS, or "auto"
+
+    Returns:
+        Name in DECODER_BACKENDS
+    """
+    if backend == "auto":
+        backend = "opencv"
+    if backend not in DECODER_BACKENDS:
+        raise ValueError(f"Unknown decode backend '{backend}', expected one of {sorted(DECODER_BACKENDS)}")
+    return backend
+
+
+def available_backends() -> Dict[str, bool]:
+    """Which decode backends can be used in this environment"""
+    return {"opencv": True, "pyav": av is not None}
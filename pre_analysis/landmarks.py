@@ -0,0 +1,289 @@
+import time
+import cv2
+import numpy as np
+import mediapipe as mp
+from typing import List, Any, Optional, Tuple
+
+PoseLandmark = mp.solutions.pose.PoseLandmark
+
+PALM_CENTER = 9  # Middle finger MCP, used as the palm center
+
+
+class FrameLandmarks:
+    """
+    Pose and hand landmarks found in one frame
+
+    Hand landmarks are always normalized to the full frame, even when the
+    hand model ran on a crop, so callers never need to know how they were found.
+    """
+
+    def __init__(self, width: int, height: int, pose_landmarks=None,
+                 hand_landmarks: Optional[List[Any]] = None, hand_source: str = "none"):
+        self.width = width
+        self.height = height
+        self.pose_landmarks = pose_landmarks
+        self.hand_landmarks = hand_landmarks or []
+        self.hand_source = hand_source  # "full", "crop" or "none"
+
+    def pose_point(self, landmark: int) -> Optional[Tuple[int, int]]:
+        """
+        Pixel position of a pose landmark
+
+        Args:
+            landmark: PoseLandmark index
+
+        Returns:
+            (x, y) in pixels, or None without a pose
+        """
+        if self.pose_landmarks is None:
+            return None
+        point = self.pose_landmarks.landmark[landmark]
+        return (int(point.x * self.width), int(point.y * self.height))
+
+    def hand_points(self, landmark: int) -> List[Tuple[int, int]]:
+        """
+        Pixel positions of one hand landmark on every detected hand
+
+        Args:
+            landmark: HandLandmark index
+
+        Returns:
+            List of (x, y) in pixels
+        """
+        return [(int(hand.landmark[landmark].x * self.width), int(hand.landmark[landmark].y * self.height))
+                for hand in self.hand_landmarks]
+
+
+class LandmarkTracker:
+    """
+    Shared landmark pass running pose first and hands second on one RGB frame
+
+    Each frame is converted to RGB once into a reused buffer. With hand_crops
+    enabled the hand model only sees a crop around the pose wrists, sized from
+    the shoulder width, instead of the full frame; frames without a confident
+    pose fall back to a full-frame hand search.
+
+    With keyframe_interval above 1 the models only run on keyframes. In
+    between, the previous landmarks are carried forward with pyramidal
+    Lucas-Kanade optical flow. When either wrist moves faster than
+    release_velocity shoulder widths per frame (the release), every frame is a
+    keyframe for the next release_hold_frames frames. A failed flow estimate
+    also forces a keyframe, so propagation error stays bounded.
+
+    When given a StageTimings, the RGB conversion, pose and hand inference
+    are timed into its "convert", "pose" and "hands" stages.
+    """
+
+    def __init__(self, pose, hands, hand_crops: bool = False, min_wrist_visibility: float = 0.5,
+                 crop_scale: float = 1.0, min_crop_half_size: int = 80, keyframe_interval: int = 1,
+                 release_velocity: float = 0.08, release_hold_frames: int = 15, timings=None):
+        self.pose = pose
+        self.hands = hands
+        self.hand_crops = hand_crops
+        self.min_wrist_visibility = min_wrist_visibility
+        self.crop_scale = crop_scale  # Crop margin around each wrist, in shoulder widths
+        self.min_crop_half_size = min_crop_half_size
+
+        # Keyframe scheduling
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.release_velocity = release_velocity
+        self.release_hold_frames = release_hold_frames
+        self.min_flow_success = 0.8  # Fraction of points optical flow must follow
+        self.timings = timings
+
+        self._rgb = None
+        self._gray = None  # Two reused grayscale buffers, previous and current
+        self.reset()
+
+    def reset(self):
+        """Forget the previous frame and clear the inference counts before a new shot"""
+        self._last = None
+        self._gray_slot = 0
+        self._since_keyframe = 0
+        self._release_frames_left = 0
+        self.inference_counts = {"frames": 0, "pose": 0, "hands_full": 0, "hands_crop": 0, "propagated": 0}
+
+    def process(self, frame: np.ndarray) -> FrameLandmarks:
+        """
+        Find pose and hand landmarks in a frame
+
+        Args:
+            frame: BGR frame
+
+        Returns:
+            Unified landmark record for the frame
+        """
+        self.inference_counts["frames"] += 1
+        if self.keyframe_interval == 1:
+            return self._infer(frame)
+
+        height, width = frame.shape[:2]
+        if self._gray is None or self._gray.shape[1:] != (height, width):
+            self._gray = np.empty((2, height, width), dtype=np.uint8)
+            self._last = None
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray[self._gray_slot])
+        prev_gray = self._gray[1 - self._gray_slot]
+        self._gray_slot = 1 - self._gray_slot
+
+        landmarks = None
+        is_keyframe = (self._last is None or self._release_frames_left > 0
+                       or self._since_keyframe + 1 >= self.keyframe_interval)
+        if not is_keyframe:
+            landmarks = self._propagate(prev_gray, gray)
+
+        if landmarks is None:
+            landmarks = self._infer(frame)
+            self._since_keyframe = 0
+        else:
+            self.inference_counts["propagated"] += 1
+            self._since_keyframe += 1
+
+        self._update_release_state(landmarks)
+        self._last = landmarks
+        return landmarks
+
+    def _infer(self, frame: np.ndarray) -> FrameLandmarks:
+        """
+        Run the pose model and then the hand model on a frame
+
+        Args:
+            frame: BGR frame
+
+        Returns:
+            Unified landmark record for the frame
+        """
+        timings = self.timings
+        t0 = time.perf_counter()
+        height, width = frame.shape[:2]
+        if self._rgb is None or self._rgb.shape != frame.shape:
+            self._rgb = np.empty_like(frame)
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        t1 = time.perf_counter()
+
+        pose_results = self.pose.process(rgb)
+        self.inference_counts["pose"] += 1
+        t2 = time.perf_counter()
+        if timings is not None:
+            timings.add("convert", t1 - t0)
+            timings.add("pose", t2 - t1)
+        landmarks = FrameLandmarks(width, height, pose_landmarks=pose_results.pose_landmarks)
+
+        crop = self._hand_crop(landmarks) if self.hand_crops else None
+        if crop is None:
+            hand_results = self.hands.process(rgb)
+            self.inference_counts["hands_full"] += 1
+            if timings is not None:
+                timings.add("hands", time.perf_counter() - t2)
+            landmarks.hand_source = "full"
+            landmarks.hand_landmarks = list(hand_results.multi_hand_landmarks or [])
+            return landmarks
+
+        x1, y1, x2, y2 = crop
+        hand_results = self.hands.process(np.ascontiguousarray(rgb[y1:y2, x1:x2]))
+        self.inference_counts["hands_crop"] += 1
+        if timings is not None:
+            timings.add("hands", time.perf_counter() - t2)
+        landmarks.hand_source = "crop"
+        landmarks.hand_landmarks = list(hand_results.multi_hand_landmarks or [])
+
+        # Map crop-normalized coordinates back to the full frame
+        crop_width, crop_height = x2 - x1, y2 - y1
+        for hand in landmarks.hand_landmarks:
+            for point in hand.landmark:
+                point.x = (x1 + point.x * crop_width) / width
+                point.y = (y1 + point.y * crop_height) / height
+
+        return landmarks
+
+    def _propagate(self, prev_gray: np.ndarray, gray: np.ndarray) -> Optional[FrameLandmarks]:
+        """
+        Carry the previous landmarks into this frame with optical flow
+
+        Args:
+            prev_gray: Grayscale previous frame
+            gray: Grayscale current frame
+
+        Returns:
+            Propagated landmark record, or None if the flow could not follow them
+        """
+        last = self._last
+        landmark_lists = ([last.pose_landmarks] if last.pose_landmarks else []) + last.hand_landmarks
+        if not landmark_lists:
+            return None
+
+        width, height = last.width, last.height
+        points = np.array([(point.x * width, point.y * height)
+                           for landmark_list in landmark_lists for point in landmark_list.landmark],
+                          dtype=np.float32).reshape(-1, 1, 2)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None,
+                                                    winSize=(21, 21), maxLevel=3)
+        if moved is None or status.mean() < self.min_flow_success:
+            return None
+
+        # Points the flow lost keep their previous position
+        moved = np.where(status.reshape(-1, 1, 1) == 1, moved, points).reshape(-1, 2)
+
+        propagated = []
+        offset = 0
+        for landmark_list in landmark_lists:
+            copy = type(landmark_list)()
+            copy.CopyFrom(landmark_list)
+            for point in copy.landmark:
+                point.x = float(moved[offset, 0]) / width
+                point.y = float(moved[offset, 1]) / height
+                offset += 1
+            propagated.append(copy)
+
+        pose_landmarks = propagated.pop(0) if last.pose_landmarks else None
+        return FrameLandmarks(width, height, pose_landmarks=pose_landmarks,
+                              hand_landmarks=propagated, hand_source=last.hand_source)
+
+    def _update_release_state(self, landmarks: FrameLandmarks):
+        """Switch to inference on every frame while the wrists move fast"""
+        if self._release_frames_left > 0:
+            self._release_frames_left -= 1
+
+        last = self._last
+        if last is None or last.pose_landmarks is None or landmarks.pose_landmarks is None:
+            return
+
+        shoulder_width = np.hypot(*np.subtract(landmarks.pose_point(PoseLandmark.LEFT_SHOULDER),
+                                               landmarks.pose_point(PoseLandmark.RIGHT_SHOULDER)))
+        wrist_speed = max(
+            np.hypot(*np.subtract(landmarks.pose_point(wrist), last.pose_point(wrist)))
+            for wrist in (PoseLandmark.LEFT_WRIST, PoseLandmark.RIGHT_WRIST)
+        )
+        if wrist_speed > self.release_velocity * max(shoulder_width, 1.0):
+            self._release_frames_left = self.release_hold_frames
+
+    def _hand_crop(self, landmarks: FrameLandmarks) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Box around both pose wrists, or None when the pose is not confident enough
+
+        A single box keeps the hand model's tracking state consistent from frame
+        to frame, which separate per-wrist crops would not.
+        """
+        if landmarks.pose_landmarks is None:
+            return None
+
+        points = landmarks.pose_landmarks.landmark
+        wrists = [points[PoseLandmark.LEFT_WRIST], points[PoseLandmark.RIGHT_WRIST]]
+        if min(wrist.visibility for wrist in wrists) < self.min_wrist_visibility:
+            return None
+
+        width, height = landmarks.width, landmarks.height
+        left_shoulder = points[PoseLandmark.LEFT_SHOULDER]
+        right_shoulder = points[PoseLandmark.RIGHT_SHOULDER]
+        shoulder_width = np.hypot((left_shoulder.x - right_shoulder.x) * width,
+                                  (left_shoulder.y - right_shoulder.y) * height)
+        half_size = max(self.min_crop_half_size, int(self.crop_scale * shoulder_width))
+
+        xs = [wrist.x * width for wrist in wrists]
+        ys = [wrist.y * height for wrist in wrists]
+        x1 = max(0, int(min(xs)) - half_size)
+        y1 = max(0, int(min(ys)) - half_size)
+        x2 = min(width, int(max(xs)) + half_size)
+        y2 = min(height, int(max(ys)) + half_size)
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            return None
+        return (x1, y1, x2, y2)
@@ -0,0 +1,131 @@
+import cv2
+import numpy as np
+from typing import Dict, Any, Optional
+
+from pre_analysis.decoder import open_decoder
+from pre_analysis.artifacts import atomic_output
+
+
+class ShotMetricsAccumulator:
+    """
+    Streams per-shot motion metrics in constant memory
+
+    Frames are fed one at a time. Only the previous grayscale frame (in a
+    preallocated two-slot ring buffer) and a copy of the latest frame are kept;
+    max, mean and variance of the frame differences are updated incrementally.
+    The start, middle and end key frames are written out as small JPEG
+    thumbnails and referenced by path in the analysis.
+
+    When the shot length is not known up front (expected_frames is None) the
+    middle frame cannot be picked while streaming, so summary() reads it back
+    from the written shot video instead.
+    """
+
+    def __init__(self, fps: float, width: int, height: int, expected_frames: Optional[int],
+                 thumbnail_prefix: Optional[str] = None, thumbnail_width: int = 320,
+                 decode_backend: str = "auto"):
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.middle_index = max(0, expected_frames) // 2 if expected_frames is not None else None
+        self.thumbnail_prefix = thumbnail_prefix
+        self.thumbnail_width = thumbnail_width
+        self.decode_backend = decode_backend  # Used to seek to the middle frame in summary()
+
+        # Preallocated buffers: two grayscale slots, one diff and the latest color frame
+        self.gray_ring = np.empty((2, height, width), dtype=np.uint8)
+        self.diff_buffer = np.empty((height, width), dtype=np.uint8)
+        self.last_frame = np.empty((height, width, 3), dtype=np.uint8)
+
+        self.frame_count = 0
+        self.max_motion = 0.0
+        self.motion_mean = 0.0
+        self.motion_m2 = 0.0
+        self.key_frames = {
+            "start_frame": None,
+            "middle_frame": None,
+            "end_frame": None
+        }
+
+    def add(self, frame: np.ndarray):
+        """
+        Feed the next frame of the shot
+
+        Args:
+            frame: BGR frame
+        """
+        if frame.shape[:2] != (self.height, self.width):
+            frame = cv2.resize(frame, (self.width, self.height))
+
+        slot = self.frame_count % 2
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.gray_ring[slot])
+
+        if self.frame_count == 0:
+            motion = 0.0
+            self.key_frames["start_frame"] = self._save_thumbnail(frame, "start")
+        else:
+            cv2.absdiff(self.gray_ring[1 - slot], self.gray_ring[slot], dst=self.diff_buffer)
+            motion = cv2.mean(self.diff_buffer)[0]
+
+        if self.frame_count == self.middle_index:
+            self.key_frames["middle_frame"] = self._save_thumbnail(frame, "middle")
+
+        # Welford update of mean and variance
+        self.frame_count += 1
+        self.max_motion = max(self.max_motion, motion)
+        delta = motion - self.motion_mean
+        self.motion_mean += delta / self.frame_count
+        self.motion_m2 += delta * (motion - self.motion_mean)
+
+        np.copyto(self.last_frame, frame)
+
+    def summary(self, shot_video_path: Optional[str] = None, start_frame: int = 0) -> Dict[str, Any]:
+        """
+        Finish the shot and build its analysis dictionary
+
+        Args:
+            shot_video_path: Video to read the middle key frame from when the length
+                was not known up front
+            start_frame: Frame of that video the shot starts at
+
+        Returns:
+            Dictionary containing shot analysis data
+        """
+        if self.frame_count > 0:
+            self.key_frames["end_frame"] = self._save_thumbnail(self.last_frame, "end")
+
+            if self.key_frames["middle_frame"] is None and shot_video_path is not None:
+                with open_decoder(shot_video_path, self.decode_backend) as decoder:
+                    decoder.seek(start_frame + self.frame_count // 2)
+                    frame = decoder.read()
+                if frame is not None:
+                    self.key_frames["middle_frame"] = self._save_thumbnail(frame, "middle")
+
+            # Short shots may end before the expected middle frame
+            if self.key_frames["middle_frame"] is None:
+                self.key_frames["middle_frame"] = self.key_frames["end_frame"]
+
+        return {
+            "frame_count": self.frame_count,
+            "duration": self.frame_count / self.fps,
+            "resolution": f"{self.width}x{self.height}",
+            "fps": self.fps,
+            "motion_analysis": {
+                "max_motion": self.max_motion,
+                "avg_motion": self.motion_mean,
+                "motion_variance": self.motion_m2 / self.frame_count if self.frame_count else 0
+            },
+            "key_frames": self.key_frames
+        }
+
+    def _save_thumbnail(self, frame: np.ndarray, name: str) -> Optional[str]:
+        if self.thumbnail_prefix is None:
+            return None
+
+        scale = self.thumbnail_width / self.width
+        thumbnail = cv2.resize(frame, (self.thumbnail_width, max(1, int(self.height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        path = f"{self.thumbnail_prefix}_{name}.jpg"
+        with atomic_output(path) as tmp_path:
+            cv2.imwrite(tmp_path, thumbnail, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        return path
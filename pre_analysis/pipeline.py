@@ -0,0 +1,379 @@
+import cv2
+import numpy as np
+import os
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Callable
+
+from pre_analysis.artifacts import temp_path, publish, discard
+
+
+class PipelineStage:
+    """
+    Base class for a stage of the single-pass frame pipeline
+
+    Stages are run in order for every decoded frame and communicate through a
+    shared context dictionary, so each stage only reads keys written by the
+    stages before it.
+    """
+
+    def process(self, frame_idx: int, frame: np.ndarray, context: Dict[str, Any]):
+        """
+        Handle one decoded frame
+
+        Args:
+            frame_idx: Index of the frame in the video
+            frame: Decoded BGR frame
+            context: Shared pipeline context
+        """
+        raise NotImplementedError
+
+    def finish(self, context: Dict[str, Any]):
+        """
+        Flush any pending state once the video has been fully decoded
+
+        Args:
+            context: Shared pipeline context
+        """
+        pass
+
+
+class FramePipeline:
+    def __init__(self, stages: List[PipelineStage]):
+        self.stages = stages
+
+    def run(self, decoder, timings=None,
+            progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Decode every frame of a video once and push it through all stages
+
+        Args:
+            decoder: Opened VideoDecoder positioned at the first frame
+            timings: Optional StageTimings receiving the decode time
+            progress_callback: Optional callable receiving frame and shot progress updates
+
+        Returns:
+            The shared pipeline context after all stages have finished
+        """
+        context = {
+            "shots": [],
+            "fallback_segments": [],
+            "total_frames": 0
+        }
+
+        total_frames = decoder.frame_count
+        print(f"Streaming {total_frames} frames through {len(self.stages)} stages...")
+
+        def report(update: Dict[str, Any]):
+            if progress_callback is not None:
+                progress_callback(update)
+
+        def report_shots():
+            for event in context.get("shot_events", []):
+                if event["type"] == "start":
+                    report({"kind": "shot_detected", "shot_index": event["shot_index"]})
+                elif event["type"] == "end":
+                    # Rejected candidates free their index for the next shot
+                    kind = "shot_completed" if event["accepted"] else "shot_discarded"
+                    report({"kind": kind, "shot_index": event["shot_index"], "ok": event["accepted"]})
+
+        # Stages hold on to frames (shot padding, pending frames), so decode buffers are not recycled
+        frame_idx = 0
+        for _, frame in decoder.frames(timings=timings):
+            for stage in self.stages:
+                stage.process(frame_idx, frame, context)
+            report_shots()
+
+            frame_idx += 1
+            context["total_frames"] = frame_idx
+
+            # Progress indicator
+            if frame_idx % 100 == 0:
+                print(f"Processed {frame_idx} frames...")
+            if frame_idx % 30 == 0:
+                report({"kind": "frames", "frames_processed": frame_idx, "total_frames": total_frames})
+
+        for stage in self.stages:
+            stage.finish(context)
+        report_shots()
+        report({"kind": "frames", "frames_processed": frame_idx, "total_frames": frame_idx})
+
+        return context
+
+
+class MotionScoringStage(PipelineStage):
+    """Scores motion between consecutive frames with the standardizer's scorer"""
+
+    def __init__(self, standardizer):
+        # Downstream stages need a score for every frame, so no batching here
+        self.scorer = standardizer._create_motion_scorer(batch_size=1)
+        self.timings = standardizer.job_timings
+
+    def process(self, frame_idx: int, frame: np.ndarray, context: Dict[str, Any]):
+        t0 = time.perf_counter()
+        context["motion_score"] = self.scorer.push(frame)[0]
+        self.timings.add("motion", time.perf_counter() - t0)
+
+
+class ShotSegmentStage(PipelineStage):
+    """
+    Feeds motion scores to an OnlineShotSegmenter and publishes its events
+
+    Boundary events go to context["segment_events"]. Confirmed segments (whose
+    deferred shot was discarded when it closed) and fallback segments produced at
+    the end of the stream cannot be tracked from frames that are already gone,
+    so they are collected in context["fallback_segments"] instead.
+    """
+
+    def __init__(self, standardizer, fps: float):
+        self.segmenter = standardizer._create_segmenter(fps)
+
+    def process(self, frame_idx: int, frame: np.ndarray, context: Dict[str, Any]):
+        events = self.segmenter.push(context["motion_score"])
+        context["segment_events"] = [event for event in events if event["type"] != "confirm"]
+        context["fallback_segments"].extend(event["segment"] for event in events if event["type"] == "confirm")
+
+    def finish(self, context: Dict[str, Any]):
+        events = self.segmenter.finish()
+        context["segment_events"] = [event for event in events if event["type"] != "fallback"]
+        context["fallback_segments"].extend(event["segment"] for event in events if event["type"] == "fallback")
+
+
+class ShotTrackingStage(PipelineStage):
+    """
+    Runs pose, hand and ball tracking on the frames of the open segment
+
+    A short buffer of recent frames supplies the leading padding when a segment
+    opens. Frames past the padded end of the segment so far (commit_until) may
+    belong to a gap that closes the segment. They are tracked speculatively and
+    their output frames are held back JPEG-encoded: an "extend" event commits
+    them, and closing the segment drops them and trims the trajectories back
+    to the padded segment end, so the tracked video ends exactly there.
+
+    Encoding keeps the held-back gap (up to 2 seconds) to a few tens of MB at
+    1080p instead of holding raw frames. Should it still pass
+    PENDING_MAX_BYTES, e.g. on 4K video, the held-back frames are committed
+    early, and the tracked video may then run up to the gap past the segment end.
+
+    Emits "start", "frame" and "end" events in
+    context["shot_events"]. Without the standardizer's render_video no video is
+    written and the "frame" events carry the source frames.
+    """
+
+    PENDING_JPEG_QUALITY = 95
+    PENDING_MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, standardizer, fps: float, width: int, height: int):
+        self.standardizer = standardizer
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.render = standardizer.render_video
+
+        self.recent_frames = deque(maxlen=int(0.5 * fps) + 1)
+        self.pending_frames = []  # (frame index, JPEG-encoded output frame) past commit_until
+        self.pending_bytes = 0
+        self.next_shot_index = 0
+
+        self.active = False
+        self.writer = None
+        self.output_path = None
+        self.temp_output_path = None
+        self.tracking_data = None
+        self.commit_until = -1
+
+    def process(self, frame_idx: int, frame: np.ndarray, context: Dict[str, Any]):
+        self.recent_frames.append((frame_idx, frame))
+        shot_events = []
+
+        tracked_current = self._handle_segment_events(context["segment_events"], shot_events)
+        if self.active and not tracked_current:
+            self._track(frame_idx, frame, shot_events)
+
+        context["shot_events"] = shot_events
+
+    def finish(self, context: Dict[str, Any]):
+        shot_events = []
+        self._handle_segment_events(context["segment_events"], shot_events)
+        context["shot_events"] = shot_events
+
+    def _handle_segment_events(self, segment_events: List[Dict[str, Any]], shot_events: List[Dict[str, Any]]) -> bool:
+        """
+        Apply segment boundary events to the tracking state
+
+        Args:
+            segment_events: Events emitted by the segment stage for this frame
+            shot_events: Output list of shot events
+
+        Returns:
+            True if the current frame was already tracked while handling the events
+        """
+        tracked_current = False
+        for event in segment_events:
+            if event["type"] == "close":
+                self._finish_shot(event, shot_events)
+            elif event["type"] == "open":
+                self._start_shot(event, shot_events)
+                for buffered_idx, buffered_frame in self.recent_frames:
+                    if buffered_idx >= event["start_frame"]:
+                        self._track(buffered_idx, buffered_frame, shot_events)
+                tracked_current = True
+            elif event["type"] == "extend" and self.active:
+                self.commit_until = event["commit_until"]
+                self._commit_pending(shot_events)
+            elif event["type"] == "reject":
+                self._abort_shot(shot_events)
+        return tracked_current
+
+    def _start_shot(self, event: Dict[str, Any], shot_events: List[Dict[str, Any]]):
+        shot_index = self.next_shot_index
+        if self.render:
+            # Encoded under a temporary name and renamed once the shot is accepted
+            self.output_path = os.path.join(self.standardizer.tracked_data_dir, f"shot_{shot_index:03d}_tracked.mp4")
+            self.temp_output_path = temp_path(self.output_path)
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            self.writer = cv2.VideoWriter(self.temp_output_path, fourcc, self.fps, (self.width, self.height))
+
+        self.tracking_data = {
+            'pose_trajectories': [],
+            'hand_trajectories': [],
+            'ball_trajectories': []
+        }
+        self.standardizer._reset_shot_tracking()
+
+        self.active = True
+        self.commit_until = event["commit_until"]
+        self._drop_pending()
+        print(f"Tracking shot {shot_index+1} from frame {event['start_frame']}")
+        shot_events.append({"type": "start", "shot_index": shot_index})
+
+    def _track(self, frame_idx: int, frame: np.ndarray, shot_events: List[Dict[str, Any]]):
+        annotated_frame = self.standardizer._track_frame(
+            frame, frame_idx, self.next_shot_index, self.width, self.height, self.tracking_data,
+            annotate=self.render
+        )
+        output_frame = annotated_frame if self.render else frame
+        if frame_idx <= self.commit_until:
+            self._commit(output_frame, shot_events)
+            return
+
+        # Committed on the next "extend", or dropped with the segment
+        t0 = time.perf_counter()
+        _, encoded = cv2.imencode(".jpg", output_frame, [cv2.IMWRITE_JPEG_QUALITY, self.PENDING_JPEG_QUALITY])
+        self.standardizer.stage_timings.add("encode", time.perf_counter() - t0)
+        self.pending_frames.append((frame_idx, encoded))
+        self.pending_bytes += encoded.nbytes
+        if self.pending_bytes > self.PENDING_MAX_BYTES:
+            print(f"Held-back frames passed {self.PENDING_MAX_BYTES // (1024 * 1024)} MB, committing them early")
+            self._commit_pending(shot_events)
+
+    def _commit_pending(self, shot_events: List[Dict[str, Any]]):
+        for pending_idx, encoded in self.pending_frames:
+            t0 = time.perf_counter()
+            output_frame = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+            self.standardizer.stage_timings.add("encode", time.perf_counter() - t0)
+            self._commit(output_frame, shot_events)
+        self._drop_pending()
+
+    def _drop_pending(self):
+        self.pending_frames = []
+        self.pending_bytes = 0
+
+    def _commit(self, output_frame: np.ndarray, shot_events: List[Dict[str, Any]]):
+        if self.writer is not None:
+            t0 = time.perf_counter()
+            self.writer.write(output_frame)
+            self.standardizer.stage_timings.add("encode", time.perf_counter() - t0)
+        shot_events.append({"type": "frame", "frame": output_frame})
+
+    def _finish_shot(self, event: Dict[str, Any], shot_events: List[Dict[str, Any]]):
+        if not self.active:
+            return
+
+        segment = event["segment"]
+        self._release_writer()
+        self._drop_pending()
+        self.active = False
+
+        if not event["accepted"]:
+            self._discard_output()
+            shot_events.append({"type": "end", "accepted": False, "shot_index": self.next_shot_index})
+            return
+
+        # Roll back trajectory points tracked speculatively past the padded segment end
+        for key, trajectory in self.tracking_data.items():
+            self.tracking_data[key] = [point for point in trajectory if point['frame'] <= segment["end_frame"]]
+
+        shot_index = self.next_shot_index
+        self.standardizer._save_tracking_data(self.tracking_data, shot_index)
+        if self.render:
+            publish(self.temp_output_path, self.output_path)
+        self.next_shot_index += 1
+
+        shot_events.append({
+            "type": "end",
+            "accepted": True,
+            "shot_index": shot_index,
+            "segment": segment,
+            "video_path": self.output_path if self.render else None
+        })
+
+    def _abort_shot(self, shot_events: List[Dict[str, Any]]):
+        if not self.active:
+            return
+
+        self._release_writer()
+        self._drop_pending()
+        self.active = False
+        self._discard_output()
+        shot_events.append({"type": "end", "accepted": False, "shot_index": self.next_shot_index})
+
+    def _release_writer(self):
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+
+    def _discard_output(self):
+        discard(self.temp_output_path)
+
+
+class ShotMetricsStage(PipelineStage):
+    """Computes per-shot metrics from the committed frames as they arrive"""
+
+    def __init__(self, standardizer, fps: float, width: int, height: int, source_video: Optional[str] = None):
+        self.standardizer = standardizer
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.source_video = source_video  # Recorded on shots whose video is rendered on demand
+
+        self.metrics = None
+
+    def process(self, frame_idx: int, frame: np.ndarray, context: Dict[str, Any]):
+        self._consume(context)
+
+    def finish(self, context: Dict[str, Any]):
+        self._consume(context)
+
+    def _consume(self, context: Dict[str, Any]):
+        for event in context["shot_events"]:
+            if event["type"] == "start":
+                # The segment is still open, so its final length is not known yet
+                self.metrics = self.standardizer._create_metrics_accumulator(
+                    self.fps, self.width, self.height, None, event["shot_index"]
+                )
+            elif event["type"] == "frame":
+                self.metrics.add(event["frame"])
+            elif event["type"] == "end":
+                if event["accepted"] and event["video_path"] is not None:
+                    context["shots"].append(self.standardizer._build_shot_record(
+                        event["segment"], event["shot_index"], event["video_path"],
+                        self.metrics.summary(event["video_path"])
+                    ))
+                elif event["accepted"]:
+                    # No tracked video, so the middle key frame is read from the source
+                    summary = self.metrics.summary(self.source_video, start_frame=event["segment"]["start_frame"])
+                    context["shots"].append(self.standardizer._build_shot_record(
+                        event["segment"], event["shot_index"], None, summary, source_video=self.source_video
+                    ))
+                self.metrics = None
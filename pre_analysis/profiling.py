@@ -0,0 +1,325 @@
+import bisect
+import threading
+from collections import deque
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+# Stages timed on the hot path, in pipeline order
+STAGES = ("decode", "decode_wait", "motion", "convert", "pose", "hands", "ball", "draw", "encode",
+          "tracking_write", "json_write")
+
+# Upper bounds in seconds of the per-call latency buckets
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Upper bounds in seconds of the per-job wall time buckets
+JOB_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+_enabled = True
+
+
+def set_enabled(enabled: bool):
+    """Turn stage timing on or off for the whole process"""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    """Whether stage timing is on"""
+    return _enabled
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with Prometheus semantics"""
+
+    def __init__(self, bounds: Tuple[float, ...] = STAGE_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile as the upper bound of the bucket containing it
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            Seconds, None without observations, or inf past the last bucket
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le label, cumulative count) pairs for the exposition format"""
+        pairs = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            pairs.append((f"{bound:g}", cumulative))
+        pairs.append(("+Inf", self.count))
+        return pairs
+
+
+class StageTimings:
+    """
+    Accumulated wall time per pipeline stage
+
+    Callers time a stage with time.perf_counter() and add() the difference.
+    Every add is forwarded to the parent, so a shot's timings roll up into its
+    job's and a job's into the process-wide ProcessMetrics. The decode thread
+    and the inference thread add to the same instance, so updates are
+    locked. decode is the time spent decoding, on whichever thread does it,
+    and decode_wait the time inference spent blocked waiting for a frame;
+    with prefetching the gap between the two is decode time hidden behind
+    inference. When profiling is disabled add() returns immediately.
+    """
+
+    def __init__(self, parent=None, histograms: bool = False):
+        self.parent = parent
+        self.histograms = histograms  # Keep per-call latency histograms, not just totals
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear all stage totals"""
+        with self._lock:
+            self.seconds = {stage: 0.0 for stage in STAGES}
+            self.counts = {stage: 0 for stage in STAGES}
+            self.latency = {}
+
+    def add(self, stage: str, seconds: float):
+        """
+        Record one timed call of a stage
+
+        Args:
+            stage: Stage name
+            seconds: Elapsed wall time
+        """
+        if not _enabled:
+            return
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+            if self.histograms:
+                histogram = self.latency.get(stage)
+                if histogram is None:
+                    histogram = self.latency[stage] = Histogram()
+                histogram.observe(seconds)
+        if self.parent is not None:
+            self.parent.add(stage, seconds)
+
+    def merge_totals(self, stage_timings: Dict[str, Dict[str, Any]]):
+        """
+        Add the totals of timings recorded elsewhere, e.g. in a tracking worker process
+
+        Args:
+            stage_timings: Output of another instance's as_dict()
+        """
+        if not _enabled:
+            return
+        with self._lock:
+            for stage, totals in stage_timings.items():
+                self.seconds[stage] = self.seconds.get(stage, 0.0) + totals["total_ms"] / 1000
+                self.counts[stage] = self.counts.get(stage, 0) + totals["calls"]
+        if self.parent is not None:
+            self.parent.merge_totals(stage_timings)
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Stage totals for the results JSON
+
+        Returns:
+            Dictionary of stage name to total milliseconds, call count and mean
+            milliseconds per call (plus bucket p50/p95 with histograms), for
+            every stage that ran
+        """
+        with self._lock:
+            stages = {}
+            for stage, seconds in self.seconds.items():
+                if not self.counts[stage]:
+                    continue
+                stages[stage] = {
+                    "total_ms": round(1000 * seconds, 3),
+                    "calls": self.counts[stage],
+                    "mean_ms": round(1000 * seconds / self.counts[stage], 3)
+                }
+                histogram = self.latency.get(stage)
+                if histogram is not None:
+                    stages[stage]["p50_ms"] = _milliseconds(histogram.quantile(0.5))
+                    stages[stage]["p95_ms"] = _milliseconds(histogram.quantile(0.95))
+            return stages
+
+
+class ProcessMetrics:
+    """
+    Process-wide stage latency histograms, totals and job counters
+
+    Histograms and counters are cumulative since start-up, as Prometheus
+    expects. A rolling window of the most recent calls per stage backs the
+    p50/p95 figures in /api/status. Totals merged from tracking worker
+    processes only reach the counters, since their individual calls are not
+    known.
+    """
+
+    def __init__(self, window: int = 2048):
+        self._lock = threading.Lock()
+        self.window = window
+        self.latency = {stage: Histogram() for stage in STAGES}
+        self.seconds = {stage: 0.0 for stage in STAGES}
+        self.counts = {stage: 0 for stage in STAGES}
+        self.recent = {stage: deque(maxlen=window) for stage in STAGES}
+        self.job_duration = Histogram(JOB_BUCKETS)
+        self.jobs = {}  # Outcome -> count
+        self.frames = 0
+
+    def add(self, stage: str, seconds: float):
+        if not _enabled:
+            return
+        with self._lock:
+            if stage not in self.latency:
+                self.latency[stage] = Histogram()
+                self.seconds[stage] = 0.0
+                self.counts[stage] = 0
+                self.recent[stage] = deque(maxlen=self.window)
+            self.latency[stage].observe(seconds)
+            self.seconds[stage] += seconds
+            self.counts[stage] += 1
+            self.recent[stage].append(seconds)
+
+    def merge_totals(self, stage_timings: Dict[str, Dict[str, Any]]):
+        with self._lock:
+            for stage, totals in stage_timings.items():
+                self.seconds[stage] = self.seconds.get(stage, 0.0) + totals["total_ms"] / 1000
+                self.counts[stage] = self.counts.get(stage, 0) + totals["calls"]
+
+    def record_job(self, seconds: float, outcome: str, frames: int = 0):
+        """
+        Count a finished analysis job
+
+        Args:
+            seconds: Wall time of the job
+            outcome: "completed", "failed" or "cached"
+            frames: Frames decoded for the job
+        """
+        with self._lock:
+            self.jobs[outcome] = self.jobs.get(outcome, 0) + 1
+            self.frames += frames
+            if outcome != "cached":
+                self.job_duration.observe(seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        """Rolling per-stage percentiles and job counters for the status endpoint"""
+        with self._lock:
+            stages = {}
+            for stage, samples in self.recent.items():
+                if not samples:
+                    continue
+                ordered = sorted(samples)
+                stages[stage] = {
+                    "samples": len(ordered),
+                    "p50_ms": round(1000 * ordered[len(ordered) // 2], 3),
+                    "p95_ms": round(1000 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+                    "total_seconds": round(self.seconds[stage], 3)
+                }
+            return {
+                "enabled": _enabled,
+                "window": self.window,
+                "stages": stages,
+                "jobs": dict(self.jobs),
+                "frames": self.frames
+            }
+
+    def prometheus(self, prefix: str = "swishscan") -> List[str]:
+        """
+        Exposition-format lines for every metric kept here
+
+        Args:
+            prefix: Metric name prefix
+
+        Returns:
+            Lines of the Prometheus text format
+        """
+        with self._lock:
+            lines = [
+                f"# HELP {prefix}_stage_duration_seconds Wall time of one call of a pipeline stage",
+                f"# TYPE {prefix}_stage_duration_seconds histogram"
+            ]
+            for stage, histogram in self.latency.items():
+                lines.extend(_histogram_lines(f"{prefix}_stage_duration_seconds", histogram, {"stage": stage}))
+
+            lines.extend(metric_lines(f"{prefix}_stage_seconds_total", "counter",
+                                      "Total wall time per stage, including tracking worker processes",
+                                      [({"stage": stage}, seconds) for stage, seconds in self.seconds.items()]))
+            lines.extend(metric_lines(f"{prefix}_stage_calls_total", "counter",
+                                      "Calls per stage, including tracking worker processes",
+                                      [({"stage": stage}, count) for stage, count in self.counts.items()]))
+
+            lines.append(f"# HELP {prefix}_job_duration_seconds Wall time of an analysis job")
+            lines.append(f"# TYPE {prefix}_job_duration_seconds histogram")
+            lines.extend(_histogram_lines(f"{prefix}_job_duration_seconds", self.job_duration, {}))
+
+            lines.extend(metric_lines(f"{prefix}_jobs_total", "counter", "Analysis jobs by outcome",
+                                      [({"outcome": outcome}, count) for outcome, count in self.jobs.items()]))
+            lines.extend(metric_lines(f"{prefix}_frames_total", "counter", "Frames decoded by analysis jobs",
+                                      [({}, self.frames)]))
+            return lines
+
+
+def metric_lines(name: str, metric_type: str, help_text: str,
+                 samples: Iterable[Tuple[Dict[str, str], float]]) -> List[str]:
+    """
+    Exposition-format lines of one counter or gauge
+
+    Args:
+        name: Metric name
+        metric_type: "counter" or "gauge"
+        help_text: HELP description
+        samples: (labels, value) pairs
+
+    Returns:
+        Lines of the Prometheus text format
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(labels)} {float(value):g}")
+    return lines
+
+
+def _histogram_lines(name: str, histogram: Histogram, labels: Dict[str, str]) -> List[str]:
+    lines = [f"{name}_bucket{_labels({**labels, 'le': le})} {count}" for le, count in histogram.cumulative()]
+    lines.append(f"{name}_sum{_labels(labels)} {histogram.total:g}")
+    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+    return lines
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _milliseconds(seconds: Optional[float]) -> Optional[float]:
+    # Past the last bucket there is no finite estimate
+    if seconds is None or seconds == float("inf"):
+        return None
+    return round(1000 * seconds, 3)
+
+
+# Aggregates of every standardizer in this process
+PROCESS_METRICS = ProcessMetrics()
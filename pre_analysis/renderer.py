@@ -0,0 +1,90 @@
+import cv2
+import numpy as np
+from typing import Dict, Any, Tuple
+
+from pre_analysis.tracking_store import load_tracking
+from pre_analysis.decoder import open_decoder
+from pre_analysis.artifacts import temp_path, publish, discard
+
+
+def render_shot_video(source_video: str, segment: Dict[str, Any], tracking_file: str, output_path: str,
+                      shot_index: int, decode_backend: str = "auto") -> str:
+    """
+    Render the tracking overlay of a shot from its stored tracking data
+
+    Used when tracked videos are not written during analysis: the segment is
+    decoded from the source video once and the arm lines, ball position and
+    trails are drawn from the tracking arrays. The video is written under a
+    temporary name and renamed, so a concurrent reader never sees a partial file.
+
+    Args:
+        source_video: Path to the original video
+        segment: Shot segment information
+        tracking_file: Tracking file of the shot
+        output_path: Where to write the rendered video
+        shot_index: Index of the shot, shown in the overlay
+        decode_backend: Decoder used for the source video; must match the one used
+            for analysis so frame numbers line up
+
+    Returns:
+        Path to the rendered video
+    """
+    tracking = load_tracking(tracking_file)
+    pose = tracking["pose_trajectories"]
+    hands = tracking["hand_trajectories"]
+    ball = tracking["ball_trajectories"]
+
+    decoder = open_decoder(source_video, decode_backend)
+    fps = decoder.fps
+    width = decoder.width
+    height = decoder.height
+
+    tmp_path = temp_path(output_path)
+    out = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+
+    try:
+        for frame_idx, frame in decoder.frames(segment["start_frame"], segment["end_frame"]):
+            # Rows recorded up to and including this frame
+            pose_end = int(np.searchsorted(pose["frame"], frame_idx, side='right'))
+            hand_end = int(np.searchsorted(hands["frame"], frame_idx, side='right'))
+            ball_end = int(np.searchsorted(ball["frame"], frame_idx, side='right'))
+
+            if pose_end > 0 and pose["frame"][pose_end - 1] == frame_idx:
+                row = pose_end - 1
+                cv2.line(frame, _point(pose["left_shoulder"][row]), _point(pose["left_wrist"][row]), (0, 255, 0), 3)
+                cv2.line(frame, _point(pose["right_shoulder"][row]), _point(pose["right_wrist"][row]), (0, 255, 0), 3)
+
+            # Trails over the last 10 pose and hand points and 15 ball points
+            _draw_trail(frame, pose["left_wrist"][max(0, pose_end - 10):pose_end], (0, 255, 255), 2)
+            _draw_trail(frame, pose["right_wrist"][max(0, pose_end - 10):pose_end], (255, 0, 255), 2)
+            _draw_trail(frame, hands["wrist"][max(0, hand_end - 10):hand_end], (255, 255, 0), 2)
+            _draw_trail(frame, ball["position"][max(0, ball_end - 15):ball_end], (0, 255, 0), 3)
+
+            if ball_end > 0 and ball["frame"][ball_end - 1] == frame_idx:
+                ball_pos = _point(ball["position"][ball_end - 1])
+                cv2.circle(frame, ball_pos, 15, (0, 0, 255), -1)
+                cv2.circle(frame, ball_pos, 20, (255, 255, 255), 2)
+
+            cv2.putText(frame, f"Shot {shot_index+1}", (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+            cv2.putText(frame, f"Frame: {frame_idx}", (10, 70),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            out.write(frame)
+    except BaseException:
+        out.release()
+        discard(tmp_path)
+        raise
+    finally:
+        decoder.close()
+        out.release()
+
+    return publish(tmp_path, output_path)
+
+
+def _point(row: np.ndarray) -> Tuple[int, int]:
+    return (int(row[0]), int(row[1]))
+
+
+def _draw_trail(frame: np.ndarray, points: np.ndarray, color: Tuple[int, int, int], thickness: int):
+    for i in range(len(points) - 1):
+        cv2.line(frame, _point(points[i]), _point(points[i + 1]), color, thickness)
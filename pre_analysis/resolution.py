@@ -0,0 +1,65 @@
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+
+class InferenceResizer:
+    """
+    Resizes frames once to the inference resolution and maps points back
+
+    Every detector runs on the downscaled buffer returned by prepare(), so
+    per-frame cost no longer depends on the resolution the clip was filmed at.
+    Points found there are mapped back to source pixels with to_source(), which
+    is the one transform used for every landmark and ball coordinate. Frames
+    at or below the inference height pass through untouched.
+    """
+
+    def __init__(self, inference_height: Optional[int] = None):
+        self.inference_height = inference_height
+        self.source_size = None
+        self.inference_size = None
+        self.scale = 1.0  # Inference pixels per source pixel
+        self._buffer = None
+        self._factors = (1.0, 1.0)
+
+    def prepare(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Resize a source frame to the inference resolution
+
+        Args:
+            frame: BGR source frame
+
+        Returns:
+            The frame at inference resolution, in a reused buffer (or the frame
+            itself when no resize is needed)
+        """
+        height, width = frame.shape[:2]
+        if (width, height) != self.source_size:
+            self._configure(width, height)
+
+        if self.inference_size == self.source_size:
+            return frame
+        return cv2.resize(frame, self.inference_size, dst=self._buffer, interpolation=cv2.INTER_AREA)
+
+    def to_source(self, point: Tuple[float, float]) -> Tuple[int, int]:
+        """
+        Map a point from inference pixels to source pixels
+
+        Args:
+            point: (x, y) in inference pixels
+
+        Returns:
+            (x, y) in source pixels
+        """
+        return (int(round(float(point[0]) * self._factors[0])), int(round(float(point[1]) * self._factors[1])))
+
+    def _configure(self, width: int, height: int):
+        self.source_size = (width, height)
+        if self.inference_height is None or height <= self.inference_height:
+            self.inference_size = self.source_size
+            self.scale = 1.0
+        else:
+            self.scale = self.inference_height / height
+            self.inference_size = (max(1, int(round(width * self.scale))), self.inference_height)
+        self._factors = (width / self.inference_size[0], height / self.inference_size[1])
+        self._buffer = np.empty((self.inference_size[1], self.inference_size[0], 3), dtype=np.uint8)
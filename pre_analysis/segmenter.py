@@ -0,0 +1,307 @@
+from typing import List, Dict, Any
+
+
+class OnlineShotSegmenter:
+    """
+    Incremental shot-boundary detector over a stream of motion scores
+
+    Frames scoring above the motion threshold are grouped into segments, and a
+    new segment starts whenever two high-motion frames are more than two seconds
+    apart. A segment is emitted as soon as that gap closes, so callers can start
+    tracking a shot while later frames are still being decoded.
+
+    The segments match the batch detector this replaced. Like it, a video with
+    fewer than 10 frames above the threshold is segmented with an adaptive
+    threshold of 50% of the maximum score instead. Whether that happens is only
+    known once 10 frames have passed the threshold, so a segment closing
+    before then is deferred: its "close" event is not accepted, and a
+    "confirm" event re-emits it when the 10th frame arrives. Deferred segments
+    are dropped if the stream ends first.
+
+    Until then the adaptive pass needs, for a cutoff only known at the end,
+    where frames above it start and end. Frames are summarised in windows no
+    longer than the 2 second gap, so a window's frames above any cutoff
+    always end up in the same segment. Only its first and last such frame
+    matter. These are found among the window's running-maximum records from
+    the left and from the right, which is all that is kept per window. Windows
+    whose maximum falls to half the running maximum can never contribute and
+    are dropped. At most MAX_ADAPTIVE_WINDOWS windows are kept, the ones with
+    the highest maxima. The result matches the batch detector exactly unless
+    more windows than that stay in contention, e.g. over an hour of
+    near-uniform low motion. Once 10 frames pass the threshold, only the open
+    segment and running statistics are kept.
+
+    push() and finish() return lists of events:
+        "open"     - first high-motion frame of a new segment
+        "extend"   - another high-motion frame inside the open segment
+        "reject"   - the open segment grew past the maximum duration
+        "close"    - the open segment ended; "accepted" tells if it passed the duration
+                     filter, "deferred" if it passed but waits for a "confirm"
+        "confirm"  - a deferred segment is final; its frames have usually been decoded already
+        "fallback" - a segment produced by the end-of-stream fallbacks when nothing was accepted
+    """
+
+    # Fewer frames above the threshold than this switches to the adaptive threshold
+    MIN_HIGH_FRAMES = 10
+    # Windows summarised for the adaptive threshold; 2048 covers 68 minutes of low motion
+    MAX_ADAPTIVE_WINDOWS = 2048
+
+    def __init__(self, fps: float, motion_threshold: float, min_shot_duration: float,
+                 max_shot_duration: float):
+        self.fps = fps
+        self.motion_threshold = motion_threshold
+        self.gap_frames = 2 * fps  # More flexible gap detection (2 seconds instead of 1)
+        self.padding_frames = int(0.5 * fps)  # 0.5 second padding
+        self.min_frames = int(min_shot_duration * fps)
+        self.max_frames = int(max_shot_duration * fps)
+
+        # Adaptive threshold fallback: [max, left records, right records] per window, in frame order,
+        # and the scores of the window being filled
+        self.window_frames = max(1, int(self.gap_frames))
+        self.adaptive_windows = []
+        self.window_scores = []
+        self.deferred = []  # Segments that passed the duration filter before MIN_HIGH_FRAMES was reached
+
+        self.first_high = None
+        self.last_high = None
+        self.rejected = False
+
+        self.frame_count = 0
+        self.high_frame_count = 0
+        self.accepted_count = 0
+        self.max_score = 0.0
+        self.max_score_frame = 0
+        self.score_sum = 0.0
+
+    @property
+    def mean_score(self) -> float:
+        return self.score_sum / self.frame_count if self.frame_count else 0.0
+
+    def push(self, score: float) -> List[Dict[str, Any]]:
+        """
+        Feed the motion score of the next frame
+
+        Args:
+            score: Motion score of the frame
+
+        Returns:
+            List of segment events triggered by this frame
+        """
+        frame_idx = self.frame_count
+        self.frame_count += 1
+        self.score_sum += score
+        self._update_adaptive_candidates(frame_idx, score)
+
+        events = []
+
+        # Close the open segment once the gap can no longer be bridged
+        if self.last_high is not None and frame_idx - self.last_high > self.gap_frames:
+            events.append(self._close_segment(frame_idx - 1))
+
+        if score > self.motion_threshold:
+            self.high_frame_count += 1
+            if self.high_frame_count == self.MIN_HIGH_FRAMES:
+                # The adaptive threshold can no longer apply, so deferred segments are final
+                for segment in self.deferred:
+                    self.accepted_count += 1
+                    events.append({"type": "confirm", "segment": segment})
+                self.deferred = []
+                self.adaptive_windows = []
+                self.window_scores = []
+            if self.first_high is None:
+                self.first_high = frame_idx
+                self.rejected = False
+                events.append({
+                    "type": "open",
+                    "start_frame": max(0, frame_idx - self.padding_frames),
+                    "commit_until": frame_idx + self.padding_frames
+                })
+            else:
+                events.append({
+                    "type": "extend",
+                    "commit_until": frame_idx + self.padding_frames
+                })
+            self.last_high = frame_idx
+
+            # Segments over the maximum duration are dropped, so callers can stop tracking early
+            if not self.rejected and self.last_high - self.first_high > self.max_frames:
+                self.rejected = True
+                events.append({"type": "reject"})
+
+        return events
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """
+        Close the stream, flushing the open segment and applying the fallbacks
+
+        Returns:
+            List of segment events for the end of the stream
+        """
+        events = []
+        last_frame = self.frame_count - 1
+
+        if self.last_high is not None:
+            events.append(self._close_segment(last_frame))
+
+        if self.accepted_count > 0 or self.frame_count == 0:
+            return events
+
+        if self.high_frame_count == 0:
+            print("No high motion frames detected. Treating entire video as one shot.")
+            events.append({"type": "fallback", "segment": self._make_segment(0, last_frame, pad=False)})
+            return events
+
+        # Use adaptive threshold if too few high motion frames; it replaces the deferred segments
+        if self.high_frame_count < self.MIN_HIGH_FRAMES:
+            self.deferred = []
+            print("Too few high motion frames. Using adaptive threshold...")
+            adaptive_threshold = self.max_score * 0.5
+            self._close_window()
+            # First and last frame above the threshold per window; frames between them never split a segment
+            candidates = []
+            for _, left_records, right_records in self.adaptive_windows:
+                first = next((idx for idx, score in left_records if score > adaptive_threshold), None)
+                if first is None:
+                    continue
+                last = next(idx for idx, score in right_records if score > adaptive_threshold)
+                candidates.extend([first] if first == last else [first, last])
+            print(f"Adaptive threshold {adaptive_threshold:.4f} kept {len(candidates)} segment bounds")
+            for segment in self._group_frames(candidates, last_frame):
+                events.append({"type": "fallback", "segment": segment})
+            if any(event["type"] == "fallback" for event in events):
+                return events
+
+        # Find the highest motion period and treat it as a shot
+        print("No segments passed duration filter. Using fallback approach...")
+        segment_duration = int(3 * self.fps)  # 3 second segment
+        start_frame = max(0, self.max_score_frame - segment_duration // 2)
+        end_frame = min(last_frame, self.max_score_frame + segment_duration // 2)
+        events.append({"type": "fallback", "segment": self._make_segment(start_frame, end_frame, pad=False)})
+        print(f"Fallback: Created segment around max motion at frame {self.max_score_frame}")
+
+        return events
+
+    @staticmethod
+    def segments_in(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Pick out the segments that should be processed from a list of events
+
+        Args:
+            events: Events returned by push() or finish()
+
+        Returns:
+            Accepted and fallback segments in emission order
+        """
+        return [event["segment"] for event in events
+                if event["type"] in ("confirm", "fallback") or (event["type"] == "close" and event["accepted"])]
+
+    def _update_adaptive_candidates(self, frame_idx: int, score: float):
+        if score > self.max_score:
+            self.max_score = score
+            self.max_score_frame = frame_idx
+            cutoff = self.max_score * 0.5
+            self.adaptive_windows = [window for window in self.adaptive_windows if window[0] > cutoff]
+
+        # Once the regular threshold has enough frames the adaptive fallback can never run
+        if self.high_frame_count < self.MIN_HIGH_FRAMES:
+            self.window_scores.append(score)
+            if len(self.window_scores) == self.window_frames:
+                self._close_window()
+
+    def _close_window(self):
+        """Summarise the window being filled by its running-maximum records above half the running maximum"""
+        scores = self.window_scores
+        self.window_scores = []
+        cutoff = self.max_score * 0.5
+        if not scores or max(scores) <= cutoff:
+            return
+
+        window_start = self.frame_count - len(scores)
+        left_records = []
+        best = None
+        for offset, score in enumerate(scores):
+            if best is None or score > best:
+                best = score
+                if score > cutoff:
+                    left_records.append((window_start + offset, score))
+        right_records = []
+        best = None
+        for offset in range(len(scores) - 1, -1, -1):
+            if best is None or scores[offset] > best:
+                best = scores[offset]
+                if best > cutoff:
+                    right_records.append((window_start + offset, best))
+
+        self.adaptive_windows.append([max(scores), left_records, right_records])
+        if len(self.adaptive_windows) > self.MAX_ADAPTIVE_WINDOWS:
+            # Keep the windows most likely to clear the final threshold
+            self.adaptive_windows.remove(min(self.adaptive_windows, key=lambda window: window[0]))
+
+    def _close_segment(self, last_frame: int) -> Dict[str, Any]:
+        """
+        Close the open segment and apply the duration filter and padding
+
+        Args:
+            last_frame: Index of the last frame decoded so far
+
+        Returns:
+            A "close" event describing the finished segment
+        """
+        span = self.last_high - self.first_high
+        duration = span / self.fps
+        accepted = self.min_frames <= span <= self.max_frames
+        segment = self._make_segment(self.first_high, min(last_frame, self.last_high + self.padding_frames))
+        deferred = accepted and self.high_frame_count < self.MIN_HIGH_FRAMES
+
+        if deferred:
+            self.deferred.append(segment)
+            print(f"  -> Deferred: {segment['start_frame']} to {segment['end_frame']} ({duration:.2f}s), "
+                  f"waiting for {self.MIN_HIGH_FRAMES} high motion frames")
+        elif accepted:
+            self.accepted_count += 1
+            print(f"  -> Accepted: {segment['start_frame']} to {segment['end_frame']} ({duration:.2f}s)")
+        else:
+            print(f"  -> Rejected: duration {duration:.2f}s outside range")
+
+        self.first_high = None
+        self.last_high = None
+
+        return {"type": "close", "accepted": accepted and not deferred, "deferred": deferred, "segment": segment}
+
+    def _group_frames(self, high_frames: List[int], last_frame: int) -> List[Dict[str, Any]]:
+        """
+        Group a sorted list of high-motion frames into padded, duration-filtered segments
+
+        Args:
+            high_frames: Sorted frame indices above the threshold
+            last_frame: Index of the last frame in the video
+
+        Returns:
+            List of accepted shot segments
+        """
+        if not high_frames:
+            return []
+
+        groups = []
+        start = high_frames[0]
+        for prev, current in zip(high_frames, high_frames[1:]):
+            if current - prev > self.gap_frames:
+                groups.append((start, prev))
+                start = current
+        groups.append((start, high_frames[-1]))
+
+        return [
+            self._make_segment(start, min(last_frame, end + self.padding_frames))
+            for start, end in groups
+            if self.min_frames <= end - start <= self.max_frames
+        ]
+
+    def _make_segment(self, first_frame: int, end_frame: int, pad: bool = True) -> Dict[str, Any]:
+        start_frame = max(0, first_frame - self.padding_frames) if pad else first_frame
+        return {
+            "start_frame": start_frame,
+            "end_frame": end_frame,
+            "start_time": start_frame / self.fps,
+            "end_time": end_frame / self.fps,
+            "duration": (end_frame - start_frame) / self.fps
+        }
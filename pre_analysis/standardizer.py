@@ -2,20 +2,95 @@ import cv2
 import numpy as np
 import os
 import json
-from typing import List, Dict, Any, Tuple, Optional
+import hashlib
+from typing import List, Dict, Any, Tuple, Optional, Callable
 from pathlib import Path
 import tempfile
+import time
+import multiprocessing
+import functools
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
 from datetime import datetime
 import mediapipe as mp
 
+from pre_analysis.pipeline import (FramePipeline, MotionScoringStage, ShotSegmentStage,
+                                   ShotTrackingStage, ShotMetricsStage)
+from pre_analysis.segmenter import OnlineShotSegmenter
+from pre_analysis.motion import MotionScorer, compare_segments
+from pre_analysis.metrics import ShotMetricsAccumulator
+from pre_analysis.tracking_store import save_tracking
+from pre_analysis.ball_detector import BallSegmenter
+from pre_analysis.landmarks import LandmarkTracker, FrameLandmarks, PALM_CENTER
+from pre_analysis.resolution import InferenceResizer
+from pre_analysis.decoder import VideoDecoder, open_decoder, get_index, resolve_backend
+from pre_analysis.profiling import StageTimings, PROCESS_METRICS, is_enabled, set_enabled
+from pre_analysis.artifacts import temp_path, publish, write_json
+
+# Bump when a detector's output changes so cached results are invalidated
+PIPELINE_VERSIONS = {
+    "motion_scorer": 2,
+    "segmenter": 2,
+    "pose_tracker": 1,
+    "hand_tracker": 1,
+    "ball_detector": 3,
+    "shot_metrics": 2,
+    "tracking_format": 2,
+    "decoder": 1
+}
+
 class VideoStandardizer:
-    def __init__(self):
+    def __init__(self, single_pass: bool = False, motion_downscale: float = 1.0,
+                 motion_stride: int = 1, motion_batch_size: int = 1, tracking_workers: int = 1,
+                 ball_roi_search: bool = False, ball_full_search_interval: int = 10,
+                 hand_crops: bool = False, keyframe_interval: int = 1,
+                 inference_height: Optional[int] = None, render_video: bool = True,
+                 decode_backend: str = "auto", decode_read_ahead: int = 0):
         self.min_shot_duration = 0.5  # Reduced minimum shot duration (0.5 seconds)
         self.max_shot_duration = 15.0  # Increased maximum shot duration (15 seconds)
         self.motion_threshold = 0.05  # Lowered threshold for more sensitive detection
         self.frame_rate = 30  # Target frame rate for standardization
-        
-        # Create tracked_data directory
+        self.single_pass = single_pass  # Decode each frame once through the streaming pipeline
+        
+        # Motion scoring cost knobs (defaults reproduce the full-resolution scorer)
+        self.motion_downscale = motion_downscale
+        self.motion_stride = motion_stride
+        self.motion_batch_size = motion_batch_size
+        
+        # Shots are tracked in this many worker processes (1 tracks in-process)
+        self.tracking_workers = max(1, tracking_workers)
+        self._tracking_pool = None
+        self._owns_tracking_pool = True  # False once the pool is borrowed with share_tracking_pool
+        
+        # Ball search restricted to boxes around the wrists, palms and predicted ball
+        # position, with a full-frame search every ball_full_search_interval frames
+        self.ball_roi_search = ball_roi_search
+        self.ball_full_search_interval = max(1, ball_full_search_interval)
+        self.ball_roi_radius = 150  # Half size of each search box in pixels
+        self.ball_search_frame = 0
+        self.ball_segmenter = BallSegmenter()
+        
+        # Detectors run on frames resized to this height (None keeps the source
+        # resolution); their pixel constants are in source pixels and scaled to match
+        self.inference_height = inference_height
+        self.resizer = InferenceResizer(inference_height)
+        
+        # Write the annotated shot_XXX_tracked.mp4 during analysis; when False only
+        # tracking data is stored and renderer.render_shot_video draws it on demand
+        self.render_video = render_video
+        
+        # Frames come from a pluggable decoder with a per-upload keyframe index, so
+        # segment seeks are frame-accurate; decode_read_ahead > 0 pipelines decoding
+        # on a background thread that many preallocated frames ahead of tracking
+        self.decode_backend = resolve_backend(decode_backend)
+        self.decode_read_ahead = max(0, decode_read_ahead)
+        
+        # Wall time per stage: the current shot's timings roll up into the job's
+        # (with latency histograms), which roll up into the process-wide metrics
+        self.job_timings = StageTimings(parent=PROCESS_METRICS, histograms=True)
+        self.stage_timings = StageTimings(parent=self.job_timings)
+        
+        # Create tracked_data directory (standardize_video can redirect a job's
+        # artifacts to its own directory)
         self.tracked_data_dir = "tracked_data"
         os.makedirs(self.tracked_data_dir, exist_ok=True)
         
@@ -39,117 +114,466 @@ class VideoStandardizer:
             max_num_hands=2
         )
         
-    def standardize_video(self, video_path: str) -> List[Dict[str, Any]]:
+        # Pose runs first on each frame and, with hand_crops, tells the hand
+        # model where to look. Above 1, keyframe_interval runs the models only on
+        # keyframes and propagates landmarks in between.
+        self.hand_crops = hand_crops
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.landmark_tracker = LandmarkTracker(self.pose, self.hands, hand_crops=hand_crops,
+                                                keyframe_interval=self.keyframe_interval,
+                                                timings=self.stage_timings)
+        
+    def standardize_video(self, video_path: str,
+                          progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                          output_dir: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Main function to standardize a basketball video and split into individual shots
         
         Args:
             video_path (str): Path to the input video file
+            progress_callback: Optional callable receiving progress update dictionaries
+                ("frames" with frames_processed/total_frames, "shot_detected",
+                "shot_completed" and "shot_discarded" with shot_index). May be called
+                from worker threads.
+            output_dir: Directory for this video's shot artifacts; defaults to
+                tracked_data/. Concurrent jobs need one each, since shot files are
+                named by shot index only.
             
         Returns:
             List of dictionaries containing standardized shot data
         """
+        default_dir = self.tracked_data_dir
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            self.tracked_data_dir = output_dir
+        try:
+            return self._standardize_video(video_path, progress_callback)
+        finally:
+            self.tracked_data_dir = default_dir
+    
+    def _standardize_video(self, video_path: str,
+                           progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """Standardize a video into the current tracked_data_dir (see standardize_video)"""
         print(f"Starting video standardization for: {video_path}")
+        self.job_timings.reset()
         
-        # Step 1: Load and validate video
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise ValueError(f"Could not open video file: {video_path}")
+        # Step 1: Load and validate video, indexing its keyframes once for all segment seeks
+        index = get_index(video_path)
+        decoder = self._open_decoder(video_path)
         
         # Get video properties
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = decoder.fps
+        total_frames = index.frame_count
+        width = decoder.width
+        height = decoder.height
         duration = total_frames / fps
         
         print(f"Video properties: {width}x{height}, {fps} FPS, {duration:.2f}s duration")
+        print(f"Decoding with {self.decode_backend} "
+              f"({len(index.keyframes) if index.exact else 'unindexed'} keyframes)")
+        self._report_progress(progress_callback, kind="frames", frames_processed=0, total_frames=total_frames)
+        
+        # Single-pass mode decodes every frame exactly once
+        if self.single_pass:
+            try:
+                return self._standardize_single_pass(video_path, decoder, fps, width, height, progress_callback)
+            finally:
+                decoder.close()
+        
+        # Step 2 and 3: Detect shot segments and process each one as soon as its
+        # boundary closes, overlapping tracking of shot N with decoding of shot N+1
+        shot_futures = []
+        if self.tracking_workers > 1:
+            # Segments are independent, so spread them over worker processes that
+            # each own their own MediaPipe graphs
+            tracker = self._get_tracking_pool()
+            track_segment = functools.partial(_track_segment_in_worker, output_dir=self.tracked_data_dir)
+        else:
+            tracker = ThreadPoolExecutor(max_workers=1)
+            track_segment = self._process_shot_segment
         
-        # Step 2: Detect shot segments
-        shot_segments = self._detect_shot_segments(cap, fps)
-        cap.release()
+        try:
+            def queue_shot(segment: Dict[str, Any]):
+                shot_index = len(shot_futures)
+                print(f"Processing shot {shot_index+1}")
+                self._report_progress(progress_callback, kind="shot_detected", shot_index=shot_index)
+                future = tracker.submit(track_segment, video_path, segment, shot_index)
+                future.add_done_callback(
+                    lambda done, index=shot_index: self._report_progress(
+                        progress_callback, kind="shot_completed", shot_index=index,
+                        ok=done.exception() is None and done.result() is not None
+                    )
+                )
+                shot_futures.append(future)
+            
+            try:
+                shot_segments = self._detect_shot_segments(decoder, fps, on_segment=queue_shot,
+                                                           progress_callback=progress_callback)
+            finally:
+                decoder.close()
+            
+            print(f"Detected {len(shot_segments)} shot segments")
+            
+            # Collect in submission order so shots come back in video order
+            standardized_shots = []
+            for future in shot_futures:
+                shot_data = future.result()
+                if shot_data:
+                    if self.tracking_workers > 1:
+                        # Worker processes timed the shot into their own job totals
+                        self.job_timings.merge_totals(shot_data["stage_timings"])
+                    standardized_shots.append(shot_data)
+        finally:
+            # After a failure, drop queued shots and wait for running ones, so nothing
+            # writes into the job's directory after the job is reported failed
+            for future in shot_futures:
+                future.cancel()
+            wait(shot_futures)
+            if tracker is not self._tracking_pool:
+                tracker.shutdown(wait=True)
+        
+        return standardized_shots
+    
+    def config_fingerprint(self) -> str:
+        """
+        Fingerprint of every setting that affects the standardized output
+        
+        Returns:
+            Hex digest that changes whenever thresholds, scoring knobs or detector versions change
+        """
+        settings = {
+            "motion_threshold": self.motion_threshold,
+            "min_shot_duration": self.min_shot_duration,
+            "max_shot_duration": self.max_shot_duration,
+            "motion_downscale": self.motion_downscale,
+            "motion_stride": self.motion_stride,
+            "single_pass": self.single_pass,
+            "ball_roi_search": self.ball_roi_search,
+            "ball_full_search_interval": self.ball_full_search_interval if self.ball_roi_search else None,
+            "hand_crops": self.hand_crops,
+            "keyframe_interval": self.keyframe_interval,
+            "inference_height": self.inference_height,
+            "render_video": self.render_video,
+            "decode_backend": self.decode_backend,
+            "versions": PIPELINE_VERSIONS
+        }
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+    
+    def _worker_settings(self) -> Dict[str, Any]:
+        """
+        Settings for the standardizer owned by each tracking worker
+        
+        Returns:
+            Keyword arguments for VideoStandardizer, plus the process-wide profiling switch
+        """
+        return {
+            "profiling_enabled": is_enabled(),
+            "single_pass": False,
+            "motion_downscale": self.motion_downscale,
+            "motion_stride": self.motion_stride,
+            "motion_batch_size": self.motion_batch_size,
+            "tracking_workers": 1,
+            "ball_roi_search": self.ball_roi_search,
+            "ball_full_search_interval": self.ball_full_search_interval,
+            "hand_crops": self.hand_crops,
+            "keyframe_interval": self.keyframe_interval,
+            "inference_height": self.inference_height,
+            "render_video": self.render_video,
+            "decode_backend": self.decode_backend,
+            "decode_read_ahead": self.decode_read_ahead
+        }
+    
+    def _get_tracking_pool(self) -> ProcessPoolExecutor:
+        """
+        Get the tracking process pool, starting it on first use
         
-        print(f"Detected {len(shot_segments)} shot segments")
+        Workers are spawned rather than forked so no MediaPipe graph state is
+        inherited from this process, and the pool is reused across videos so the
+        models are only loaded once per worker.
         
-        # Step 3: Process each shot segment
-        standardized_shots = []
-        for i, segment in enumerate(shot_segments):
-            print(f"Processing shot {i+1}/{len(shot_segments)}")
-            shot_data = self._process_shot_segment(video_path, segment, i)
+        Returns:
+            The shared ProcessPoolExecutor
+        """
+        if self._tracking_pool is None:
+            print(f"Starting {self.tracking_workers} shot tracking workers")
+            self._tracking_pool = ProcessPoolExecutor(
+                max_workers=self.tracking_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_tracking_worker,
+                initargs=(self._worker_settings(),)
+            )
+        return self._tracking_pool
+    
+    def share_tracking_pool(self, owner: "VideoStandardizer"):
+        """
+        Track shots in another standardizer's worker processes instead of starting our own
+        
+        Pooled standardizers share one set of workers, so the process count stays
+        at tracking_workers however many standardizers there are. The owner
+        starts the pool if needed and shuts it down in cleanup().
+        
+        Args:
+            owner: Standardizer with the same settings whose tracking pool is used
+        """
+        self._tracking_pool = owner._get_tracking_pool()
+        self._owns_tracking_pool = False
+    
+    def _report_progress(self, progress_callback: Optional[Callable[[Dict[str, Any]], None]], **update):
+        """
+        Forward a progress update to the caller's callback, if any
+        
+        Args:
+            progress_callback: Callback passed to standardize_video, or None
+            **update: Fields of the progress update
+        """
+        if progress_callback is None:
+            return
+        try:
+            progress_callback(update)
+        except Exception as e:
+            print(f"Progress callback failed: {e}")
+    
+    def _open_decoder(self, video_path: str) -> VideoDecoder:
+        """Open a video with the configured decode backend and read-ahead"""
+        return open_decoder(video_path, self.decode_backend, read_ahead=self.decode_read_ahead)
+    
+    def _standardize_single_pass(self, video_path: str, decoder: VideoDecoder, fps: float, width: int, height: int,
+                                 progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """
+        Standardize a video by streaming each decoded frame through the stage pipeline
+        
+        Args:
+            video_path: Path to the input video file
+            decoder: Opened decoder positioned at the first frame
+            fps: Frames per second of the video
+            width: Frame width in pixels
+            height: Frame height in pixels
+            progress_callback: Optional callable receiving progress update dictionaries
+            
+        Returns:
+            List of dictionaries containing standardized shot data
+        """
+        segment_stage = ShotSegmentStage(self, fps)
+        pipeline = FramePipeline([
+            MotionScoringStage(self),
+            segment_stage,
+            ShotTrackingStage(self, fps, width, height),
+            ShotMetricsStage(self, fps, width, height, source_video=video_path)
+        ])
+        context = pipeline.run(
+            decoder, timings=self.job_timings, progress_callback=lambda update: self._report_progress(progress_callback, **update)
+        )
+        
+        segmenter = segment_stage.segmenter
+        if segmenter.frame_count == 0:
+            return []
+        
+        print(f"Motion analysis complete. Max motion score: {segmenter.max_score:.4f}")
+        print(f"Average motion score: {segmenter.mean_score:.4f}")
+        
+        # Fallback segments are only known once the stream has ended, and segments
+        # confirmed after they closed were not kept, so those rare cases pay for a
+        # second decode of just their window
+        standardized_shots = context["shots"]
+        for segment in context["fallback_segments"]:
+            shot_index = len(standardized_shots)
+            print(f"Processing fallback shot {shot_index+1}")
+            self._report_progress(progress_callback, kind="shot_detected", shot_index=shot_index)
+            shot_data = self._process_shot_segment(video_path, segment, shot_index)
+            self._report_progress(progress_callback, kind="shot_completed", shot_index=shot_index,
+                                  ok=shot_data is not None)
             if shot_data:
                 standardized_shots.append(shot_data)
         
-        return standardized_shots
+        print(f"Detected {len(standardized_shots)} shot segments")
+        return self._renumber_shots(standardized_shots)
     
-    def _detect_shot_segments(self, cap: cv2.VideoCapture, fps: float) -> List[Dict[str, Any]]:
+    def _renumber_shots(self, shots: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Put shots in video order and renumber them and their artifacts to match
+        
+        Confirmed segments are tracked after the stream, behind shots that start
+        later, so without this the single-pass results would not line up with
+        the three-pass results shot for shot.
+        
+        Args:
+            shots: Shot records, each numbered in the order it was tracked
+            
+        Returns:
+            The shot records sorted by start frame, numbered from shot_000
+        """
+        ordered = sorted(shots, key=lambda shot: shot["segment_info"]["start_frame"])
+        renames = []
+        for new_index, shot in enumerate(ordered):
+            old_id = shot["shot_id"]
+            new_id = f"shot_{new_index:03d}"
+            if old_id == new_id:
+                continue
+            
+            def renamed(path):
+                name = os.path.basename(path) if isinstance(path, str) else ""
+                if not name.startswith(old_id + "_"):
+                    return path
+                new_path = os.path.join(os.path.dirname(path), new_id + name[len(old_id):])
+                renames.append((path, new_path))
+                return new_path
+            
+            shot["shot_id"] = new_id
+            shot["video_path"] = renamed(shot["video_path"])
+            shot["tracking_file"] = renamed(shot["tracking_file"])
+            key_frames = (shot.get("analysis") or {}).get("key_frames")
+            if isinstance(key_frames, dict):
+                shot["analysis"]["key_frames"] = {name: renamed(path) for name, path in key_frames.items()}
+        
+        # Two steps, since a shot may take the name another shot is giving up
+        staged = []
+        for old_path, new_path in renames:
+            if os.path.exists(old_path):
+                staging_path = temp_path(new_path)
+                os.replace(old_path, staging_path)
+                staged.append((staging_path, new_path))
+        for staging_path, new_path in staged:
+            os.replace(staging_path, new_path)
+        return ordered
+    
+    def _detect_shot_segments(self, decoder: VideoDecoder, fps: float,
+                              on_segment: Optional[Callable[[Dict[str, Any]], None]] = None,
+                              progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
         """
         Detect individual shot segments in the video using enhanced motion analysis
         
         Args:
-            cap: OpenCV video capture object
+            decoder: Opened video decoder
             fps: Frames per second of the video
+            on_segment: Optional callback invoked with each segment as soon as it is final
+            progress_callback: Optional callable receiving frame progress updates
             
         Returns:
             List of shot segment dictionaries with start/end frame info
         """
         segments = []
-        frame_count = 0
-        motion_scores = []
-        prev_frame = None
+        segmenter = self._create_segmenter(fps)
+        scorer = self._create_motion_scorer()
+        total_frames = decoder.frame_count
         
-        print(f"Analyzing {int(cap.get(cv2.CAP_PROP_FRAME_COUNT))} frames for motion...")
+        print(f"Analyzing {total_frames} frames for motion...")
+        print(f"Looking for shots with motion threshold: {self.motion_threshold}")
+        print(f"Duration range: {self.min_shot_duration}s - {self.max_shot_duration}s")
         
-        # Calculate motion scores for each frame
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-                
-            # Convert to grayscale for motion detection
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            gray = cv2.GaussianBlur(gray, (15, 15), 0)  # Reduced blur for more sensitivity
-            
-            if prev_frame is not None:
-                # Calculate frame difference with multiple methods
-                frame_diff = cv2.absdiff(prev_frame, gray)
-                
-                # Method 1: Mean difference
-                mean_diff = np.mean(frame_diff) / 255.0
-                
-                # Method 2: Standard deviation (captures more subtle motion)
-                std_diff = np.std(frame_diff) / 255.0
-                
-                # Method 3: Edge detection for motion
-                edges = cv2.Canny(gray, 50, 150)
-                edge_motion = np.mean(edges) / 255.0
-                
-                # Combine motion scores for better detection
-                motion_score = (mean_diff * 0.4 + std_diff * 0.4 + edge_motion * 0.2)
-                motion_scores.append(motion_score)
-            else:
-                motion_scores.append(0.0)
-            
-            prev_frame = gray
-            frame_count += 1
+        def emit(events: List[Dict[str, Any]]):
+            for segment in OnlineShotSegmenter.segments_in(events):
+                segments.append(segment)
+                if on_segment is not None:
+                    on_segment(segment)
+        
+        # Calculate motion scores for each frame and segment them as they arrive
+        # The scorer converts each frame before returning, so decode buffers can be recycled
+        timings = self.job_timings
+        for _, frame in decoder.frames(reuse_buffers=True, timings=timings):
+            t0 = time.perf_counter()
+            motion_scores = scorer.push(frame)
+            timings.add("motion", time.perf_counter() - t0)
+            for motion_score in motion_scores:
+                emit(segmenter.push(motion_score))
             
             # Progress indicator
-            if frame_count % 100 == 0:
-                print(f"Processed {frame_count} frames...")
+            if scorer.frame_count % 100 == 0:
+                print(f"Processed {scorer.frame_count} frames...")
+            if scorer.frame_count % 30 == 0:
+                self._report_progress(progress_callback, kind="frames",
+                                      frames_processed=scorer.frame_count, total_frames=total_frames)
         
-        # Reset video to beginning
-        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        for motion_score in scorer.flush():
+            emit(segmenter.push(motion_score))
+        
+        if segmenter.frame_count == 0:
+            return segments
         
-        print(f"Motion analysis complete. Max motion score: {max(motion_scores):.4f}")
-        print(f"Average motion score: {np.mean(motion_scores):.4f}")
+        print(f"Motion analysis complete. Max motion score: {segmenter.max_score:.4f}")
+        print(f"Average motion score: {segmenter.mean_score:.4f}")
         
-        # Detect shot boundaries based on motion patterns
-        segments = self._find_shot_boundaries(motion_scores, fps)
+        emit(segmenter.finish())
+        self._report_progress(progress_callback, kind="frames",
+                              frames_processed=scorer.frame_count, total_frames=scorer.frame_count)
+        print(f"Final segments: {len(segments)}")
         
         return segments
     
+    def _create_segmenter(self, fps: float) -> OnlineShotSegmenter:
+        """
+        Create an online shot segmenter using this standardizer's settings
+        
+        Args:
+            fps: Frames per second of the video
+            
+        Returns:
+            A fresh OnlineShotSegmenter
+        """
+        return OnlineShotSegmenter(fps, self.motion_threshold, self.min_shot_duration, self.max_shot_duration)
+    
+    def _create_motion_scorer(self, batch_size: Optional[int] = None) -> MotionScorer:
+        """
+        Create a motion scorer using this standardizer's cost settings
+        
+        Args:
+            batch_size: Override for the batch size (the streaming pipeline needs 1)
+            
+        Returns:
+            A fresh MotionScorer
+        """
+        return MotionScorer(
+            downscale=self.motion_downscale,
+            stride=self.motion_stride,
+            batch_size=self.motion_batch_size if batch_size is None else batch_size,
+            target_height=self.inference_height
+        )
+    
+    def validate_motion_scorer(self, video_path: str, tolerance_seconds: float = 0.25) -> Dict[str, Any]:
+        """
+        Check that the configured fast scorer finds the same segments as the full-resolution scorer
+        
+        Args:
+            video_path: Path to the video to compare on
+            tolerance_seconds: Maximum allowed start/end difference per segment
+            
+        Returns:
+            Dictionary with the match verdict and the largest boundary error
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file: {video_path}")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        
+        reference_scorer = MotionScorer()
+        fast_scorer = self._create_motion_scorer()
+        reference_segmenter = self._create_segmenter(fps)
+        fast_segmenter = self._create_segmenter(fps)
+        reference_segments = []
+        fast_segments = []
+        
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            for score in reference_scorer.push(frame):
+                reference_segments.extend(OnlineShotSegmenter.segments_in(reference_segmenter.push(score)))
+            for score in fast_scorer.push(frame):
+                fast_segments.extend(OnlineShotSegmenter.segments_in(fast_segmenter.push(score)))
+        cap.release()
+        
+        for score in fast_scorer.flush():
+            fast_segments.extend(OnlineShotSegmenter.segments_in(fast_segmenter.push(score)))
+        reference_segments.extend(OnlineShotSegmenter.segments_in(reference_segmenter.finish()))
+        fast_segments.extend(OnlineShotSegmenter.segments_in(fast_segmenter.finish()))
+        
+        report = compare_segments(reference_segments, fast_segments, tolerance_seconds)
+        print(f"Motion scorer validation: {'match' if report['match'] else 'MISMATCH'} "
+              f"(max boundary error {report['max_boundary_error']:.3f}s)")
+        return report
+    
     def _find_shot_boundaries(self, motion_scores: List[float], fps: float) -> List[Dict[str, Any]]:
         """
-        Find shot boundaries based on enhanced motion analysis
+        Find shot boundaries in a precomputed list of motion scores
         
         Args:
             motion_scores: List of motion scores for each frame
@@ -158,104 +582,14 @@ class VideoStandardizer:
         Returns:
             List of shot segment dictionaries
         """
+        segmenter = self._create_segmenter(fps)
         segments = []
-        min_frames = int(self.min_shot_duration * fps)
-        max_frames = int(self.max_shot_duration * fps)
-        
-        print(f"Looking for shots with motion threshold: {self.motion_threshold}")
-        print(f"Duration range: {self.min_shot_duration}s - {self.max_shot_duration}s")
+        for score in motion_scores:
+            segments.extend(OnlineShotSegmenter.segments_in(segmenter.push(score)))
+        segments.extend(OnlineShotSegmenter.segments_in(segmenter.finish()))
         
-        # Find periods of high motion (potential shots)
-        high_motion_frames = [i for i, score in enumerate(motion_scores) 
-                            if score > self.motion_threshold]
-        
-        print(f"Found {len(high_motion_frames)} frames above threshold")
-        
-        if not high_motion_frames:
-            print("No high motion frames detected. Treating entire video as one shot.")
-            # If no clear motion detected, treat entire video as one shot
-            segments.append({
-                "start_frame": 0,
-                "end_frame": len(motion_scores) - 1,
-                "start_time": 0.0,
-                "end_time": len(motion_scores) / fps,
-                "duration": len(motion_scores) / fps
-            })
-            return segments
-        
-        # Use adaptive threshold if too few high motion frames
-        if len(high_motion_frames) < 10:
-            print("Too few high motion frames. Using adaptive threshold...")
-            # Calculate adaptive threshold as 50% of max motion
-            adaptive_threshold = max(motion_scores) * 0.5
-            high_motion_frames = [i for i, score in enumerate(motion_scores) 
-                                if score > adaptive_threshold]
-            print(f"Adaptive threshold {adaptive_threshold:.4f} found {len(high_motion_frames)} frames")
-        
-        # Group consecutive high motion frames into segments with more flexible grouping
-        current_segment = {"start": high_motion_frames[0]}
-        
-        for i in range(1, len(high_motion_frames)):
-            # More flexible gap detection (2 seconds instead of 1)
-            if high_motion_frames[i] - high_motion_frames[i-1] > 2 * fps:
-                # End current segment and start new one
-                current_segment["end"] = high_motion_frames[i-1]
-                segments.append(current_segment)
-                current_segment = {"start": high_motion_frames[i]}
-        
-        # Add final segment
-        current_segment["end"] = high_motion_frames[-1]
-        segments.append(current_segment)
-        
-        print(f"Initial segments found: {len(segments)}")
-        
-        # Filter segments by duration and add padding
-        filtered_segments = []
-        for i, segment in enumerate(segments):
-            duration = (segment["end"] - segment["start"]) / fps
-            print(f"Segment {i+1}: {duration:.2f}s duration")
-            
-            if min_frames <= (segment["end"] - segment["start"]) <= max_frames:
-                # Add padding - increased for better shot capture
-                padding_frames = int(0.5 * fps)  # 0.5 second padding
-                
-                start_frame = max(0, segment["start"] - padding_frames)
-                end_frame = min(len(motion_scores) - 1, segment["end"] + padding_frames)
-                
-                filtered_segments.append({
-                    "start_frame": start_frame,
-                    "end_frame": end_frame,
-                    "start_time": start_frame / fps,
-                    "end_time": end_frame / fps,
-                    "duration": (end_frame - start_frame) / fps
-                })
-                print(f"  -> Accepted: {start_frame} to {end_frame} ({duration:.2f}s)")
-            else:
-                print(f"  -> Rejected: duration {duration:.2f}s outside range")
-        
-        # If no segments found, try even more lenient approach
-        if not filtered_segments:
-            print("No segments passed duration filter. Using fallback approach...")
-            # Find the highest motion period and treat it as a shot
-            max_motion_idx = np.argmax(motion_scores)
-            max_motion_score = motion_scores[max_motion_idx]
-            
-            # Create a segment around the highest motion point
-            segment_duration = int(3 * fps)  # 3 second segment
-            start_frame = max(0, max_motion_idx - segment_duration // 2)
-            end_frame = min(len(motion_scores) - 1, max_motion_idx + segment_duration // 2)
-            
-            filtered_segments.append({
-                "start_frame": start_frame,
-                "end_frame": end_frame,
-                "start_time": start_frame / fps,
-                "end_time": end_frame / fps,
-                "duration": (end_frame - start_frame) / fps
-            })
-            print(f"Fallback: Created segment around max motion at frame {max_motion_idx}")
-        
-        print(f"Final segments: {len(filtered_segments)}")
-        return filtered_segments
+        print(f"Final segments: {len(segments)}")
+        return segments
     
     def _process_shot_segment(self, video_path: str, segment: Dict[str, Any], shot_index: int) -> Optional[Dict[str, Any]]:
         """
@@ -270,28 +604,53 @@ class VideoStandardizer:
             Dictionary containing standardized shot data
         """
         try:
+            if not self.render_video:
+                # Track only; the overlay video is rendered later if someone asks for it
+                shot_analysis = self._track_shot(video_path, segment, shot_index)
+                return self._build_shot_record(segment, shot_index, None, shot_analysis, source_video=video_path)
+            
             # Extract the shot segment as a separate video with tracking
             shot_video_path = self._extract_shot_video(video_path, segment, shot_index)
             
             # Analyze the shot video
-            shot_analysis = self._analyze_shot_video(shot_video_path, segment)
+            shot_analysis = self._analyze_shot_video(shot_video_path, segment, shot_index)
             
             # Keep the tracked video file for analysis
             # The video now contains motion tracking overlays
             
-            return {
-                "shot_id": f"shot_{shot_index:03d}",
-                "segment_info": segment,
-                "video_path": shot_video_path,
-                "tracking_file": os.path.join(self.tracked_data_dir, f"shot_{shot_index:03d}_tracking.json"),
-                "analysis": shot_analysis,
-                "timestamp": datetime.now().isoformat()
-            }
+            return self._build_shot_record(segment, shot_index, shot_video_path, shot_analysis)
             
         except Exception as e:
             print(f"Error processing shot {shot_index}: {str(e)}")
             return None
     
+    def _build_shot_record(self, segment: Dict[str, Any], shot_index: int, shot_video_path: Optional[str],
+                           shot_analysis: Dict[str, Any], source_video: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Assemble the standardized data returned for a single shot
+        
+        Args:
+            segment: Shot segment information
+            shot_index: Index of the shot
+            shot_video_path: Path to the tracked shot video, or None if not rendered yet
+            shot_analysis: Metrics computed for the shot
+            source_video: Original video to render the overlay from on demand
+            
+        Returns:
+            Dictionary containing standardized shot data
+        """
+        return {
+            "shot_id": f"shot_{shot_index:03d}",
+            "segment_info": segment,
+            "video_path": shot_video_path,
+            "source_video": source_video,
+            "tracking_file": os.path.join(self.tracked_data_dir, f"shot_{shot_index:03d}_tracking.npz"),
+            "analysis": shot_analysis,
+            "inference_counts": dict(self.landmark_tracker.inference_counts),
+            "stage_timings": self.stage_timings.as_dict(),
+            "timestamp": datetime.now().isoformat()
+        }
+    
     def _extract_shot_video(self, video_path: str, segment: Dict[str, Any], shot_index: int) -> str:
         """
         Extract a shot segment as a separate video file with motion tracking overlays
@@ -304,235 +663,360 @@ class VideoStandardizer:
         Returns:
             Path to the extracted shot video with tracking overlays
         """
-        cap = cv2.VideoCapture(video_path)
+        decoder = self._open_decoder(video_path)
         
         # Get video properties
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = decoder.fps
+        width = decoder.width
+        height = decoder.height
         
-        # Create output video writer
+        # Create output video writer, encoding under a temporary name until the shot is complete
         output_path = os.path.join(self.tracked_data_dir, f"shot_{shot_index:03d}_tracked.mp4")
+        tmp_output_path = temp_path(output_path)
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-        
-        # Seek to start frame
-        cap.set(cv2.CAP_PROP_POS_FRAMES, segment["start_frame"])
+        out = cv2.VideoWriter(tmp_output_path, fourcc, fps, (width, height))
         
         # Track motion data for overlays
-        pose_trajectories = []
-        hand_trajectories = []
-        ball_trajectories = []
+        tracking_data = {
+            'pose_trajectories': [],
+            'hand_trajectories': [],
+            'ball_trajectories': []
+        }
         
-        # Reset ball tracking state for new shot
-        self.ball_trajectory = []
-        self.prev_ball_pos = None
-        self.ball_detection_frames = 0
+        # Reset ball and landmark tracking state for new shot
+        self._reset_shot_tracking()
         
-        # Extract frames for the shot segment with tracking
-        for frame_idx in range(segment["start_frame"], segment["end_frame"] + 1):
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Create a copy for drawing
-            annotated_frame = frame.copy()
-            
-            # Detect pose and hands
-            pose_results = self.pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            hand_results = self.hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            
-            # Draw pose landmarks
-            if pose_results.pose_landmarks:
-                self.mp_drawing.draw_landmarks(
-                    annotated_frame,
-                    pose_results.pose_landmarks,
-                    self.mp_pose.POSE_CONNECTIONS,
-                    landmark_drawing_spec=self.mp_drawing_styles.get_default_pose_landmarks_style()
-                )
-                
-                # Track arm positions
-                left_wrist = pose_results.pose_landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_WRIST]
-                right_wrist = pose_results.pose_landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_WRIST]
-                left_shoulder = pose_results.pose_landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_SHOULDER]
-                right_shoulder = pose_results.pose_landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_SHOULDER]
-                
-                # Convert to pixel coordinates
-                left_wrist_pos = (int(left_wrist.x * width), int(left_wrist.y * height))
-                right_wrist_pos = (int(right_wrist.x * width), int(right_wrist.y * height))
-                left_shoulder_pos = (int(left_shoulder.x * width), int(left_shoulder.y * height))
-                right_shoulder_pos = (int(right_shoulder.x * width), int(right_shoulder.y * height))
-                
-                # Store trajectories
-                pose_trajectories.append({
-                    'frame': frame_idx,
-                    'left_wrist': left_wrist_pos,
-                    'right_wrist': right_wrist_pos,
-                    'left_shoulder': left_shoulder_pos,
-                    'right_shoulder': right_shoulder_pos
-                })
-                
-                # Draw arm lines
-                cv2.line(annotated_frame, left_shoulder_pos, left_wrist_pos, (0, 255, 0), 3)
-                cv2.line(annotated_frame, right_shoulder_pos, right_wrist_pos, (0, 255, 0), 3)
-            
-            # Draw hand landmarks
-            if hand_results.multi_hand_landmarks:
-                for hand_landmarks in hand_results.multi_hand_landmarks:
-                    self.mp_drawing.draw_landmarks(
-                        annotated_frame,
-                        hand_landmarks,
-                        self.mp_hands.HAND_CONNECTIONS,
-                        self.mp_drawing_styles.get_default_hand_landmarks_style(),
-                        self.mp_drawing_styles.get_default_hand_connections_style()
-                    )
-                    
-                    # Track hand positions
-                    wrist = hand_landmarks.landmark[self.mp_hands.HandLandmark.WRIST]
-                    wrist_pos = (int(wrist.x * width), int(wrist.y * height))
-                    hand_trajectories.append({
-                        'frame': frame_idx,
-                        'wrist': wrist_pos
-                    })
-            
-            # Detect and track ball with enhanced detection
-            ball_pos = self._detect_ball(frame)
-            
-            # Validate ball position (check if near hands)
-            if ball_pos and self._is_ball_near_hands(ball_pos, pose_results, hand_results):
-                self._update_ball_tracking(ball_pos, frame_idx)
-                ball_trajectories.append({
-                    'frame': frame_idx,
-                    'position': ball_pos
-                })
-                # Draw ball tracking with confidence indicator
-                cv2.circle(annotated_frame, ball_pos, 15, (0, 0, 255), -1)
-                cv2.circle(annotated_frame, ball_pos, 20, (255, 255, 255), 2)
-                
-                # Add ball detection confidence text
-                cv2.putText(annotated_frame, f"Ball: {self.ball_detection_frames}", 
-                           (10, 110), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-            else:
-                # Update tracking with None if ball not detected or not near hands
-                self._update_ball_tracking(None, frame_idx)
-                
-                # Draw predicted ball position if available
-                if len(self.ball_trajectory) > 0:
-                    predicted_pos = self.ball_trajectory[-1]
-                    cv2.circle(annotated_frame, predicted_pos, 10, (0, 255, 255), 2)
-                    cv2.putText(annotated_frame, "Predicted", 
-                               (predicted_pos[0] - 30, predicted_pos[1] - 20), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 255), 1)
-            
-            # Draw trajectory trails
-            self._draw_trajectory_trails(annotated_frame, pose_trajectories, hand_trajectories, ball_trajectories)
-            
-            # Add frame counter and shot info
-            cv2.putText(annotated_frame, f"Shot {shot_index+1}", (10, 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-            cv2.putText(annotated_frame, f"Frame: {frame_idx}", (10, 70), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            
+        # Extract frames for the shot segment with tracking, starting exactly at its first frame
+        for frame_idx, frame in decoder.frames(segment["start_frame"], segment["end_frame"],
+                                               reuse_buffers=True, timings=self.stage_timings):
+            annotated_frame = self._track_frame(frame, frame_idx, shot_index, width, height, tracking_data)
+            t0 = time.perf_counter()
             out.write(annotated_frame)
+            self.stage_timings.add("encode", time.perf_counter() - t0)
         
-        cap.release()
+        decoder.close()
         out.release()
         
-        # Store tracking data
+        # Save tracking data
+        self._save_tracking_data(tracking_data, shot_index)
+        
+        return publish(tmp_output_path, output_path)
+    
+    def _track_shot(self, video_path: str, segment: Dict[str, Any], shot_index: int) -> Dict[str, Any]:
+        """
+        Track a shot segment and compute its metrics without rendering a video
+        
+        Args:
+            video_path: Path to the original video
+            segment: Shot segment information
+            shot_index: Index of the shot
+            
+        Returns:
+            Dictionary containing shot analysis data
+        """
+        decoder = self._open_decoder(video_path)
+        fps = decoder.fps
+        width = decoder.width
+        height = decoder.height
+        
         tracking_data = {
-            'pose_trajectories': pose_trajectories,
-            'hand_trajectories': hand_trajectories,
-            'ball_trajectories': ball_trajectories
+            'pose_trajectories': [],
+            'hand_trajectories': [],
+            'ball_trajectories': []
         }
+        self._reset_shot_tracking()
         
-        # Save tracking data
-        tracking_file = os.path.join(self.tracked_data_dir, f"shot_{shot_index:03d}_tracking.json")
-        with open(tracking_file, 'w') as f:
-            json.dump(tracking_data, f, indent=2, default=str)
+        # Metrics come from the source frames, which are decoded here anyway
+        metrics = self._create_metrics_accumulator(fps, width, height, segment, shot_index)
+        for frame_idx, frame in decoder.frames(segment["start_frame"], segment["end_frame"],
+                                               reuse_buffers=True, timings=self.stage_timings):
+            self._track_frame(frame, frame_idx, shot_index, width, height, tracking_data, annotate=False)
+            metrics.add(frame)
+        
+        decoder.close()
+        self._save_tracking_data(tracking_data, shot_index)
         
-        return output_path
+        return metrics.summary()
     
-    def _detect_ball(self, frame: np.ndarray) -> Optional[Tuple[int, int]]:
+    def _track_frame(self, frame: np.ndarray, frame_idx: int, shot_index: int, width: int, height: int,
+                     tracking_data: Dict[str, List[Dict]], annotate: bool = True) -> Optional[np.ndarray]:
         """
-        Enhanced basketball detection using multiple methods and tracking consistency
+        Run pose, hand and ball tracking on a single frame and draw the overlays
         
         Args:
-            frame: Input frame
+            frame: Input BGR frame
+            frame_idx: Index of the frame in the original video
+            shot_index: Index of the shot the frame belongs to
+            width: Frame width in pixels
+            height: Frame height in pixels
+            tracking_data: Trajectory lists for the shot, appended to in place
+            annotate: Draw the overlays; when False only the trajectories are recorded
             
         Returns:
-            Ball position (x, y) or None if not detected
+            Annotated copy of the frame, or None when annotate is False
         """
-        height, width = frame.shape[:2]
+        # All detectors see the frame at inference resolution; their results are
+        # mapped back to source pixels with the resizer
+        timings = self.stage_timings
+        t0 = time.perf_counter()
+        inference_frame = self.resizer.prepare(frame)
+        timings.add("convert", time.perf_counter() - t0)
+        to_source = self.resizer.to_source
+        
+        # Detect pose, then hands, from a single RGB conversion
+        landmarks = self.landmark_tracker.process(inference_frame)
+        
+        if landmarks.pose_landmarks:
+            # Track arm positions in pixel coordinates
+            left_wrist_pos = to_source(landmarks.pose_point(self.mp_pose.PoseLandmark.LEFT_WRIST))
+            right_wrist_pos = to_source(landmarks.pose_point(self.mp_pose.PoseLandmark.RIGHT_WRIST))
+            left_shoulder_pos = to_source(landmarks.pose_point(self.mp_pose.PoseLandmark.LEFT_SHOULDER))
+            right_shoulder_pos = to_source(landmarks.pose_point(self.mp_pose.PoseLandmark.RIGHT_SHOULDER))
+            
+            # Store trajectories
+            tracking_data['pose_trajectories'].append({
+                'frame': frame_idx,
+                'left_wrist': left_wrist_pos,
+                'right_wrist': right_wrist_pos,
+                'left_shoulder': left_shoulder_pos,
+                'right_shoulder': right_shoulder_pos
+            })
         
-        # Method 1: Color-based detection with multiple color ranges
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        
-        # Multiple color ranges for different basketball types
-        color_ranges = [
-            # Orange/brown basketball
-            (np.array([5, 50, 50]), np.array([25, 255, 255])),
-            # Darker orange
-            (np.array([0, 50, 50]), np.array([20, 255, 255])),
-            # Reddish basketball
-            (np.array([0, 100, 100]), np.array([10, 255, 255])),
-            # Brown basketball
-            (np.array([10, 50, 50]), np.array([30, 255, 255])),
-            # Light orange
-            (np.array([10, 30, 100]), np.array([25, 255, 255])),
-            # Dark brown
-            (np.array([15, 50, 50]), np.array([25, 255, 200]))
-        ]
+        # Track hand positions
+        for wrist_pos in landmarks.hand_points(self.mp_hands.HandLandmark.WRIST):
+            tracking_data['hand_trajectories'].append({
+                'frame': frame_idx,
+                'wrist': to_source(wrist_pos)
+            })
         
-        best_contour = None
-        best_score = 0
+        # Detect and track ball with enhanced detection
+        t0 = time.perf_counter()
+        search_regions = self._ball_search_regions(landmarks)
+        ball_pos = self._detect_ball(inference_frame, search_regions)
+        timings.add("ball", time.perf_counter() - t0)
+        
+        # Validate ball position (check if near hands)
+        if ball_pos and self._is_ball_near_hands(ball_pos, landmarks):
+            self._update_ball_tracking(ball_pos, frame_idx)
+            ball_pos = to_source(ball_pos)
+            tracking_data['ball_trajectories'].append({
+                'frame': frame_idx,
+                'position': ball_pos
+            })
+        else:
+            # Update tracking with None if ball not detected or not near hands
+            self._update_ball_tracking(None, frame_idx)
+            ball_pos = None
+        
+        if not annotate:
+            return None
         
-        for lower, upper in color_ranges:
-            mask = cv2.inRange(hsv, lower, upper)
+        # Create a copy for drawing
+        t0 = time.perf_counter()
+        annotated_frame = frame.copy()
+        
+        # Draw pose landmarks
+        if landmarks.pose_landmarks:
+            self.mp_drawing.draw_landmarks(
+                annotated_frame,
+                landmarks.pose_landmarks,
+                self.mp_pose.POSE_CONNECTIONS,
+                landmark_drawing_spec=self.mp_drawing_styles.get_default_pose_landmarks_style()
+            )
             
-            # Morphological operations to clean up the mask
-            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+            # Draw arm lines
+            cv2.line(annotated_frame, left_shoulder_pos, left_wrist_pos, (0, 255, 0), 3)
+            cv2.line(annotated_frame, right_shoulder_pos, right_wrist_pos, (0, 255, 0), 3)
+        
+        # Draw hand landmarks
+        for hand_landmarks in landmarks.hand_landmarks:
+            self.mp_drawing.draw_landmarks(
+                annotated_frame,
+                hand_landmarks,
+                self.mp_hands.HAND_CONNECTIONS,
+                self.mp_drawing_styles.get_default_hand_landmarks_style(),
+                self.mp_drawing_styles.get_default_hand_connections_style()
+            )
+        
+        if ball_pos is not None:
+            # Draw ball tracking with confidence indicator
+            cv2.circle(annotated_frame, ball_pos, 15, (0, 0, 255), -1)
+            cv2.circle(annotated_frame, ball_pos, 20, (255, 255, 255), 2)
             
-            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            # Add ball detection confidence text
+            cv2.putText(annotated_frame, f"Ball: {self.ball_detection_frames}", 
+                       (10, 110), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+        elif len(self.ball_trajectory) > 0:
+            # Draw predicted ball position if available
+            predicted_pos = to_source(self.ball_trajectory[-1])
+            cv2.circle(annotated_frame, predicted_pos, 10, (0, 255, 255), 2)
+            cv2.putText(annotated_frame, "Predicted", 
+                       (predicted_pos[0] - 30, predicted_pos[1] - 20), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 255), 1)
+        
+        # Draw trajectory trails
+        self._draw_trajectory_trails(annotated_frame, tracking_data['pose_trajectories'],
+                                     tracking_data['hand_trajectories'], tracking_data['ball_trajectories'])
+        
+        # Add frame counter and shot info
+        cv2.putText(annotated_frame, f"Shot {shot_index+1}", (10, 30), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        cv2.putText(annotated_frame, f"Frame: {frame_idx}", (10, 70), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        timings.add("draw", time.perf_counter() - t0)
+        
+        return annotated_frame
+    
+    def _save_tracking_data(self, tracking_data: Dict[str, List[Dict]], shot_index: int) -> str:
+        """
+        Write the trajectories of a shot to its columnar tracking file
+        
+        The .npz bundle can be memory-mapped with tracking_store.load_tracking;
+        use tracking_store.export_tracking_json for the legacy JSON layout.
+        
+        Args:
+            tracking_data: Pose, hand and ball trajectories for the shot
+            shot_index: Index of the shot
             
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                
-                # Size filter for basketball (reasonable size range)
-                min_area = 200  # Minimum ball size
-                max_area = 5000  # Maximum ball size
-                
-                if min_area < area < max_area:
-                    # Circularity check
-                    perimeter = cv2.arcLength(contour, True)
-                    if perimeter > 0:
-                        circularity = 4 * np.pi * area / (perimeter * perimeter)
-                        
-                        # Score based on circularity and size
-                        score = circularity * (area / 1000)
-                        
-                        if score > best_score:
-                            best_score = score
-                            best_contour = contour
+        Returns:
+            Path to the tracking file
+        """
+        tracking_file = os.path.join(self.tracked_data_dir, f"shot_{shot_index:03d}_tracking.npz")
+        t0 = time.perf_counter()
+        save_tracking(tracking_file, tracking_data)
+        self.stage_timings.add("tracking_write", time.perf_counter() - t0)
+        return tracking_file
+    
+    def _reset_shot_tracking(self):
+        """Reset ball and landmark tracking state and the stage timings before a new shot"""
+        self._reset_ball_tracking()
+        self.landmark_tracker.reset()
+        self.stage_timings.reset()
+    
+    def _reset_ball_tracking(self):
+        """Reset ball tracking state before a new shot"""
+        self.ball_trajectory = []
+        self.prev_ball_pos = None
+        self.ball_detection_frames = 0
+        self.ball_search_frame = 0
+    
+    def _ball_search_regions(self, landmarks: FrameLandmarks) -> Optional[List[Tuple[int, int, int, int]]]:
+        """
+        Pick the boxes the ball detector should search in this frame
+        
+        Boxes are centred on the pose wrists, the hand palms and the position
+        predicted from the ball trajectory, clipped to the frame and merged where
+        they overlap. The ball only counts when it is near the hands anyway, so
+        the rest of the frame rarely matters.
+        
+        Args:
+            landmarks: Pose and hand landmarks of the frame
+            
+        Returns:
+            List of (x1, y1, x2, y2) boxes in inference pixels, or None to search
+            the whole frame
+        """
+        if not self.ball_roi_search:
+            return None
+        
+        # Periodic full-frame search picks up a ball that left every box
+        full_search = self.ball_search_frame % self.ball_full_search_interval == 0
+        self.ball_search_frame += 1
+        if full_search:
+            return None
+        
+        width, height = landmarks.width, landmarks.height
+        seeds = []
+        if landmarks.pose_landmarks:
+            seeds.append(landmarks.pose_point(self.mp_pose.PoseLandmark.LEFT_WRIST))
+            seeds.append(landmarks.pose_point(self.mp_pose.PoseLandmark.RIGHT_WRIST))
+        seeds.extend(landmarks.hand_points(PALM_CENTER))
+        
+        if len(self.ball_trajectory) >= 2:
+            (prev_x, prev_y), (last_x, last_y) = self.ball_trajectory[-2], self.ball_trajectory[-1]
+            seeds.append((2 * int(last_x) - int(prev_x), 2 * int(last_y) - int(prev_y)))
+        
+        if not seeds:
+            return None
+        
+        radius = int(self.ball_roi_radius * self.resizer.scale)
+        boxes = []
+        for x, y in seeds:
+            box = (max(0, int(x) - radius), max(0, int(y) - radius),
+                   min(width, int(x) + radius), min(height, int(y) + radius))
+            if box[2] > box[0] and box[3] > box[1]:
+                boxes.append(box)
+        
+        # Merge overlapping boxes so no pixel is searched twice
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(boxes)):
+                for j in range(i + 1, len(boxes)):
+                    a, b = boxes[i], boxes[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        boxes[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                        del boxes[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        
+        return boxes or None
+    
+    def _detect_ball(self, frame: np.ndarray,
+                     search_regions: Optional[List[Tuple[int, int, int, int]]] = None) -> Optional[Tuple[int, int]]:
+        """
+        Enhanced basketball detection using multiple methods and tracking consistency
+        
+        Args:
+            frame: Input frame at inference resolution
+            search_regions: Optional (x1, y1, x2, y2) boxes to restrict the color and
+                template search to; None searches the whole frame
+            
+        Returns:
+            Ball position (x, y) in inference pixels or None if not detected
+        """
+        height, width = frame.shape[:2]
+        scale = self.resizer.scale  # Size constants below are in source pixels
+        if search_regions is None:
+            search_regions = [(0, 0, width, height)]
+        
+        best_contour = None
+        best_offset = (0, 0)
+        best_score = 0
+        
+        # Method 1: Color-based detection on the merged mask of all ball colors
+        for x1, y1, x2, y2 in search_regions:
+            hsv = cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2HSV)
+            contour, score = self.ball_segmenter.best_contour(hsv, scale)
+            if contour is not None and score > best_score:
+                best_score = score
+                best_contour = contour
+                best_offset = (x1, y1)
         
         # Method 2: Template matching for basketball shape
         if best_contour is None:
-            # Try template matching approach
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            template_size = max(9, int(self.ball_segmenter.template_size * scale))
+            template = self.ball_segmenter.circle_template(template_size)
             
-            # Create circular template
-            template_size = 50
-            template = np.zeros((template_size, template_size), dtype=np.uint8)
-            cv2.circle(template, (template_size//2, template_size//2), template_size//2-5, 255, -1)
-            
-            # Template matching
-            result = cv2.matchTemplate(gray, template, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            best_match = None
+            best_match_val = 0.3  # Threshold for template match
+            for x1, y1, x2, y2 in search_regions:
+                if x2 - x1 < template_size or y2 - y1 < template_size:
+                    continue
+                
+                # Template matching
+                gray = cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+                result = cv2.matchTemplate(gray, template, cv2.TM_CCOEFF_NORMED)
+                min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+                
+                if max_val > best_match_val:
+                    best_match_val = max_val
+                    best_match = (x1 + max_loc[0] + template_size//2, y1 + max_loc[1] + template_size//2)
             
-            if max_val > 0.3:  # Threshold for template match
-                x, y = max_loc
-                return (x + template_size//2, y + template_size//2)
+            if best_match is not None:
+                return best_match
         
         # Method 3: Motion-based ball detection
         if best_contour is None and self.prev_ball_pos is not None:
@@ -550,7 +1034,7 @@ class VideoStandardizer:
                 predicted_y = int(prev_pos[1] + vy)
                 
                 # Search around predicted position
-                search_radius = 50
+                search_radius = int(50 * scale)
                 x1 = max(0, predicted_x - search_radius)
                 y1 = max(0, predicted_y - search_radius)
                 x2 = min(width, predicted_x + search_radius)
@@ -561,8 +1045,8 @@ class VideoStandardizer:
                     # Look for circular objects in ROI
                     roi_gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
                     circles = cv2.HoughCircles(
-                        roi_gray, cv2.HOUGH_GRADIENT, 1, 20,
-                        param1=50, param2=30, minRadius=10, maxRadius=50
+                        roi_gray, cv2.HOUGH_GRADIENT, 1, max(1, int(20 * scale)),
+                        param1=50, param2=30, minRadius=max(1, int(10 * scale)), maxRadius=max(2, int(50 * scale))
                     )
                     
                     if circles is not None:
@@ -574,65 +1058,41 @@ class VideoStandardizer:
         if best_contour is not None:
             M = cv2.moments(best_contour)
             if M["m00"] != 0:
-                cx = int(M["m10"] / M["m00"])
-                cy = int(M["m01"] / M["m00"])
+                cx = int(M["m10"] / M["m00"]) + best_offset[0]
+                cy = int(M["m01"] / M["m00"]) + best_offset[1]
                 return (cx, cy)
         
         return None
     
-    def _is_ball_near_hands(self, ball_pos: Tuple[int, int], pose_results, hand_results) -> bool:
+    def _is_ball_near_hands(self, ball_pos: Tuple[int, int], frame_landmarks: FrameLandmarks) -> bool:
         """
         Check if the detected ball is near the player's hands
         
         Args:
-            ball_pos: Detected ball position
-            pose_results: MediaPipe pose results
-            hand_results: MediaPipe hand results
+            ball_pos: Detected ball position in inference pixels
+            frame_landmarks: Pose and hand landmarks of the frame
             
         Returns:
             True if ball is near hands, False otherwise
         """
-        if not pose_results.pose_landmarks and not hand_results.multi_hand_landmarks:
+        if not frame_landmarks.pose_landmarks and not frame_landmarks.hand_landmarks:
             return True  # If no pose/hand detection, assume it's valid
         
         ball_x, ball_y = ball_pos
-        min_distance = 100  # Minimum distance threshold
-        
-        # Check distance to pose wrists
-        if pose_results.pose_landmarks:
-            landmarks = pose_results.pose_landmarks.landmark
-            height, width = 480, 640  # Default dimensions
-            
-            # Left wrist
-            left_wrist = landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST]
-            left_wrist_x = int(left_wrist.x * width)
-            left_wrist_y = int(left_wrist.y * height)
-            
-            left_dist = np.sqrt((ball_x - left_wrist_x)**2 + (ball_y - left_wrist_y)**2)
-            
-            # Right wrist
-            right_wrist = landmarks[self.mp_pose.PoseLandmark.RIGHT_WRIST]
-            right_wrist_x = int(right_wrist.x * width)
-            right_wrist_y = int(right_wrist.y * height)
-            
-            right_dist = np.sqrt((ball_x - right_wrist_x)**2 + (ball_y - right_wrist_y)**2)
-            
-            if left_dist < min_distance or right_dist < min_distance:
+        # Minimum distance threshold, 100 source pixels in the frame's own scale
+        min_distance = 100 * self.resizer.scale
+        
+        # Wrists and palms in the same pixel space as the ball
+        anchors = []
+        if frame_landmarks.pose_landmarks:
+            anchors.append(frame_landmarks.pose_point(self.mp_pose.PoseLandmark.LEFT_WRIST))
+            anchors.append(frame_landmarks.pose_point(self.mp_pose.PoseLandmark.RIGHT_WRIST))
+        anchors.extend(frame_landmarks.hand_points(PALM_CENTER))
+        
+        for anchor_x, anchor_y in anchors:
+            if np.sqrt((ball_x - anchor_x)**2 + (ball_y - anchor_y)**2) < min_distance:
                 return True
         
-        # Check distance to hand landmarks
-        if hand_results.multi_hand_landmarks:
-            for hand_landmarks in hand_results.multi_hand_landmarks:
-                # Check palm center (landmark 9)
-                palm = hand_landmarks.landmark[9]
-                palm_x = int(palm.x * width)
-                palm_y = int(palm.y * height)
-                
-                palm_dist = np.sqrt((ball_x - palm_x)**2 + (ball_y - palm_y)**2)
-                
-                if palm_dist < min_distance:
-                    return True
-        
         return False
     
     def _update_ball_tracking(self, ball_pos: Optional[Tuple[int, int]], frame_idx: int):
@@ -697,13 +1157,14 @@ class VideoStandardizer:
                     cv2.line(frame, ball_trajectories[i]['position'], 
                             ball_trajectories[i + 1]['position'], (0, 255, 0), 3)
     
-    def _analyze_shot_video(self, shot_video_path: str, segment: Dict[str, Any]) -> Dict[str, Any]:
+    def _analyze_shot_video(self, shot_video_path: str, segment: Dict[str, Any], shot_index: int) -> Dict[str, Any]:
         """
         Analyze a shot video to extract key metrics
         
         Args:
             shot_video_path: Path to the shot video
             segment: Shot segment information
+            shot_index: Index of the shot
             
         Returns:
             Dictionary containing shot analysis data
@@ -715,56 +1176,41 @@ class VideoStandardizer:
         
         # Get video properties
         fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         
-        # Extract key frames and motion data
-        frames = []
-        motion_data = []
-        prev_frame = None
-        
+        # Stream motion data and key frames without holding the shot in memory
+        metrics = self._create_metrics_accumulator(fps, width, height, segment, shot_index)
         while True:
             ret, frame = cap.read()
             if not ret:
                 break
-                
-            frames.append(frame)
-            
-            # Calculate motion
-            if prev_frame is not None:
-                gray_prev = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
-                gray_curr = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                
-                frame_diff = cv2.absdiff(gray_prev, gray_curr)
-                motion_score = np.mean(frame_diff)
-                motion_data.append(motion_score)
-            else:
-                motion_data.append(0)
-            
-            prev_frame = frame.copy()
+            metrics.add(frame)
         
         cap.release()
         
-        # Calculate shot metrics
-        analysis = {
-            "frame_count": len(frames),
-            "duration": len(frames) / fps,
-            "resolution": f"{width}x{height}",
-            "fps": fps,
-            "motion_analysis": {
-                "max_motion": max(motion_data) if motion_data else 0,
-                "avg_motion": np.mean(motion_data) if motion_data else 0,
-                "motion_variance": np.var(motion_data) if motion_data else 0
-            },
-            "key_frames": {
-                "start_frame": frames[0] if frames else None,
-                "middle_frame": frames[len(frames)//2] if frames else None,
-                "end_frame": frames[-1] if frames else None
-            }
-        }
+        return metrics.summary()
+    
+    def _create_metrics_accumulator(self, fps: float, width: int, height: int, segment: Optional[Dict[str, Any]],
+                                    shot_index: int) -> ShotMetricsAccumulator:
+        """
+        Create a constant-memory metrics accumulator for a shot
         
-        return analysis
+        Args:
+            fps: Frames per second of the shot
+            width: Frame width in pixels
+            height: Frame height in pixels
+            segment: Shot segment information used to locate the middle key frame,
+                or None if the segment is still open
+            shot_index: Index of the shot, used to name the key frame thumbnails
+            
+        Returns:
+            A fresh ShotMetricsAccumulator
+        """
+        expected_frames = segment["end_frame"] - segment["start_frame"] + 1 if segment is not None else None
+        thumbnail_prefix = os.path.join(self.tracked_data_dir, f"shot_{shot_index:03d}")
+        return ShotMetricsAccumulator(fps, width, height, expected_frames, thumbnail_prefix,
+                                      decode_backend=self.decode_backend)
     
     def save_standardized_data(self, shot_data: List[Dict[str, Any]], output_path: str = None):
         """
@@ -792,14 +1238,39 @@ class VideoStandardizer:
                 serializable_shot["analysis"] = analysis
             serializable_data.append(serializable_shot)
         
-        with open(output_path, 'w') as f:
-            json.dump(serializable_data, f, indent=2, default=str)
+        t0 = time.perf_counter()
+        write_json(output_path, serializable_data, indent=2, default=str)
+        self.job_timings.add("json_write", time.perf_counter() - t0)
         
         print(f"Standardized data saved to: {output_path}")
     
     def cleanup(self):
         """Clean up MediaPipe resources"""
+        if self._tracking_pool is not None and self._owns_tracking_pool:
+            self._tracking_pool.shutdown(wait=True)
+        self._tracking_pool = None
         if hasattr(self, 'pose'):
             self.pose.close()
         if hasattr(self, 'hands'):
             self.hands.close()
+
+
+# Standardizer owned by a tracking worker process
+_worker_standardizer = None
+
+
+def _init_tracking_worker(settings: Dict[str, Any]):
+    """Create the worker's own standardizer and MediaPipe models"""
+    global _worker_standardizer
+    settings = dict(settings)
+    # Spawned workers start with profiling on; follow the parent, as of when the pool started
+    set_enabled(settings.pop("profiling_enabled", True))
+    _worker_standardizer = VideoStandardizer(**settings)
+
+
+def _track_segment_in_worker(video_path: str, segment: Dict[str, Any], shot_index: int,
+                             output_dir: str) -> Optional[Dict[str, Any]]:
+    """Track one shot segment inside a worker process, writing into the job's output directory"""
+    os.makedirs(output_dir, exist_ok=True)
+    _worker_standardizer.tracked_data_dir = output_dir
+    return _worker_standardizer._process_shot_segment(video_path, segment, shot_index)
@@ -0,0 +1,102 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Iterator, Optional
+
+
+class StandardizerPool:
+    """
+    Bounded pool of preloaded VideoStandardizer instances
+
+    Every standardizer owns stateful MediaPipe graphs, so one instance must never
+    be used by two uploads at the same time. The pool builds all instances up
+    front, hands out one per checkout and blocks further callers until an
+    instance is returned, so concurrent uploads run in parallel without sharing
+    tracking state or paying the model load cost per request.
+    """
+
+    def __init__(self, size: int, factory: Callable[[], Any]):
+        self.size = max(1, size)
+        self._available = queue.Queue()
+        self._instances = []
+        self._lock = threading.Lock()
+
+        # Wait time metrics
+        self._checkouts = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._last_wait = 0.0
+
+        print(f"Preloading {self.size} standardizer instance(s)...")
+        for _ in range(self.size):
+            instance = factory()
+            self._instances.append(instance)
+            self._available.put(instance)
+
+    @contextmanager
+    def checkout(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Borrow a standardizer for the duration of a with block
+
+        Args:
+            timeout: Maximum seconds to wait for a free instance (None waits forever)
+
+        Yields:
+            A standardizer reserved for the caller
+
+        Raises:
+            TimeoutError: If no instance became free within the timeout
+        """
+        start = time.monotonic()
+        with self._lock:
+            self._waiting += 1
+
+        try:
+            instance = self._available.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No standardizer became available within {timeout}s")
+        finally:
+            wait = time.monotonic() - start
+            with self._lock:
+                self._waiting -= 1
+
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self._last_wait = wait
+
+        try:
+            yield instance
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._available.put(instance)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Snapshot of pool usage and checkout wait times
+
+        Returns:
+            Dictionary of pool metrics, wait times in seconds
+        """
+        with self._lock:
+            return {
+                "size": self.size,
+                "in_use": self._in_use,
+                "available": self.size - self._in_use,
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "avg_wait_seconds": self._total_wait / self._checkouts if self._checkouts else 0.0,
+                "max_wait_seconds": self._max_wait,
+                "last_wait_seconds": self._last_wait
+            }
+
+    def close(self):
+        """Release the MediaPipe resources of every instance"""
+        for instance in self._instances:
+            instance.cleanup()
@@ -0,0 +1,170 @@
+import json
+import os
+import struct
+import sys
+import zipfile
+import numpy as np
+from typing import Dict, List, Any
+
+# Columns stored for each trajectory series; every point column is an (N, 2) array
+TRACKING_SERIES = {
+    "pose_trajectories": ("left_wrist", "right_wrist", "left_shoulder", "right_shoulder"),
+    "hand_trajectories": ("wrist",),
+    "ball_trajectories": ("position",)
+}
+
+TRACKING_FORMAT_VERSION = 1
+
+TrackingArrays = Dict[str, Dict[str, np.ndarray]]
+
+
+def save_tracking(path: str, tracking_data: Dict[str, List[Dict[str, Any]]]) -> str:
+    """
+    Write shot trajectories as a columnar .npz bundle
+
+    Each series becomes an int32 frame-index array plus one int32 (N, 2) array
+    per keypoint. The archive is stored uncompressed so load_tracking can
+    memory-map the members in place.
+
+    Args:
+        path: Output .npz path
+        tracking_data: Pose, hand and ball trajectories as lists of point dicts
+
+    Returns:
+        Path to the written file
+    """
+    arrays = {"format_version": np.array(TRACKING_FORMAT_VERSION, dtype=np.int32)}
+    for series, columns in tracking_from_json(tracking_data).items():
+        for column, values in columns.items():
+            arrays[f"{series}.{column}"] = values
+
+    # Write next to the target and rename so readers never map a partial file
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_tracking(path: str, mmap: bool = True) -> TrackingArrays:
+    """
+    Load shot trajectories as arrays without parsing
+
+    Args:
+        path: Tracking file; .npz bundles are loaded directly and legacy .json
+            files are converted
+        mmap: Memory-map the .npz members instead of reading them into memory
+
+    Returns:
+        Dictionary of series name to {"frame": (N,), column: (N, 2), ...} arrays
+    """
+    if path.endswith('.json'):
+        with open(path, 'r') as f:
+            return tracking_from_json(json.load(f))
+
+    members = _map_npz(path) if mmap else dict(np.load(path))
+    tracking = {series: {} for series in TRACKING_SERIES}
+    for name, array in members.items():
+        series, _, column = name.partition('.')
+        if series in tracking:
+            tracking[series][column] = array
+    return tracking
+
+
+def tracking_from_json(tracking_data: Dict[str, List[Dict[str, Any]]]) -> TrackingArrays:
+    """
+    Convert list-of-dicts trajectories to the columnar layout
+
+    Args:
+        tracking_data: Pose, hand and ball trajectories as lists of point dicts
+
+    Returns:
+        Columnar trajectories as returned by load_tracking
+    """
+    tracking = {}
+    for series, columns in TRACKING_SERIES.items():
+        points = tracking_data.get(series, [])
+        tracking[series] = {"frame": np.array([point["frame"] for point in points], dtype=np.int32)}
+        for column in columns:
+            values = np.array([point[column] for point in points], dtype=np.int32)
+            tracking[series][column] = values.reshape(len(points), 2)
+    return tracking
+
+
+def tracking_to_json(tracking: TrackingArrays) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Convert columnar trajectories back to the original JSON layout
+
+    Args:
+        tracking: Columnar trajectories as returned by load_tracking
+
+    Returns:
+        Pose, hand and ball trajectories as lists of point dicts
+    """
+    tracking_data = {}
+    for series, columns in TRACKING_SERIES.items():
+        arrays = tracking.get(series, {})
+        frames = arrays.get("frame", np.empty(0, dtype=np.int32)).tolist()
+        values = {column: arrays[column].tolist() for column in columns if column in arrays}
+        tracking_data[series] = [
+            {"frame": frame, **{column: values[column][i] for column in values}}
+            for i, frame in enumerate(frames)
+        ]
+    return tracking_data
+
+
+def export_tracking_json(path: str, json_path: str) -> str:
+    """
+    Export a tracking file in the legacy JSON format
+
+    Args:
+        path: Tracking .npz file
+        json_path: Output JSON path
+
+    Returns:
+        Path to the written JSON file
+    """
+    with open(json_path, 'w') as f:
+        json.dump(tracking_to_json(load_tracking(path, mmap=False)), f, indent=2)
+    return json_path
+
+
+def _map_npz(path: str) -> Dict[str, np.ndarray]:
+    """
+    Memory-map the members of an uncompressed .npz archive
+
+    np.load cannot mmap inside a zip, but stored members are plain .npy files at
+    a fixed offset, so each one is mapped directly from the archive.
+    """
+    members = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                # Compressed archives are not ours; fall back to a regular read
+                return dict(np.load(path))
+
+            # Skip the local file header to reach the .npy payload
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[:-len('.npy')]
+            if not shape or 0 in shape:
+                # Scalars and empty series are cheaper to read than to map
+                members[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+                continue
+            members[name] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                      order='F' if fortran_order else 'C')
+    return members
+
+
+if __name__ == "__main__":
+    # Export tracking bundles to JSON: python pre_analysis/tracking_store.py shot_000_tracking.npz ...
+    for tracking_path in sys.argv[1:]:
+        output = export_tracking_json(tracking_path, os.path.splitext(tracking_path)[0] + ".json")
+        print(f"Exported {tracking_path} -> {output}")
@@ -0,0 +1,196 @@
+"""
+Content-addressed cache of analysis results for SwishScan
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Set
+
+
+class ResultCache:
+    """
+    Disk cache of shot results keyed by upload content and pipeline settings
+
+    Each entry lives in its own directory named after the key and holds the
+    results JSON plus copies of every tracked video, tracking file and key frame
+    thumbnail, so later uploads overwriting tracked_data/ cannot change a cached
+    answer. Entries are evicted least-recently-used first once the total size
+    exceeds max_bytes.
+    """
+
+    RESULTS_FILENAME = "results.json"
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self._sources = {}  # key -> source videos the entry's shots are rendered from on request
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(content_hash: str, config_fingerprint: str) -> str:
+        """
+        Combine the upload hash and the pipeline fingerprint into a cache key
+
+        Args:
+            content_hash: SHA-256 of the uploaded video
+            config_fingerprint: Fingerprint of the standardizer settings
+
+        Returns:
+            Hex cache key
+        """
+        return hashlib.sha256(f"{content_hash}:{config_fingerprint}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up cached results
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            The cached results dictionary, or None on a miss
+        """
+        results_path = os.path.join(self.cache_dir, key, self.RESULTS_FILENAME)
+        with self._lock:
+            if key not in self._entries or not os.path.exists(results_path):
+                self._entries.pop(key, None)
+                self._sources.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        # Record the access so LRU order survives restarts
+        now = time.time()
+        os.utime(os.path.join(self.cache_dir, key), (now, now))
+        with open(results_path, 'r') as f:
+            return json.load(f)
+
+    def put(self, key: str, results: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Store results and copies of their shot artifacts
+
+        Args:
+            key: Cache key from make_key
+            results: Results dictionary from BasketballAnalysisApp.process_video
+
+        Returns:
+            The cached copy of the results, with artifact paths pointing into the cache
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        staging_dir = f"{entry_dir}.tmp{os.getpid()}_{threading.get_ident()}"
+        os.makedirs(staging_dir, exist_ok=True)
+
+        cached = dict(results)
+
+        def cache_artifact(source):
+            if not isinstance(source, str) or not os.path.exists(source):
+                return source
+            filename = os.path.basename(source)
+            shutil.copy2(source, os.path.join(staging_dir, filename))
+            return os.path.join(entry_dir, filename)
+
+        cached_shots = []
+        for shot in results.get("shots", []):
+            shot = dict(shot)
+            for field in ("video_path", "tracking_file"):
+                shot[field] = cache_artifact(shot.get(field))
+            if isinstance(shot.get("analysis"), dict) and "key_frames" in shot["analysis"]:
+                analysis = dict(shot["analysis"])
+                analysis["key_frames"] = {name: cache_artifact(path) for name, path in analysis["key_frames"].items()}
+                shot["analysis"] = analysis
+            cached_shots.append(shot)
+        cached["shots"] = cached_shots
+
+        with open(os.path.join(staging_dir, self.RESULTS_FILENAME), 'w') as f:
+            json.dump(cached, f, indent=2, default=str)
+
+        # Publish the entry in one rename so readers never see a partial entry
+        with self._lock:
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.rename(staging_dir, entry_dir)
+            self._entries[key] = self._dir_size(entry_dir)
+            self._sources[key] = self._source_videos(cached)
+            self._entries.move_to_end(key)
+            self._evict()
+
+        return cached
+
+    def contains(self, path: str) -> bool:
+        """Check whether a file path lives inside the cache"""
+        cache_root = os.path.abspath(self.cache_dir) + os.sep
+        return os.path.abspath(path).startswith(cache_root)
+
+    def referenced_sources(self) -> Set[str]:
+        """Retained source videos that cached entries still need for on-demand rendering"""
+        with self._lock:
+            return set().union(*self._sources.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for the status endpoint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_bytes": sum(self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def _load_index(self):
+        """Rebuild the LRU index from the entries already on disk"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(path):
+                continue
+            if '.tmp' in name:
+                # Leftover staging directory from an interrupted write
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            entries.append((os.stat(path).st_mtime, name, self._dir_size(path)))
+
+        for _, name, size in sorted(entries):
+            self._entries[name] = size
+            try:
+                with open(os.path.join(self.cache_dir, name, self.RESULTS_FILENAME), 'r') as f:
+                    self._sources[name] = self._source_videos(json.load(f))
+            except (OSError, ValueError):
+                self._sources[name] = set()
+        self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits its budget (lock held)"""
+        total = sum(self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._sources.pop(key, None)
+            shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+            total -= size
+            print(f"Evicted cached results {key[:12]} ({size} bytes)")
+
+    @staticmethod
+    def _source_videos(results: Dict[str, Any]) -> Set[str]:
+        return {shot["source_video"] for shot in results.get("shots", []) if shot.get("source_video")}
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        total = 0
+        for root, _, files in os.walk(path):
+            for filename in files:
+                total += os.path.getsize(os.path.join(root, filename))
+        return total
@@ -0,0 +1,299 @@
+"""
+SQLite index of saved analysis results for SwishScan
+"""
+
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+
+class ResultsCatalog:
+    """
+    Embedded index of the results folder, filled in as results are saved
+
+    One row per results file holds its summary (shot count, total shot
+    duration, motion statistics, paths), and one row per shot holds the shot
+    record itself, so listing results and looking up a shot never touch the
+    JSON files. Listings are keyset-paginated over indexed columns: each page
+    costs a seek plus the page size, however many analyses have been run.
+    """
+
+    # Sortable listing columns; each has an index ending in filename for keyset paging
+    SORT_COLUMNS = ("created", "total_shots", "total_duration", "max_motion")
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    filename TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    job_id TEXT,
+                    created REAL NOT NULL,
+                    size_bytes INTEGER NOT NULL DEFAULT 0,
+                    total_shots INTEGER NOT NULL DEFAULT 0,
+                    total_duration REAL NOT NULL DEFAULT 0,
+                    max_motion REAL NOT NULL DEFAULT 0,
+                    avg_motion REAL NOT NULL DEFAULT 0,
+                    wall_seconds REAL,
+                    original_video TEXT
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS shots (
+                    filename TEXT NOT NULL,
+                    shot_id TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    start_frame INTEGER,
+                    end_frame INTEGER,
+                    duration REAL,
+                    max_motion REAL,
+                    avg_motion REAL,
+                    video_path TEXT,
+                    tracking_file TEXT,
+                    record TEXT NOT NULL,
+                    PRIMARY KEY (filename, shot_id)
+                )
+            """)
+            for column in self.SORT_COLUMNS:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS results_by_{column} ON results ({column}, filename)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS shots_by_id ON shots (shot_id, created)")
+            self._count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def add(self, path: str, results: Dict[str, Any], job_id: Optional[str] = None):
+        """
+        Index a saved results file, replacing any previous entry for it
+
+        Args:
+            path: Path of the results file
+            results: The results dictionary that was written to it
+            job_id: Job that produced the results, if known
+        """
+        filename = os.path.basename(path)
+        shots = results.get("shots", [])
+        try:
+            stat = os.stat(path)
+            created, size_bytes = stat.st_mtime, stat.st_size
+        except OSError:
+            created, size_bytes = time.time(), 0
+
+        shot_rows = []
+        for shot in shots:
+            segment = shot.get("segment_info") or {}
+            analysis = shot.get("analysis") or {}
+            motion = analysis.get("motion_analysis") or {}
+            shot_rows.append((
+                filename, shot.get("shot_id", ""), created, segment.get("start_frame"), segment.get("end_frame"),
+                analysis.get("duration", segment.get("duration")), motion.get("max_motion"), motion.get("avg_motion"),
+                shot.get("video_path"), shot.get("tracking_file"), json.dumps(shot, default=str)
+            ))
+        durations = [row[5] for row in shot_rows if row[5] is not None]
+        max_motions = [row[6] for row in shot_rows if row[6] is not None]
+        avg_motions = [row[7] for row in shot_rows if row[7] is not None]
+
+        with self._lock, self._conn:
+            existed = self._conn.execute("SELECT 1 FROM results WHERE filename = ?", (filename,)).fetchone()
+            self._conn.execute("DELETE FROM shots WHERE filename = ?", (filename,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (filename, path, job_id, created, size_bytes, results.get("total_shots", len(shots)),
+                 float(sum(durations)), float(max(max_motions, default=0.0)),
+                 float(sum(avg_motions) / len(avg_motions)) if avg_motions else 0.0,
+                 (results.get("profile") or {}).get("wall_seconds"), results.get("original_video"))
+            )
+            self._conn.executemany("INSERT INTO shots VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", shot_rows)
+            if not existed:
+                self._count += 1
+
+    def assign_job(self, filename: str, job_id: str):
+        """Record the job a results file belongs to, for files saved before their job existed"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE results SET job_id = ? WHERE filename = ?", (job_id, filename))
+
+    def remove(self, filename: str):
+        """Drop a results file and its shots from the index"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM shots WHERE filename = ?", (filename,))
+            if self._conn.execute("DELETE FROM results WHERE filename = ?", (filename,)).rowcount:
+                self._count -= 1
+
+    def count(self) -> int:
+        """Number of indexed results files"""
+        with self._lock:
+            return self._count
+
+    def query(self, limit: int = 50, cursor: Optional[str] = None, sort: str = "created", descending: bool = True,
+              min_shots: Optional[int] = None, max_shots: Optional[int] = None,
+              since: Optional[float] = None, until: Optional[float] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of results files
+
+        Args:
+            limit: Page size
+            cursor: next_cursor of the previous page, or None for the first page
+            sort: One of SORT_COLUMNS
+            descending: Sort direction
+            min_shots: Only files with at least this many shots
+            max_shots: Only files with at most this many shots
+            since: Only files created at or after this Unix time
+            until: Only files created before this Unix time
+
+        Returns:
+            Tuple of the page's rows and the cursor of the next page (None on the last page)
+
+        Raises:
+            ValueError: If the sort column or cursor is invalid
+        """
+        if sort not in self.SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {sort!r}, expected one of {', '.join(self.SORT_COLUMNS)}")
+
+        clauses = []
+        params = []
+        for clause, value in (("total_shots >= ?", min_shots), ("total_shots <= ?", max_shots),
+                              ("created >= ?", since), ("created < ?", until)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        if cursor is not None:
+            # Row-value comparison continues right after the last row of the previous page
+            clauses.append(f"({sort}, filename) {'<' if descending else '>'} (?, ?)")
+            params.extend(self._decode_cursor(cursor))
+
+        direction = "DESC" if descending else "ASC"
+        sql = "SELECT * FROM results"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {sort} {direction}, filename {direction} LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute(sql, params)]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._encode_cursor(rows[-1][sort], rows[-1]["filename"])
+        return rows, next_cursor
+
+    def find_shot(self, shot_id: str, filename: Optional[str] = None,
+                  job_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Look up a shot record
+
+        Shot IDs are only unique within one results file, so the file or the
+        job that produced it must be given.
+
+        Args:
+            shot_id: ID of the shot, e.g. "shot_000"
+            filename: Results file the shot belongs to
+            job_id: Job whose results file the shot belongs to
+
+        Returns:
+            The shot dictionary, or None if it is not indexed
+
+        Raises:
+            ValueError: If neither filename nor job_id is given
+        """
+        if filename is None and job_id is None:
+            raise ValueError("A results file or job ID is required to look up a shot")
+
+        clauses = ["shots.shot_id = ?"]
+        params = [shot_id]
+        if filename is not None:
+            clauses.append("shots.filename = ?")
+            params.append(filename)
+        if job_id is not None:
+            clauses.append("results.job_id = ?")
+            params.append(job_id)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT shots.record FROM shots JOIN results ON results.filename = shots.filename "
+                f"WHERE {' AND '.join(clauses)} ORDER BY shots.created DESC LIMIT 1", params
+            ).fetchone()
+        return json.loads(row["record"]) if row is not None else None
+
+    def job_paths(self, job_id: str) -> List[str]:
+        """
+        Results files of a job and the source videos their shots render from
+
+        Args:
+            job_id: Job that produced the results
+
+        Returns:
+            Paths recorded for the job, empty if it has no indexed results
+        """
+        with self._lock:
+            paths = [row["path"] for row in self._conn.execute("SELECT path FROM results WHERE job_id = ?", (job_id,))]
+            records = [row["record"] for row in self._conn.execute(
+                "SELECT shots.record FROM shots JOIN results ON results.filename = shots.filename "
+                "WHERE results.job_id = ?", (job_id,)
+            )]
+        sources = {json.loads(record).get("source_video") for record in records}
+        return paths + sorted(source for source in sources if source)
+
+    def sync(self, results_folder: str, is_results_file: Callable[[str], bool]) -> Dict[str, int]:
+        """
+        Reconcile the index with the results folder, e.g. after an upgrade or manual cleanup
+
+        Files missing from the index are read and added, and entries whose
+        file is gone are dropped. This is the only operation that scans the
+        folder, and it runs once at start-up.
+
+        Args:
+            results_folder: Folder holding the results files
+            is_results_file: Filter for finished results file names
+
+        Returns:
+            Number of files added and removed
+        """
+        on_disk = {name for name in os.listdir(results_folder) if is_results_file(name)}
+        with self._lock:
+            indexed = {row[0] for row in self._conn.execute("SELECT filename FROM results")}
+
+        added = 0
+        for filename in sorted(on_disk - indexed):
+            path = os.path.join(results_folder, filename)
+            try:
+                with open(path, 'r') as f:
+                    results = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable results file {filename}: {e}")
+                continue
+            self.add(path, results)
+            added += 1
+
+        stale = indexed - on_disk
+        for filename in stale:
+            self.remove(filename)
+
+        if added or stale:
+            print(f"Results catalog synced: {added} added, {len(stale)} removed")
+        return {"added": added, "removed": len(stale)}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _encode_cursor(value: Any, filename: str) -> str:
+        return base64.urlsafe_b64encode(json.dumps([value, filename]).encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> List[Any]:
+        try:
+            decoded = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+        # Only scalars can be bound as SQLite parameters; bool is excluded since it is an int subclass
+        if (not isinstance(decoded, list) or len(decoded) != 2
+                or any(isinstance(item, bool) or not isinstance(item, (str, int, float)) for item in decoded)):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return decoded
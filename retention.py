@@ -0,0 +1,252 @@
+"""
+Retention and disk-budget garbage collection for SwishScan output folders
+"""
+
+import asyncio
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Any, Callable, Iterable, List, Optional, Set
+
+
+class RetentionRule:
+    """
+    Age and size limits for one folder
+
+    Every top-level entry of the folder is kept or removed as a unit, so a
+    job's tracked_data/<job_id>/ directory goes all at once. An entry's age is
+    that of its most recently modified file.
+    """
+
+    def __init__(self, folder: str, max_age_seconds: float = 0, max_bytes: int = 0):
+        self.folder = folder
+        self.max_age_seconds = max_age_seconds  # 0 keeps entries regardless of age
+        self.max_bytes = max_bytes  # 0 leaves the folder unbounded
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"max_age_seconds": self.max_age_seconds, "max_bytes": self.max_bytes}
+
+
+class RetentionManager:
+    """
+    Periodic garbage collector enforcing a RetentionRule per folder
+
+    Each sweep first removes entries older than the folder's max age, then
+    evicts the least recently used entries (oldest modification time first)
+    until the folder fits its byte budget. Entries are never removed while
+    they are protected: paths returned by the protected_paths callback (files
+    of queued and running jobs, sources the result cache still renders from),
+    entries whose name contains a pinned job id, paths recorded with a pin,
+    and anything modified within the grace period, which
+    covers uploads and artifacts still being written. Callers can refresh an
+    entry's LRU position with touch().
+    """
+
+    def __init__(self, rules: Iterable[RetentionRule], interval_seconds: float,
+                 protected_paths: Optional[Callable[[], Iterable[str]]] = None,
+                 grace_seconds: float = 300, on_remove: Optional[Callable[[str, str], None]] = None):
+        self.rules = list(rules)
+        self.interval_seconds = interval_seconds
+        self.protected_paths = protected_paths
+        self.grace_seconds = grace_seconds
+        self.on_remove = on_remove  # Called with (folder, path) after an entry is removed, from the sweep thread
+
+        self._lock = threading.Lock()
+        # Job id -> extra paths (e.g. its source video) kept regardless of age and budget, along
+        # with every entry named after the job; held here so pins outlive the job table
+        self._pinned = {}
+        self.task = None
+
+        self.sweeps = 0
+        self.last_sweep = None
+        self.last_sweep_seconds = 0.0
+        self.reclaimed_bytes = 0
+        self.removed_entries = 0
+        self.usage = {}  # Folder -> bytes and entry count after the last sweep
+
+    def start(self):
+        """Start the periodic sweep task on the running event loop"""
+        if self.interval_seconds <= 0:
+            print("Retention sweeps disabled")
+            return
+        self.task = asyncio.create_task(self._run())
+        print(f"Started retention sweeps every {self.interval_seconds:g}s")
+
+    async def stop(self):
+        """Cancel the sweep task"""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def pin(self, job_id: str, paths: Iterable[str] = ()):
+        """
+        Keep a job's artifacts until unpinned
+
+        Args:
+            job_id: Job whose entries (matched by name) are kept
+            paths: Further paths to keep that are not named after the job, such as its source video
+        """
+        with self._lock:
+            self._pinned.setdefault(job_id, set()).update(os.path.abspath(path) for path in paths)
+
+    def unpin(self, job_id: str):
+        """Let a job's artifacts expire normally again"""
+        with self._lock:
+            self._pinned.pop(job_id, None)
+
+    def is_pinned(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._pinned
+
+    @staticmethod
+    def touch(path: str):
+        """Mark a file as just used, moving its entry to the back of the eviction order"""
+        try:
+            now = time.time()
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+
+    def sweep(self, protected: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Enforce every rule once (blocking; the periodic task runs it in a thread)
+
+        Args:
+            protected: Paths to keep; collected from the protected_paths callback by default
+
+        Returns:
+            Bytes reclaimed and entries removed per folder
+        """
+        started = time.monotonic()
+        if protected is None:
+            protected = self._collect_protected()
+        protected = {os.path.abspath(path) for path in protected}
+        with self._lock:
+            pinned = set(self._pinned)
+            for paths in self._pinned.values():
+                protected.update(paths)
+
+        report = {}
+        for rule in self.rules:
+            report[rule.folder] = self._sweep_folder(rule, protected, pinned)
+
+        with self._lock:
+            self.sweeps += 1
+            self.last_sweep = time.time()
+            self.last_sweep_seconds = time.monotonic() - started
+            for folder_report in report.values():
+                self.reclaimed_bytes += folder_report["reclaimed_bytes"]
+                self.removed_entries += folder_report["removed_entries"]
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        """Retention settings, current usage and reclaimed totals for the status endpoint"""
+        with self._lock:
+            return {
+                "interval_seconds": self.interval_seconds,
+                "grace_seconds": self.grace_seconds,
+                "rules": {rule.folder: rule.to_dict() for rule in self.rules},
+                "usage": dict(self.usage),
+                "pinned_jobs": sorted(self._pinned),
+                "sweeps": self.sweeps,
+                "last_sweep": self.last_sweep,
+                "last_sweep_seconds": round(self.last_sweep_seconds, 3),
+                "reclaimed_bytes": self.reclaimed_bytes,
+                "removed_entries": self.removed_entries
+            }
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                # Protected paths are collected on the event loop, which owns the job table
+                report = await loop.run_in_executor(None, self.sweep, self._collect_protected())
+                reclaimed = sum(folder_report["reclaimed_bytes"] for folder_report in report.values())
+                if reclaimed:
+                    print(f"Retention sweep reclaimed {reclaimed} bytes")
+            except Exception as e:
+                print(f"Retention sweep failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def _collect_protected(self) -> List[str]:
+        return list(self.protected_paths()) if self.protected_paths else []
+
+    def _sweep_folder(self, rule: RetentionRule, protected: Set[str], pinned: Set[str]) -> Dict[str, int]:
+        now = time.time()
+        entries = self._scan(rule.folder)
+        total = sum(size for _, size, _ in entries)
+        reclaimed = 0
+        removed = 0
+
+        def removable(path, mtime):
+            name = os.path.basename(path)
+            if now - mtime < self.grace_seconds or any(job_id in name for job_id in pinned):
+                return False
+            # A protected path may be the entry itself or a file inside a directory entry
+            return not any(p == path or p.startswith(path + os.sep) for p in protected)
+
+        # Least recently used first
+        entries.sort(key=lambda entry: entry[2])
+        kept = []
+        for path, size, mtime in entries:
+            expired = rule.max_age_seconds and now - mtime > rule.max_age_seconds
+            if expired and removable(path, mtime) and self._remove(rule.folder, path):
+                total -= size
+                reclaimed += size
+                removed += 1
+            else:
+                kept.append((path, size, mtime))
+
+        if rule.max_bytes:
+            for path, size, mtime in kept:
+                if total <= rule.max_bytes:
+                    break
+                if removable(path, mtime) and self._remove(rule.folder, path):
+                    total -= size
+                    reclaimed += size
+                    removed += 1
+
+        with self._lock:
+            self.usage[rule.folder] = {"bytes": total, "entries": len(entries) - removed}
+        if removed:
+            print(f"Retention removed {removed} entries ({reclaimed} bytes) from {rule.folder}")
+        return {"reclaimed_bytes": reclaimed, "removed_entries": removed}
+
+    @staticmethod
+    def _scan(folder: str) -> List[tuple]:
+        """(absolute path, bytes, newest modification time) of each top-level entry"""
+        entries = []
+        if not os.path.isdir(folder):
+            return entries
+        for name in os.listdir(folder):
+            path = os.path.abspath(os.path.join(folder, name))
+            try:
+                stat = os.stat(path)
+                size, mtime = stat.st_size, stat.st_mtime
+                if os.path.isdir(path):
+                    size = 0
+                    for root, _, files in os.walk(path):
+                        for filename in files:
+                            file_stat = os.stat(os.path.join(root, filename))
+                            size += file_stat.st_size
+                            mtime = max(mtime, file_stat.st_mtime)
+            except OSError:
+                # Removed while scanning
+                continue
+            entries.append((path, size, mtime))
+        return entries
+
+    def _remove(self, folder: str, path: str) -> bool:
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError as e:
+            print(f"Retention could not remove {path}: {e}")
+            return False
+        if self.on_remove is not None:
+            self.on_remove(folder, path)
+        return True
@@ -0,0 +1,300 @@
+"""
+Columnar store for every player's shot chart in one file.
+
+The per-player {player_id}.json files written by makeDataFiles.py are
+exported into a single little-endian binary file:
+
+    header     8s magic "SHOTCOL1", uint32 version, uint32 player count,
+               uint32 capacity (shot slots), uint32 names size
+    players    per player, sorted by id: uint32 player_id, uint32 start,
+               uint32 count, uint32 name offset, uint32 name length
+    names      UTF-8 player names, zero-padded so the columns start at a
+               multiple of 8 bytes
+    LOC_X      int16[capacity]
+    LOC_Y      int16[capacity]
+    made       uint8[capacity / 8], SHOT_MADE_FLAG bit-packed, least
+               significant bit first
+
+Each player's shots start at a multiple of 8, so their made flags begin on
+a byte boundary and every column of a player is a plain slice. Slots
+between one player's last shot and the next player's start are zero.
+
+    python shotChartStore.py export --data-dir ballin/data --output ballin/data/shot_charts.bin
+    python shotChartStore.py info ballin/data/shot_charts.bin
+"""
+
+
+import argparse
+import glob
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+MAGIC = b"SHOTCOL1"
+VERSION = 1
+HEADER = struct.Struct("<8sIIII")
+PLAYER_ENTRY = struct.Struct("<IIIII")
+
+# A player's shots as views into the store; made_bits holds ceil(count / 8) bytes
+PlayerShots = namedtuple("PlayerShots", ["player_id", "name", "loc_x", "loc_y", "made_bits", "count"])
+
+
+def alignUp(value: int, alignment: int = 8) -> int:
+    """
+    Round a size or offset up to a multiple of alignment.
+    """
+    return (value + alignment - 1) // alignment * alignment
+
+
+def exportShotCharts(data_dir: str, output_path: str) -> dict:
+    """
+    Export every {player_id}.json file in a directory into one columnar store.
+
+    Args:
+        data_dir (str): Directory of the player JSON files.
+        output_path (str): Path of the store to write.
+
+    Returns:
+        dict: Number of players and shots and the size of the store in bytes.
+
+    Raises:
+        ValueError: If a shot location does not fit in an int16.
+    """
+    players = []
+    for path in glob.glob(os.path.join(data_dir, "*.json")):
+        player_id = os.path.splitext(os.path.basename(path))[0]
+        if not player_id.isdigit():
+            continue
+        with open(path, 'r') as f:
+            players.append((int(player_id), json.load(f)))
+    players.sort(key=lambda player: player[0])
+
+    entries = []
+    names = bytearray()
+    loc_x = array('h')
+    loc_y = array('h')
+    made = array('B')
+    for player_id, data in players:
+        start = len(loc_x)
+        shots = data["shots"]
+        name = data["name"].encode("utf-8")
+        entries.append((player_id, start, len(shots), len(names), len(name)))
+        names += name
+
+        for shot in shots:
+            x, y = shot["LOC_X"], shot["LOC_Y"]
+            if x != int(x) or y != int(y) or not (-32768 <= x <= 32767 and -32768 <= y <= 32767):
+                raise ValueError(f"Shot location ({x}, {y}) of player {player_id} does not fit in an int16")
+            loc_x.append(int(x))
+            loc_y.append(int(y))
+            made.append(1 if shot["SHOT_MADE_FLAG"] else 0)
+
+        # Pad to the next multiple of 8 so the next player's flags start on a byte boundary
+        padding = alignUp(len(loc_x)) - len(loc_x)
+        loc_x.extend([0] * padding)
+        loc_y.extend([0] * padding)
+        made.extend([0] * padding)
+
+    capacity = len(loc_x)
+    made_bits = bytearray(capacity // 8)
+    for index in range(0, capacity, 8):
+        byte = 0
+        for bit in range(8):
+            byte |= made[index + bit] << bit
+        made_bits[index // 8] = byte
+
+    if sys.byteorder == "big":
+        loc_x.byteswap()
+        loc_y.byteswap()
+
+    tmp_path = f"{output_path}.tmp{os.getpid()}_{threading.get_ident()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(entries), capacity, len(names)))
+        for entry in entries:
+            f.write(PLAYER_ENTRY.pack(*entry))
+        # Columns start at a multiple of 8 bytes from the start of the file
+        names_end = HEADER.size + len(entries) * PLAYER_ENTRY.size + len(names)
+        f.write(bytes(names) + bytes(alignUp(names_end) - names_end))
+        f.write(loc_x.tobytes())
+        f.write(loc_y.tobytes())
+        f.write(bytes(made_bits))
+    os.replace(tmp_path, output_path)
+
+    return {"players": len(entries), "shots": sum(entry[2] for entry in entries),
+            "bytes": os.path.getsize(output_path)}
+
+
+class ShotChartStore:
+    """
+    Memory-mapped reader for a store written by exportShotCharts.
+
+    The column arrays are numpy views over the mapping, so opening the store
+    and slicing a player's shots copy nothing; pages are read on first access.
+    The whole-store columns (loc_x, loc_y, made_bits) with starts and counts
+    allow comparing every player at once.
+    """
+
+    def __init__(self, path: str):
+        import numpy as np
+
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, player_count, capacity, names_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} shot chart store")
+
+        table_offset = HEADER.size
+        table = np.frombuffer(self._mmap, dtype='<u4', count=player_count * 5, offset=table_offset)
+        table = table.reshape(player_count, 5)
+        self.player_ids = table[:, 0]
+        self.starts = table[:, 1]
+        self.counts = table[:, 2]
+
+        names_offset = table_offset + player_count * PLAYER_ENTRY.size
+        names = self._mmap[names_offset:names_offset + names_size]
+        self.names = [names[offset:offset + length].decode("utf-8") for offset, length in table[:, 3:5].tolist()]
+
+        columns_offset = alignUp(names_offset + names_size)
+        self.capacity = capacity
+        self.loc_x = np.frombuffer(self._mmap, dtype='<i2', count=capacity, offset=columns_offset)
+        self.loc_y = np.frombuffer(self._mmap, dtype='<i2', count=capacity, offset=columns_offset + 2 * capacity)
+        self.made_bits = np.frombuffer(self._mmap, dtype=np.uint8, count=capacity // 8,
+                                       offset=columns_offset + 4 * capacity)
+
+        self._index = {player_id: index for index, player_id in enumerate(self.player_ids.tolist())}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, player_id: int) -> bool:
+        return player_id in self._index
+
+    def player(self, player_id: int) -> PlayerShots:
+        """
+        Get a player's shots as views into the store.
+
+        Args:
+            player_id (int): The ID of the player.
+
+        Returns:
+            PlayerShots: The player's name, LOC_X and LOC_Y int16 views and bit-packed made flags.
+
+        Raises:
+            KeyError: If the player is not in the store.
+        """
+        index = self._index[player_id]
+        start = int(self.starts[index])
+        count = int(self.counts[index])
+        return PlayerShots(player_id, self.names[index], self.loc_x[start:start + count],
+                           self.loc_y[start:start + count], self.made_bits[start // 8:alignUp(start + count) // 8],
+                           count)
+
+    def made(self, player_id: int):
+        """
+        Get a player's SHOT_MADE_FLAG values unpacked into a boolean array (a small copy).
+        """
+        import numpy as np
+
+        shots = self.player(player_id)
+        return np.unpackbits(shots.made_bits, count=shots.count, bitorder='little').astype(bool)
+
+    def made_counts(self):
+        """
+        Count made shots for every player at once.
+
+        Returns:
+            numpy.ndarray: Made shots per player, in player_ids order.
+        """
+        import numpy as np
+
+        # Padding slots are zero, so summing each player's byte range counts only their shots
+        bits_per_byte = np.unpackbits(self.made_bits[:, None], axis=1).sum(axis=1)
+        cumulative = np.concatenate(([0], np.cumsum(bits_per_byte)))
+        first_byte = self.starts // 8
+        last_byte = (self.starts + self.counts + 7) // 8
+        return cumulative[last_byte] - cumulative[first_byte]
+
+    def toJson(self, player_id: int) -> dict:
+        """
+        Rebuild a player's data in the makeDataFiles.py JSON format.
+        """
+        shots = self.player(player_id)
+        return {
+            "name": shots.name,
+            "shots": [
+                {"SHOT_MADE_FLAG": int(made), "LOC_X": int(x), "LOC_Y": int(y)}
+                for made, x, y in zip(self.made(player_id), shots.loc_x, shots.loc_y)
+            ]
+        }
+
+    def close(self) -> None:
+        # Drop the numpy views first; the mapping can't close while buffers export it
+        self.loc_x = self.loc_y = self.made_bits = None
+        self.player_ids = self.starts = self.counts = None
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def printStoreInfo(path: str) -> None:
+    """
+    Print a store's contents and how long opening it and reading every player takes.
+
+    Args:
+        path (str): Path of the store.
+    """
+    started = time.perf_counter()
+    with ShotChartStore(path) as store:
+        opened = time.perf_counter()
+        made_counts = store.made_counts()
+        for player_id in store.player_ids.tolist():
+            store.player(player_id)
+        finished = time.perf_counter()
+
+        for index, player_id in enumerate(store.player_ids.tolist()):
+            count = int(store.counts[index])
+            percentage = 100 * int(made_counts[index]) / count if count else 0.0
+            print(f"{player_id:>8} {store.names[index]:28s} {count:6d} shots {percentage:5.1f}% made")
+        print(f"{len(store)} players, {int(store.counts.sum())} shots, {os.path.getsize(path)} bytes")
+        print(f"Opened in {1e6 * (opened - started):.0f} us, "
+              f"made counts and every player's slices in {1e6 * (finished - opened):.0f} us")
+
+
+def main():
+    """
+    Export the player JSON files into a store, or describe an existing store.
+    """
+    parser = argparse.ArgumentParser(description="Columnar store for all player shot charts.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export {player_id}.json files into a store")
+    export_parser.add_argument("--data-dir", default="ballin/data", help="Directory of the player JSON files")
+    export_parser.add_argument("--output", default="ballin/data/shot_charts.bin", help="Path of the store")
+
+    info_parser = subparsers.add_parser("info", help="Print a store's players and load time")
+    info_parser.add_argument("path", nargs="?", default="ballin/data/shot_charts.bin", help="Path of the store")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        summary = exportShotCharts(args.data_dir, args.output)
+        print(f"Wrote {summary['players']} players and {summary['shots']} shots to {args.output} "
+              f"({summary['bytes']} bytes)")
+    else:
+        printStoreInfo(args.path)
+
+
+if __name__ == "__main__":
+    main()